@@ -1,6 +1,7 @@
 """Database configuration for DietTracker"""
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -30,6 +31,24 @@ class Config:
     HOST = os.environ.get('HOST', '0.0.0.0')
     PORT = int(os.environ.get('PORT', 5000))
     
+    # Préchauffage du cache (catalogue et profils nutritionnels) au démarrage
+    CACHE_WARMUP_ON_STARTUP = os.environ.get('CACHE_WARMUP_ON_STARTUP', 'false').lower() == 'true'
+    CACHE_WARMUP_TIME_BUDGET = float(os.environ.get('CACHE_WARMUP_TIME_BUDGET', 20))
+    
+    # Historique des listes de courses écrit par lots depuis un thread de fond
+    SHOPPING_HISTORY_WRITE_BEHIND = os.environ.get('SHOPPING_HISTORY_WRITE_BEHIND', 'true').lower() == 'true'
+    SHOPPING_HISTORY_FLUSH_INTERVAL = float(os.environ.get('SHOPPING_HISTORY_FLUSH_INTERVAL', 2))
+    SHOPPING_HISTORY_BATCH_SIZE = int(os.environ.get('SHOPPING_HISTORY_BATCH_SIZE', 100))
+    
+    # Génération de plans en lot: processus de calcul (0 = un par CPU, 1 = dans le processus)
+    BULK_GENERATION_WORKERS = int(os.environ.get('BULK_GENERATION_WORKERS', 0))
+    
+    # Instantané nutritionnel des ingrédients projeté en mémoire par tous les workers
+    # (un sous-répertoire par base de données, voir IngredientSnapshotService)
+    INGREDIENT_SNAPSHOT_DIR = os.environ.get(
+        'INGREDIENT_SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'diettracker-snapshots')
+    )
+    
     @staticmethod
     def init_app(app):
         pass
@@ -60,6 +79,15 @@ class TestingConfig(Config):
     # JWT
     JWT_ACCESS_TOKEN_EXPIRES = 60  # 1 minute for testing
     
+    # Historique écrit immédiatement (pas de thread de fond entre les tests)
+    SHOPPING_HISTORY_WRITE_BEHIND = False
+    
+    # Génération en lot dans le processus de test
+    BULK_GENERATION_WORKERS = 1
+    
+    # Instantané des ingrédients gardé en mémoire (une base par application de test)
+    INGREDIENT_SNAPSHOT_DIR = None
+    
     # Logging
     LOG_LEVEL = 'INFO'
 
@@ -95,6 +123,9 @@ class ProductionConfig(Config):
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     
+    # Préchauffage du cache après chaque déploiement / démarrage à froid
+    CACHE_WARMUP_ON_STARTUP = os.environ.get('CACHE_WARMUP_ON_STARTUP', 'true').lower() == 'true'
+    
     @classmethod
     def init_app(cls, app):
         Config.init_app(app)
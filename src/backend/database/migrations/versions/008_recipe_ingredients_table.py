@@ -0,0 +1,116 @@
+"""Normalized recipe_ingredients table
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-08-20
+
+Cette migration normalise les ingrédients des recettes :
+- Création de la table recipe_ingredients (recette, ingrédient, quantité, unité)
+- Index dans les deux sens (ingrédients d'une recette / recettes d'un ingrédient)
+- Remplissage depuis recipes.ingredients_json
+
+Après la migration, le modèle Recipe maintient la table synchronisée
+à chaque écriture de ingredients_json.
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+import json
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Création et remplissage de recipe_ingredients"""
+
+    print("🥕 Migration 008 - Table recipe_ingredients...")
+
+    # 1. Création de la table
+    print("📊 Création de la table recipe_ingredients...")
+    op.create_table(
+        'recipe_ingredients',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('recipe_id', sa.Integer, sa.ForeignKey('recipes.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('ingredient_id', sa.Integer, sa.ForeignKey('ingredients.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('quantity', sa.Float, nullable=False, default=0),
+        sa.Column('unit', sa.String(20), nullable=True),
+        sa.Column('position', sa.Integer, nullable=False, default=0)
+    )
+
+    # 2. Index
+    print("⚡ Création des index...")
+    op.create_index('idx_recipe_ingredients_recipe', 'recipe_ingredients', ['recipe_id', 'ingredient_id'])
+    op.create_index('idx_recipe_ingredients_ingredient', 'recipe_ingredients', ['ingredient_id', 'recipe_id'])
+
+    # 3. Remplissage depuis le JSON des recettes
+    print("🔄 Remplissage depuis recipes.ingredients_json...")
+    connection = op.get_bind()
+    known_ingredient_ids = {
+        row[0] for row in connection.execute(sa.text("SELECT id FROM ingredients"))
+    }
+    recipes = connection.execute(sa.text("SELECT id, ingredients_json FROM recipes")).fetchall()
+
+    recipe_ingredients_table = sa.table(
+        'recipe_ingredients',
+        sa.column('recipe_id', sa.Integer),
+        sa.column('ingredient_id', sa.Integer),
+        sa.column('quantity', sa.Float),
+        sa.column('unit', sa.String),
+        sa.column('position', sa.Integer)
+    )
+
+    rows = []
+    skipped = 0
+    for recipe_id, ingredients_json in recipes:
+        try:
+            ingredients = json.loads(ingredients_json) if ingredients_json else []
+        except (TypeError, ValueError):
+            skipped += 1
+            continue
+
+        for position, item in enumerate(ingredients):
+            if not isinstance(item, dict):
+                continue
+            try:
+                ingredient_id = int(item.get('ingredient_id'))
+                quantity = float(item.get('quantity') or 0)
+            except (TypeError, ValueError):
+                continue
+            if ingredient_id not in known_ingredient_ids:
+                continue
+
+            rows.append({
+                'recipe_id': recipe_id,
+                'ingredient_id': ingredient_id,
+                'quantity': quantity,
+                'unit': item.get('unit'),
+                'position': position
+            })
+
+    for start in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(recipe_ingredients_table, rows[start:start + BATCH_SIZE])
+
+    print(f"✅ {len(rows)} lignes créées pour {len(recipes)} recettes")
+    if skipped:
+        print(f"⚠️ {skipped} recette(s) avec un JSON d'ingrédients illisible ignorée(s)")
+
+    print("🎉 Migration 008 terminée!")
+
+
+def downgrade() -> None:
+    """Suppression de recipe_ingredients (le JSON des recettes reste la source)"""
+
+    print("⏪ Suppression de la table recipe_ingredients...")
+
+    op.drop_index('idx_recipe_ingredients_ingredient', table_name='recipe_ingredients')
+    op.drop_index('idx_recipe_ingredients_recipe', table_name='recipe_ingredients')
+    op.drop_table('recipe_ingredients')
+
+    print("✅ Table recipe_ingredients supprimée")
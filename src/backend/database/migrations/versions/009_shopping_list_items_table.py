@@ -0,0 +1,120 @@
+"""Per-item shopping list check state
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-08-21
+
+Cette migration sort l'état coché des articles du JSON des listes :
+- Création de la table shopping_list_items (une ligne par article, avec version)
+- Contrainte d'unicité (liste, article) servant d'index aux bascules
+- Reprise des cases cochées depuis shopping_lists.checked_items_json
+
+Cocher un article devient un UPDATE d'une seule ligne, conditionné par sa
+version, au lieu d'une réécriture complète du JSON de la liste.
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+import json
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Création et remplissage de shopping_list_items"""
+
+    print("🛒 Migration 009 - Table shopping_list_items...")
+
+    # 1. Création de la table
+    print("📊 Création de la table shopping_list_items...")
+    op.create_table(
+        'shopping_list_items',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('shopping_list_id', sa.Integer, sa.ForeignKey('shopping_lists.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('item_id', sa.String(100), nullable=False),
+        sa.Column('checked', sa.Boolean, nullable=False, default=False),
+        sa.Column('version', sa.Integer, nullable=False, default=1),
+        sa.Column('updated_at', sa.DateTime, nullable=True),
+        sa.Column('updated_by', sa.String(50), nullable=True),
+        sa.UniqueConstraint('shopping_list_id', 'item_id', name='uq_shopping_list_items_list_item')
+    )
+
+    # 2. Index
+    print("⚡ Création des index...")
+    op.create_index('ix_shopping_list_items_shopping_list_id', 'shopping_list_items', ['shopping_list_id'])
+
+    # 3. Reprise des cases cochées
+    print("🔄 Reprise depuis shopping_lists.checked_items_json...")
+    connection = op.get_bind()
+    shopping_lists = connection.execute(
+        sa.text("SELECT id, checked_items_json FROM shopping_lists WHERE checked_items_json IS NOT NULL")
+    ).fetchall()
+
+    shopping_list_items_table = sa.table(
+        'shopping_list_items',
+        sa.column('shopping_list_id', sa.Integer),
+        sa.column('item_id', sa.String),
+        sa.column('checked', sa.Boolean),
+        sa.column('version', sa.Integer),
+        sa.column('updated_at', sa.DateTime)
+    )
+
+    now = datetime.utcnow()
+    rows = []
+    for shopping_list_id, checked_items_json in shopping_lists:
+        try:
+            checked_items = json.loads(checked_items_json) or {}
+        except (TypeError, ValueError):
+            continue
+
+        for item_id, checked in checked_items.items():
+            rows.append({
+                'shopping_list_id': shopping_list_id,
+                'item_id': str(item_id)[:100],
+                'checked': bool(checked),
+                'version': 1,
+                'updated_at': now
+            })
+
+    for start in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(shopping_list_items_table, rows[start:start + BATCH_SIZE])
+
+    # L'état est désormais porté par la table
+    op.execute("UPDATE shopping_lists SET checked_items_json = '{}'")
+
+    print(f"✅ {len(rows)} cases reprises pour {len(shopping_lists)} listes")
+    print("🎉 Migration 009 terminée!")
+
+
+def downgrade() -> None:
+    """Retour de l'état coché dans checked_items_json puis suppression de la table"""
+
+    print("⏪ Restauration de checked_items_json...")
+
+    connection = op.get_bind()
+    states = connection.execute(
+        sa.text("SELECT shopping_list_id, item_id, checked FROM shopping_list_items")
+    ).fetchall()
+
+    checked_by_list = {}
+    for shopping_list_id, item_id, checked in states:
+        checked_by_list.setdefault(shopping_list_id, {})[item_id] = bool(checked)
+
+    for shopping_list_id, checked_items in checked_by_list.items():
+        connection.execute(
+            sa.text("UPDATE shopping_lists SET checked_items_json = :value WHERE id = :id"),
+            {'value': json.dumps(checked_items), 'id': shopping_list_id}
+        )
+
+    op.drop_index('ix_shopping_list_items_shopping_list_id', table_name='shopping_list_items')
+    op.drop_table('shopping_list_items')
+
+    print("✅ Table shopping_list_items supprimée")
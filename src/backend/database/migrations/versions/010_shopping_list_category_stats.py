@@ -0,0 +1,57 @@
+"""Shopping list per-category statistics counters
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-08-22
+
+Cette migration ajoute les compteurs de statistiques des listes de courses :
+- Création de la table shopping_list_category_stats (une ligne par catégorie)
+- Contrainte d'unicité (liste, catégorie) servant d'index aux mises à jour
+
+Les compteurs sont recalculés à la génération/régénération d'une liste et
+ajustés par un UPDATE atomique à chaque bascule d'article. Les listes
+existantes sont initialisées à leur première lecture des statistiques.
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Création de shopping_list_category_stats"""
+
+    print("📈 Migration 010 - Compteurs de statistiques des listes de courses...")
+
+    op.create_table(
+        'shopping_list_category_stats',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('shopping_list_id', sa.Integer, sa.ForeignKey('shopping_lists.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('category', sa.String(50), nullable=False),
+        sa.Column('total_items', sa.Integer, nullable=False, default=0),
+        sa.Column('completed_items', sa.Integer, nullable=False, default=0),
+        sa.Column('estimated_cost', sa.Float, nullable=False, default=0),
+        sa.UniqueConstraint('shopping_list_id', 'category', name='uq_shopping_list_category_stats')
+    )
+    op.create_index(
+        'ix_shopping_list_category_stats_shopping_list_id', 'shopping_list_category_stats', ['shopping_list_id']
+    )
+
+    print("🎉 Migration 010 terminée!")
+
+
+def downgrade() -> None:
+    """Suppression de shopping_list_category_stats"""
+
+    print("⏪ Suppression de la table shopping_list_category_stats...")
+
+    op.drop_index('ix_shopping_list_category_stats_shopping_list_id', table_name='shopping_list_category_stats')
+    op.drop_table('shopping_list_category_stats')
+
+    print("✅ Table shopping_list_category_stats supprimée")
@@ -0,0 +1,47 @@
+"""Extended nutrient vectors on ingredients and recipes
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-08-24
+
+Cette migration ajoute les nutriments complémentaires (fibres, sodium, sucres) :
+- ingredients.extra_nutrients_json : valeurs pour 100g ({nutriment: valeur})
+- recipes.nutrient_totals_json : totaux de la recette pour ces nutriments
+
+Une colonne JSON par table plutôt qu'une colonne par nutriment : ajouter un
+nutriment (Ingredient.EXTENDED_NUTRIENTS) ne demande pas de migration.
+Les totaux des recettes sont calculés par scripts/recompute_recipe_nutrition.py
+une fois les valeurs des ingrédients renseignées.
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Ajout des colonnes de nutriments complémentaires"""
+
+    print("🥦 Migration 011 - Nutriments complémentaires (fibres, sodium, sucres)...")
+
+    op.add_column('ingredients', sa.Column('extra_nutrients_json', sa.Text(), nullable=True))
+    op.add_column('recipes', sa.Column('nutrient_totals_json', sa.Text(), nullable=True))
+
+    print("🎉 Migration 011 terminée!")
+
+
+def downgrade() -> None:
+    """Suppression des colonnes de nutriments complémentaires"""
+
+    print("⏪ Suppression des nutriments complémentaires...")
+
+    op.drop_column('recipes', 'nutrient_totals_json')
+    op.drop_column('ingredients', 'extra_nutrients_json')
+
+    print("✅ Colonnes de nutriments complémentaires supprimées")
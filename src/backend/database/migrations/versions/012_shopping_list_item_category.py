@@ -0,0 +1,43 @@
+"""Category on shopping list item state rows
+
+Revision ID: 012
+Revises: 011
+Create Date: 2025-08-26
+
+Cette migration ajoute la catégorie de l'article aux lignes shopping_list_items :
+- Colonne shopping_list_items.category (nullable)
+
+Une bascule ajuste le compteur de la catégorie (shopping_list_category_stats)
+sans relire les articles JSON de la liste. Les lignes existantes reçoivent
+leur catégorie à leur prochaine bascule ou au recalcul des statistiques.
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Ajout de la catégorie des articles cochés"""
+
+    print("🏷️ Migration 012 - Catégorie des articles de listes de courses...")
+
+    op.add_column('shopping_list_items', sa.Column('category', sa.String(50), nullable=True))
+
+    print("🎉 Migration 012 terminée!")
+
+
+def downgrade() -> None:
+    """Suppression de la catégorie des articles cochés"""
+
+    print("⏪ Suppression de la catégorie des articles...")
+
+    op.drop_column('shopping_list_items', 'category')
+
+    print("✅ Colonne shopping_list_items.category supprimée")
@@ -82,6 +82,20 @@ def create_app(config_name=None):
     app.register_blueprint(diet_admin_bp, url_prefix=api_prefix)
     app.register_blueprint(withings_bp)  # Routes Withings avec /api/withings
     
+    # Historique des listes de courses écrit par lots (vidé à l'arrêt du processus)
+    if app.config.get('SHOPPING_HISTORY_WRITE_BEHIND'):
+        from services.shopping_history_writer import history_writer
+        history_writer.start(
+            app,
+            flush_interval=app.config.get('SHOPPING_HISTORY_FLUSH_INTERVAL'),
+            batch_size=app.config.get('SHOPPING_HISTORY_BATCH_SIZE')
+        )
+    
+    # Préchauffage du cache en arrière-plan (évite la latence des premières requêtes)
+    if app.config.get('CACHE_WARMUP_ON_STARTUP'):
+        from services.catalog_cache_service import catalog_cache
+        catalog_cache.start_background_warmup(app, app.config.get('CACHE_WARMUP_TIME_BUDGET'))
+    
     # Health check endpoint
     @app.route('/health')
     def health_check():
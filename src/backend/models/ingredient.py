@@ -1,5 +1,6 @@
 from database import db
 from datetime import datetime
+from utils.json_property import JSONProperty
 
 class Ingredient(db.Model):
     __tablename__ = 'ingredients'
@@ -14,9 +15,27 @@ class Ingredient(db.Model):
     carbs_per_100g = db.Column(db.Float, nullable=False)
     fat_per_100g = db.Column(db.Float, nullable=False)
     
+    # Nutriments complémentaires pour 100g, en JSON ({"fiber": 2.5, "sodium": 40})
+    extra_nutrients_json = db.Column(db.Text, nullable=True)
+    
     unit = db.Column(db.String(10), nullable=False, default='g')  # g, ml, piece
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Nutriments suivis en plus des macros (fibres en g, sodium en mg, sucres en g)
+    # Ajouter un nutriment ici suffit : il est stocké dans extra_nutrients_json
+    EXTENDED_NUTRIENTS = ('fiber', 'sodium', 'sugar')
+    
+    extra_nutrients = JSONProperty('extra_nutrients_json', dict)
+    
+    @classmethod
+    def extended_values(cls, nutrition, current=None):
+        """Nutriments complémentaires d'un dict nutrition_per_100g, fusionnés avec les valeurs actuelles"""
+        values = dict(current or {})
+        for nutrient in cls.EXTENDED_NUTRIENTS:
+            if nutrition.get(nutrient) is not None:
+                values[nutrient] = nutrition[nutrient]
+        return values
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -26,7 +45,8 @@ class Ingredient(db.Model):
                 'calories': self.calories_per_100g,
                 'protein': self.protein_per_100g,
                 'carbs': self.carbs_per_100g,
-                'fat': self.fat_per_100g
+                'fat': self.fat_per_100g,
+                **{nutrient: self.extra_nutrients.get(nutrient, 0) for nutrient in self.EXTENDED_NUTRIENTS}
             },
             'unit': self.unit,
             'created_at': self.created_at.isoformat() if self.created_at else None
@@ -35,7 +55,7 @@ class Ingredient(db.Model):
     @staticmethod
     def create_from_dict(data):
         nutrition = data.get('nutrition_per_100g', {})
-        return Ingredient(
+        ingredient = Ingredient(
             name=data['name'],
             category=data['category'],
             calories_per_100g=nutrition.get('calories', 0),
@@ -44,4 +64,8 @@ class Ingredient(db.Model):
             fat_per_100g=nutrition.get('fat', 0),
             unit=data.get('unit', 'g')
         )
+        extended = Ingredient.extended_values(nutrition)
+        if extended:
+            ingredient.extra_nutrients = extended
+        return ingredient
 
@@ -1,7 +1,7 @@
 from database import db
 from datetime import datetime, date
 from sqlalchemy.orm import relationship
-import json
+from utils.json_property import JSONProperty
 
 class MealPlan(db.Model):
     __tablename__ = 'meal_plans'
@@ -27,14 +27,8 @@ class MealPlan(db.Model):
     # US1.8 - Relations with meal tracking
     # Note: Relationship is handled through foreign key in MealTracking model
     
-    
-    @property
-    def meals(self):
-        return json.loads(self.meals_json) if self.meals_json else {}
-    
-    @meals.setter
-    def meals(self, value):
-        self.meals_json = json.dumps(value)
+    # Colonnes JSON exposées en valeurs Python (parsées une fois par valeur de colonne)
+    meals = JSONProperty('meals_json', dict)
     
     def to_dict(self):
         return {
@@ -53,6 +47,75 @@ class MealPlan(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    @staticmethod
+    def recipe_ids_in(meals):
+        """Ids des recettes d'un plan ({jour: {type de repas: recipe_id}}), valeurs invalides ignorées"""
+        recipe_ids = set()
+        for day_meals in (meals or {}).values():
+            if not isinstance(day_meals, dict):
+                continue
+            for recipe_id in day_meals.values():
+                try:
+                    if recipe_id:
+                        recipe_ids.add(int(recipe_id))
+                except (TypeError, ValueError):
+                    continue
+        return recipe_ids
+    
+    @staticmethod
+    def daily_nutrition(meals, recipe_macros):
+        """
+        Moyennes journalières d'un plan sur les jours ayant au moins un repas
+        
+        Args:
+            meals: Repas du plan ({jour: {type de repas: recipe_id}})
+            recipe_macros: {recipe_id: (calories, protéines, glucides, lipides)} (Recipe.macros_for_ids)
+        """
+        total_calories = 0
+        total_protein = 0
+        total_carbs = 0
+        total_fat = 0
+        day_count = 0
+        
+        for day, day_meals in meals.items():
+            day_calories = 0
+            day_protein = 0
+            day_carbs = 0
+            day_fat = 0
+            
+            for meal_type, recipe_id in day_meals.items():
+                try:
+                    macros = recipe_macros.get(int(recipe_id)) if recipe_id else None
+                except (TypeError, ValueError):
+                    macros = None
+                if macros:
+                    day_calories += macros[0]
+                    day_protein += macros[1]
+                    day_carbs += macros[2]
+                    day_fat += macros[3]
+            
+            if day_calories > 0:  # Jour avec au moins un repas
+                total_calories += day_calories
+                total_protein += day_protein
+                total_carbs += day_carbs
+                total_fat += day_fat
+                day_count += 1
+        
+        if day_count > 0:
+            return {
+                'daily_calories': round(total_calories / day_count, 1),
+                'daily_protein': round(total_protein / day_count, 1),
+                'daily_carbs': round(total_carbs / day_count, 1),
+                'daily_fat': round(total_fat / day_count, 1)
+            }
+        else:
+            return {
+                'daily_calories': 0,
+                'daily_protein': 0,
+                'daily_carbs': 0,
+                'daily_fat': 0
+            }
+    
     @staticmethod
     def create_from_dict(data):
         nutrition = data.get('nutrition_summary', {})
@@ -94,7 +157,8 @@ class ShoppingList(db.Model):
     items_json = db.Column(db.Text, nullable=False)
     
     # Nouveaux champs pour US1.5 - Liste Interactive
-    checked_items_json = db.Column(db.Text, default='{}')  # État des cases cochées
+    # Ancien stockage des cases cochées, repris dans shopping_list_items (voir ShoppingListItem)
+    checked_items_json = db.Column(db.Text, default='{}')
     aggregation_rules_json = db.Column(db.Text, nullable=True)  # Règles d'agrégation
     category_grouping_json = db.Column(db.Text, nullable=True)  # Groupement par rayon
     estimated_budget = db.Column(db.Float, nullable=True)  # Budget estimé
@@ -110,39 +174,80 @@ class ShoppingList(db.Model):
     
     # Relations
     meal_plan = db.relationship('MealPlan', backref=db.backref('shopping_lists', lazy=True))
+    # État coché de chaque article: une ligne par article, modifiable isolément
+    item_states = db.relationship('ShoppingListItem', cascade='all, delete-orphan', lazy=True)
+    # Compteurs par catégorie tenus à jour à chaque bascule (statistiques sans recalcul)
+    category_stats = db.relationship('ShoppingListCategoryStats', cascade='all, delete-orphan', lazy=True)
     
-    @property
-    def items(self):
-        return json.loads(self.items_json) if self.items_json else []
-    
-    @items.setter
-    def items(self, value):
-        self.items_json = json.dumps(value)
+    # Colonnes JSON exposées en valeurs Python (parsées une fois par valeur de colonne)
+    items = JSONProperty('items_json')
     
     # Nouvelles propriétés pour US1.5
+    aggregation_rules = JSONProperty('aggregation_rules_json', dict)
+    category_grouping = JSONProperty('category_grouping_json', dict)
+    
     @property
     def checked_items(self):
-        return json.loads(self.checked_items_json) if self.checked_items_json else {}
+        """État des cases cochées {item_id: bool}, lu depuis shopping_list_items"""
+        return {state.item_id: state.checked for state in self.item_states}
     
     @checked_items.setter
     def checked_items(self, value):
-        self.checked_items_json = json.dumps(value)
-    
-    @property
-    def aggregation_rules(self):
-        return json.loads(self.aggregation_rules_json) if self.aggregation_rules_json else {}
+        """Remplace l'état de toutes les cases (régénération, réinitialisation)"""
+        value = {str(item_id): bool(checked) for item_id, checked in (value or {}).items()}
+        states = {state.item_id: state for state in self.item_states}
+        
+        for item_id, state in states.items():
+            if item_id not in value:
+                self.item_states.remove(state)
+        
+        for item_id, checked in value.items():
+            state = states.get(item_id)
+            if state is None:
+                self.item_states.append(ShoppingListItem(item_id=item_id, checked=checked, version=1))
+            elif state.checked != checked:
+                state.checked = checked
+                state.version += 1
+        
+        self.refresh_statistics()
     
-    @aggregation_rules.setter
-    def aggregation_rules(self, value):
-        self.aggregation_rules_json = json.dumps(value)
+    def refresh_statistics(self):
+        """Recalcule les compteurs par catégorie depuis les articles et leur état coché"""
+        states = {state.item_id: state for state in self.item_states}
+        totals = {}
+        for item in self.items:
+            category = item.get('category', 'other')
+            values = totals.setdefault(category, {
+                'total_items': 0, 'completed_items': 0, 'estimated_cost': 0
+            })
+            values['total_items'] += 1
+            state = states.get(str(item.get('id', '')))
+            if state is not None:
+                # Catégorie gardée sur la ligne: une bascule ajuste son compteur sans relire les articles
+                if state.category != category:
+                    state.category = category
+                if state.checked:
+                    values['completed_items'] += 1
+            values['estimated_cost'] += (item.get('unit_price', 0) or 0) * item.get('quantity', 0)
+        
+        rows = {row.category: row for row in self.category_stats}
+        for category, row in rows.items():
+            if category not in totals:
+                self.category_stats.remove(row)
+        
+        for category, values in totals.items():
+            row = rows.get(category)
+            if row is None:
+                self.category_stats.append(ShoppingListCategoryStats(category=category, **values))
+            else:
+                row.total_items = values['total_items']
+                row.completed_items = values['completed_items']
+                row.estimated_cost = values['estimated_cost']
     
     @property
-    def category_grouping(self):
-        return json.loads(self.category_grouping_json) if self.category_grouping_json else {}
-    
-    @category_grouping.setter
-    def category_grouping(self, value):
-        self.category_grouping_json = json.dumps(value)
+    def item_versions(self):
+        """Version de chaque case cochée, pour les mises à jour optimistes {item_id: int}"""
+        return {state.item_id: state.version for state in self.item_states}
     
     def to_dict(self):
         return {
@@ -152,6 +257,7 @@ class ShoppingList(db.Model):
             'items': self.items,
             # Nouveaux champs US1.5
             'checked_items': self.checked_items,
+            'item_versions': self.item_versions,
             'aggregation_rules': self.aggregation_rules,
             'category_grouping': self.category_grouping,
             'estimated_budget': self.estimated_budget,
@@ -184,5 +290,104 @@ class ShoppingList(db.Model):
         )
         
         shopping_list.items = data.get('items', [])
+        if data.get('category_grouping') is not None:
+            shopping_list.category_grouping = data['category_grouping']
+        if data.get('aggregation_rules') is not None:
+            shopping_list.aggregation_rules = data['aggregation_rules']
+        shopping_list.estimated_budget = data.get('estimated_budget')
+        shopping_list.refresh_statistics()
         return shopping_list
 
+
+class ShoppingListItem(db.Model):
+    """
+    État coché d'un article de liste de courses
+    
+    Chaque case est une ligne indépendante: cocher un article est un UPDATE
+    d'une seule ligne, conditionné par sa version (verrouillage optimiste),
+    sans réécrire la liste ni écraser les cases cochées en parallèle.
+    """
+    __tablename__ = 'shopping_list_items'
+    __table_args__ = (
+        db.UniqueConstraint('shopping_list_id', 'item_id', name='uq_shopping_list_items_list_item'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    shopping_list_id = db.Column(
+        db.Integer, db.ForeignKey('shopping_lists.id', ondelete='CASCADE'), nullable=False, index=True
+    )
+    item_id = db.Column(db.String(100), nullable=False)  # ID stable de l'article (ex: ing_12_g)
+    category = db.Column(db.String(50), nullable=True)  # Catégorie de l'article (compteur à ajuster)
+    checked = db.Column(db.Boolean, nullable=False, default=False)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_by = db.Column(db.String(50), nullable=True)
+    
+    def to_dict(self):
+        return {
+            'item_id': self.item_id,
+            'checked': self.checked,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'updated_by': self.updated_by
+        }
+    
+    @classmethod
+    def backfill_from_json(cls):
+        """
+        Reprend dans la table les cases cochées encore stockées en JSON
+        (base créée par db.create_all sans passer par la migration 009)
+        
+        Returns:
+            int: Nombre de listes reprises
+        """
+        import json
+        
+        count = 0
+        lists = ShoppingList.query.filter(
+            ShoppingList.checked_items_json.isnot(None),
+            ShoppingList.checked_items_json != '{}',
+            ~ShoppingList.item_states.any()
+        ).all()
+        for shopping_list in lists:
+            try:
+                shopping_list.checked_items = json.loads(shopping_list.checked_items_json) or {}
+            except (TypeError, ValueError):
+                pass
+            shopping_list.checked_items_json = '{}'
+            count += 1
+        
+        db.session.commit()
+        return count
+
+
+class ShoppingListCategoryStats(db.Model):
+    """
+    Compteurs d'une catégorie d'articles d'une liste de courses
+    
+    Recalculés à la génération/régénération ; une bascule ne fait qu'un
+    UPDATE atomique de completed_items sur la ligne de la catégorie.
+    """
+    __tablename__ = 'shopping_list_category_stats'
+    __table_args__ = (
+        db.UniqueConstraint('shopping_list_id', 'category', name='uq_shopping_list_category_stats'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    shopping_list_id = db.Column(
+        db.Integer, db.ForeignKey('shopping_lists.id', ondelete='CASCADE'), nullable=False, index=True
+    )
+    category = db.Column(db.String(50), nullable=False)
+    total_items = db.Column(db.Integer, nullable=False, default=0)
+    completed_items = db.Column(db.Integer, nullable=False, default=0)
+    estimated_cost = db.Column(db.Float, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'total': self.total_items,
+            'completed': self.completed_items,
+            'estimated_cost': self.estimated_cost,
+            'completion_percentage': round(
+                (self.completed_items / self.total_items * 100) if self.total_items > 0 else 0, 1
+            )
+        }
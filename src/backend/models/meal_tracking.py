@@ -2,6 +2,8 @@ from database import db
 from datetime import datetime, date, time
 from sqlalchemy.orm import relationship
 from typing import Dict, Any, Optional, List
+from models.recipe import Recipe
+from utils.batch_loader import BatchLoader, batch_loader
 import json
 import enum
 
@@ -404,8 +406,9 @@ class MealTracking(db.Model):
     
     @staticmethod
     def create_from_meal_plan(user_id: int, meal_plan_id: int, meal_date: date,
-                             meal_type: str, recipe_id: Optional[int] = None) -> 'MealTracking':
-        """Create meal tracking entry from meal plan"""
+                             meal_type: str, recipe_id: Optional[int] = None,
+                             recipes: Optional[BatchLoader] = None) -> 'MealTracking':
+        """Create meal tracking entry from meal plan (recipes: loader with the day's recipe ids primed)"""
         tracking = MealTracking(
             user_id=user_id,
             meal_plan_id=meal_plan_id,
@@ -417,14 +420,17 @@ class MealTracking(db.Model):
         
         # If recipe_id provided, populate planned nutrition from recipe
         if recipe_id:
-            from models.recipe import Recipe
-            recipe = Recipe.query.get(recipe_id)
+            recipe = (recipes or batch_loader(Recipe)).load(recipe_id)
             if recipe:
                 tracking.meal_name = recipe.name
                 tracking.planned_calories = recipe.total_calories
                 tracking.planned_protein = recipe.total_protein
                 tracking.planned_carbs = recipe.total_carbs
                 tracking.planned_fat = recipe.total_fat
+                extended = recipe.extended_totals()
+                tracking.planned_fiber = extended['fiber']
+                tracking.planned_sodium = extended['sodium']
+                tracking.planned_sugar = extended['sugar']
         
         return tracking
 
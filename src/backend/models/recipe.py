@@ -1,6 +1,10 @@
 from database import db
 from datetime import datetime
-import json
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from models.ingredient import Ingredient
+from utils.json_property import JSONProperty
 
 class Recipe(db.Model):
     __tablename__ = 'recipes'
@@ -27,6 +31,9 @@ class Recipe(db.Model):
     total_carbs = db.Column(db.Float, default=0)
     total_fat = db.Column(db.Float, default=0)
     
+    # Totaux des nutriments complémentaires (Ingredient.EXTENDED_NUTRIENTS), en JSON
+    nutrient_totals_json = db.Column(db.Text, nullable=True)
+    
     # Ustensiles nécessaires
     utensils_json = db.Column(db.Text, nullable=True)
     
@@ -52,86 +59,28 @@ class Recipe(db.Model):
     # US1.8 - Relations with meal tracking
     # Note: Relationships are handled through foreign keys in MealTracking model
     
-    @property
-    def ingredients(self):
-        return json.loads(self.ingredients_json) if self.ingredients_json else []
-    
-    @ingredients.setter
-    def ingredients(self, value):
-        self.ingredients_json = json.dumps(value)
-    
-    @property
-    def instructions(self):
-        return json.loads(self.instructions_json) if self.instructions_json else []
-    
-    @instructions.setter
-    def instructions(self, value):
-        self.instructions_json = json.dumps(value)
-    
-    @property
-    def utensils(self):
-        return json.loads(self.utensils_json) if self.utensils_json else []
-    
-    @utensils.setter
-    def utensils(self, value):
-        self.utensils_json = json.dumps(value)
-    
-    @property
-    def tags(self):
-        return json.loads(self.tags_json) if self.tags_json else []
-    
-    @tags.setter
-    def tags(self, value):
-        self.tags_json = json.dumps(value)
+    # Copie normalisée de ingredients_json (synchronisée à chaque écriture, voir plus bas)
+    ingredient_rows = db.relationship(
+        'RecipeIngredient',
+        cascade='all, delete-orphan',
+        order_by='RecipeIngredient.position',
+        lazy=True
+    )
+    
+    # Colonnes JSON exposées en valeurs Python (parsées une fois par valeur de colonne)
+    ingredients = JSONProperty('ingredients_json')
+    instructions = JSONProperty('instructions_json')
+    utensils = JSONProperty('utensils_json')
+    tags = JSONProperty('tags_json')
+    nutrient_totals = JSONProperty('nutrient_totals_json', dict)
     
     # Propriétés pour les conseils de chef
-    @property
-    def chef_instructions(self):
-        return json.loads(self.chef_instructions_json) if self.chef_instructions_json else []
-    
-    @chef_instructions.setter
-    def chef_instructions(self, value):
-        self.chef_instructions_json = json.dumps(value)
-    
-    @property
-    def cooking_steps(self):
-        return json.loads(self.cooking_steps_json) if self.cooking_steps_json else []
-    
-    @cooking_steps.setter
-    def cooking_steps(self, value):
-        self.cooking_steps_json = json.dumps(value)
-    
-    @property
-    def chef_tips(self):
-        return json.loads(self.chef_tips_json) if self.chef_tips_json else []
-    
-    @chef_tips.setter
-    def chef_tips(self, value):
-        self.chef_tips_json = json.dumps(value)
-    
-    @property
-    def visual_cues(self):
-        return json.loads(self.visual_cues_json) if self.visual_cues_json else []
-    
-    @visual_cues.setter
-    def visual_cues(self, value):
-        self.visual_cues_json = json.dumps(value)
-    
-    @property
-    def timing_details(self):
-        return json.loads(self.timing_details_json) if self.timing_details_json else {}
-    
-    @timing_details.setter
-    def timing_details(self, value):
-        self.timing_details_json = json.dumps(value)
-    
-    @property
-    def media_references(self):
-        return json.loads(self.media_references_json) if self.media_references_json else []
-    
-    @media_references.setter
-    def media_references(self, value):
-        self.media_references_json = json.dumps(value)
+    chef_instructions = JSONProperty('chef_instructions_json')
+    cooking_steps = JSONProperty('cooking_steps_json')
+    chef_tips = JSONProperty('chef_tips_json')
+    visual_cues = JSONProperty('visual_cues_json')
+    timing_details = JSONProperty('timing_details_json', dict)
+    media_references = JSONProperty('media_references_json')
     
     def to_dict(self):
         return {
@@ -148,7 +97,8 @@ class Recipe(db.Model):
                 'calories': self.total_calories,
                 'protein': self.total_protein,
                 'carbs': self.total_carbs,
-                'fat': self.total_fat
+                'fat': self.total_fat,
+                **self.extended_totals()
             },
             'utensils': self.utensils,
             'tags': self.tags,
@@ -168,6 +118,11 @@ class Recipe(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    def extended_totals(self):
+        """Totaux des nutriments complémentaires (0 si non calculés)"""
+        totals = self.nutrient_totals
+        return {nutrient: totals.get(nutrient, 0) for nutrient in Ingredient.EXTENDED_NUTRIENTS}
+    
     @staticmethod
     def create_from_dict(data):
         nutrition = data.get('nutrition_total', {})
@@ -188,6 +143,10 @@ class Recipe(db.Model):
             has_chef_mode=data.get('has_chef_mode', False)
         )
         
+        extended = Ingredient.extended_values(nutrition)
+        if extended:
+            recipe.nutrient_totals = extended
+        
         # Champs de base
         recipe.ingredients = data.get('ingredients', [])
         recipe.instructions = data.get('instructions', [])
@@ -203,4 +162,149 @@ class Recipe(db.Model):
         recipe.media_references = data.get('media_references', [])
         
         return recipe
+    
+    @classmethod
+    def macros_for_ids(cls, recipe_ids):
+        """
+        Macros de plusieurs recettes en une requête
+        
+        Returns:
+            dict: {recipe_id: (calories, protéines, glucides, lipides)}, recettes inexistantes absentes
+        """
+        if not recipe_ids:
+            return {}
+        
+        rows = db.session.query(
+            cls.id, cls.total_calories, cls.total_protein, cls.total_carbs, cls.total_fat
+        ).filter(cls.id.in_(recipe_ids)).all()
+        return {
+            recipe_id: (calories or 0, protein or 0, carbs or 0, fat or 0)
+            for recipe_id, calories, protein, carbs, fat in rows
+        }
+
+
+class RecipeIngredient(db.Model):
+    """Ingrédient d'une recette (version normalisée de Recipe.ingredients_json)"""
+    __tablename__ = 'recipe_ingredients'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id', ondelete='CASCADE'), nullable=False)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredients.id', ondelete='CASCADE'), nullable=False)
+    quantity = db.Column(db.Float, nullable=False, default=0)
+    unit = db.Column(db.String(20), nullable=True)
+    position = db.Column(db.Integer, nullable=False, default=0)  # Ordre dans la recette
+    
+    # Index dans les deux sens : ingrédients d'une recette / recettes d'un ingrédient
+    __table_args__ = (
+        db.Index('idx_recipe_ingredients_recipe', 'recipe_id', 'ingredient_id'),
+        db.Index('idx_recipe_ingredients_ingredient', 'ingredient_id', 'recipe_id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'recipe_id': self.recipe_id,
+            'ingredient_id': self.ingredient_id,
+            'quantity': self.quantity,
+            'unit': self.unit,
+            'position': self.position
+        }
+    
+    @staticmethod
+    def parse_entries(ingredients, known_ingredient_ids):
+        """
+        Extrait les lignes normalisables d'une liste d'ingrédients JSON
+        
+        Les entrées sans ingredient_id, ou référençant un ingrédient inexistant,
+        restent uniquement dans le JSON.
+        
+        Returns:
+            list: Tuples (position, ingredient_id, quantity, unit)
+        """
+        entries = []
+        for position, item in enumerate(ingredients or []):
+            if not isinstance(item, dict):
+                continue
+            try:
+                ingredient_id = int(item.get('ingredient_id'))
+                quantity = float(item.get('quantity') or 0)
+            except (TypeError, ValueError):
+                continue
+            if ingredient_id in known_ingredient_ids:
+                entries.append((position, ingredient_id, quantity, item.get('unit')))
+        return entries
+    
+    @staticmethod
+    def _known_ingredient_ids(session, ingredients_lists):
+        """Retourne les ids d'ingrédients existants parmi ceux référencés"""
+        from models.ingredient import Ingredient
+        
+        referenced = set()
+        for ingredients in ingredients_lists:
+            for item in ingredients or []:
+                if isinstance(item, dict) and item.get('ingredient_id') is not None:
+                    try:
+                        referenced.add(int(item['ingredient_id']))
+                    except (TypeError, ValueError):
+                        continue
+        if not referenced:
+            return set()
+        
+        with session.no_autoflush:
+            rows = session.query(Ingredient.id).filter(Ingredient.id.in_(referenced)).all()
+        return {row[0] for row in rows}
+    
+    @classmethod
+    def sync_recipes(cls, session, recipes):
+        """Reconstruit les lignes normalisées des recettes depuis leur JSON"""
+        recipes = list(recipes)
+        known_ids = cls._known_ingredient_ids(session, [recipe.ingredients for recipe in recipes])
+        
+        for recipe in recipes:
+            recipe.ingredient_rows = [
+                cls(ingredient_id=ingredient_id, quantity=quantity, unit=unit, position=position)
+                for position, ingredient_id, quantity, unit in cls.parse_entries(recipe.ingredients, known_ids)
+            ]
+    
+    @classmethod
+    def backfill_missing(cls, batch_size=200):
+        """
+        Indexe les recettes qui n'ont encore aucune ligne normalisée
+        (base créée par db.create_all sans passer par la migration 008)
+        
+        Returns:
+            int: Nombre de recettes indexées
+        """
+        indexed_ids = db.session.query(cls.recipe_id).distinct()
+        recipes = Recipe.query.filter(~Recipe.id.in_(indexed_ids)).all()
+        # Aucune ligne existante : inutile de charger les collections
+        for recipe in recipes:
+            set_committed_value(recipe, 'ingredient_rows', [])
+        
+        count = 0
+        for start in range(0, len(recipes), batch_size):
+            batch = recipes[start:start + batch_size]
+            cls.sync_recipes(db.session, batch)
+            count += sum(1 for recipe in batch if recipe.ingredient_rows)
+            db.session.flush()
+        
+        db.session.commit()
+        return count
+    
+    @classmethod
+    def recipe_ids_for_ingredient(cls, ingredient_id):
+        """Retourne les ids des recettes utilisant un ingrédient (requête indexée)"""
+        rows = db.session.query(cls.recipe_id).filter(cls.ingredient_id == ingredient_id).distinct().all()
+        return [row[0] for row in rows]
+
 
+@event.listens_for(Session, 'before_flush')
+def _sync_recipe_ingredient_rows(session, flush_context, instances):
+    """Synchronise recipe_ingredients à chaque écriture de Recipe.ingredients_json"""
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Recipe) and (
+            obj in session.new or inspect(obj).attrs.ingredients_json.history.has_changes()
+        )
+    ]
+    if changed:
+        RecipeIngredient.sync_recipes(session, changed)
@@ -48,12 +48,13 @@ class ShoppingListHistory(db.Model):
         self.new_value = json.dumps(value) if value else None
     
     @property
-    def metadata(self):
+    def metadata_dict(self):
         """Retourne metadata_json en tant que dictionnaire"""
+        # (nom 'metadata' réservé par SQLAlchemy sur les modèles déclaratifs)
         return json.loads(self.metadata_json) if self.metadata_json else {}
     
-    @metadata.setter
-    def metadata(self, value):
+    @metadata_dict.setter
+    def metadata_dict(self, value):
         self.metadata_json = json.dumps(value) if value else None
     
     def to_dict(self):
@@ -67,7 +68,7 @@ class ShoppingListHistory(db.Model):
             'new_value': self.new_value_dict,
             'user_id': self.user_id,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
-            'metadata': self.metadata
+            'metadata': self.metadata_dict
         }
     
     @staticmethod
@@ -86,7 +87,7 @@ class ShoppingListHistory(db.Model):
         if 'new_value' in data:
             history_entry.new_value_dict = data['new_value']
         if 'metadata' in data:
-            history_entry.metadata = data['metadata']
+            history_entry.metadata_dict = data['metadata']
         
         return history_entry
     
@@ -120,7 +121,7 @@ class ShoppingListHistory(db.Model):
             if new_value is not None:
                 entry.new_value_dict = new_value
             if metadata is not None:
-                entry.metadata = metadata
+                entry.metadata_dict = metadata
             
             db.session.add(entry)
             db.session.commit()
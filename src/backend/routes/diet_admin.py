@@ -7,6 +7,7 @@ from database import db
 from models.diet_program import DietProgram, DietTracking, DietStreak
 from models.recipe import Recipe
 from models.ingredient import Ingredient
+from services.cache_service import cache_service
 from datetime import datetime
 import os
 import requests
@@ -83,6 +84,19 @@ def get_database_info():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@diet_admin_bp.route('/admin/cache-stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    """Statistiques du cache (succès, échecs, latences par préfixe) pour l'ajustement des TTL"""
+    try:
+        return jsonify({
+            'success': True,
+            'cache': cache_service.get_cache_statistics(),
+            'server_time': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @diet_admin_bp.route('/diet/admin/meals', methods=['GET'])
 @jwt_required()
 def get_all_meals():
@@ -1,9 +1,26 @@
 from flask import Blueprint, request, jsonify
+from marshmallow import ValidationError
 from database import db
 from models.ingredient import Ingredient
+from models.recipe import RecipeIngredient
+from services.catalog_cache_service import catalog_cache
+from services.ingredient_snapshot_service import ingredient_snapshot
+from services.recipe_nutrition_service import recipe_nutrition
+from schemas.recipe import ingredient_nutrition_schema
+import logging
+
+logger = logging.getLogger(__name__)
 
 ingredients_bp = Blueprint('ingredients', __name__)
 
+def propagate_ingredient_change(ingredient_id, recipe_ids=None):
+    """Recalcule les recettes (et plans de repas) dépendants ; l'écriture de l'ingrédient est déjà validée"""
+    try:
+        recipe_nutrition.propagate_ingredient_change(ingredient_id, recipe_ids)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Erreur propagation de l'ingrédient {ingredient_id} aux recettes: {e}")
+
 @ingredients_bp.route('/ingredients', methods=['GET'])
 def get_ingredients():
     """Récupérer tous les ingrédients avec filtres optionnels"""
@@ -12,16 +29,7 @@ def get_ingredients():
         category = request.args.get('category')
         search = request.args.get('search')
         
-        # Construction de la requête
-        query = Ingredient.query
-        
-        if category:
-            query = query.filter(Ingredient.category == category)
-        if search:
-            query = query.filter(Ingredient.name.contains(search))
-        
-        ingredients = query.order_by(Ingredient.name).all()
-        return jsonify([ingredient.to_dict() for ingredient in ingredients])
+        return jsonify(catalog_cache.get_ingredient_list(category, search))
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -48,6 +56,12 @@ def create_ingredient():
             if field not in data:
                 return jsonify({'error': f'Champ requis manquant: {field}'}), 400
         
+        # Validation des valeurs nutritionnelles (nombres positifs)
+        try:
+            data['nutrition_per_100g'] = ingredient_nutrition_schema.load(data['nutrition_per_100g'])
+        except ValidationError as e:
+            return jsonify({'error': 'Valeurs nutritionnelles invalides', 'details': e.messages}), 400
+        
         # Vérifier que l'ingrédient n'existe pas déjà
         existing = Ingredient.query.filter_by(name=data['name']).first()
         if existing:
@@ -56,6 +70,8 @@ def create_ingredient():
         ingredient = Ingredient.create_from_dict(data)
         db.session.add(ingredient)
         db.session.commit()
+        catalog_cache.invalidate_ingredients()
+        ingredient_snapshot.invalidate()
         
         return jsonify(ingredient.to_dict()), 201
     
@@ -80,13 +96,24 @@ def update_ingredient(ingredient_id):
         
         # Mise à jour des valeurs nutritionnelles
         if 'nutrition_per_100g' in data:
-            nutrition = data['nutrition_per_100g']
+            try:
+                nutrition = ingredient_nutrition_schema.load(data['nutrition_per_100g'])
+            except ValidationError as e:
+                return jsonify({'error': 'Valeurs nutritionnelles invalides', 'details': e.messages}), 400
             ingredient.calories_per_100g = nutrition.get('calories', ingredient.calories_per_100g)
             ingredient.protein_per_100g = nutrition.get('protein', ingredient.protein_per_100g)
             ingredient.carbs_per_100g = nutrition.get('carbs', ingredient.carbs_per_100g)
             ingredient.fat_per_100g = nutrition.get('fat', ingredient.fat_per_100g)
+            ingredient.extra_nutrients = Ingredient.extended_values(nutrition, ingredient.extra_nutrients)
         
         db.session.commit()
+        catalog_cache.invalidate_ingredients()
+        ingredient_snapshot.invalidate()
+        
+        # Recettes utilisant l'ingrédient (et leurs plans de repas) recalculées
+        if 'nutrition_per_100g' in data:
+            propagate_ingredient_change(ingredient_id)
+        
         return jsonify(ingredient.to_dict())
     
     except Exception as e:
@@ -98,8 +125,15 @@ def delete_ingredient(ingredient_id):
     """Supprimer un ingrédient"""
     try:
         ingredient = Ingredient.query.get_or_404(ingredient_id)
+        # Recettes dépendantes relevées avant que leurs lignes ne disparaissent
+        recipe_ids = RecipeIngredient.recipe_ids_for_ingredient(ingredient_id)
         db.session.delete(ingredient)
         db.session.commit()
+        catalog_cache.invalidate_ingredients()
+        ingredient_snapshot.invalidate()
+        
+        # Totaux des recettes recalculés sans l'ingrédient
+        propagate_ingredient_change(ingredient_id, recipe_ids)
         
         return jsonify({'message': 'Ingrédient supprimé avec succès'})
     
@@ -126,6 +160,18 @@ def create_bulk_ingredients():
         
         created_ingredients = []
         
+        # Validation de toutes les valeurs nutritionnelles avant la moindre écriture
+        errors = {}
+        for position, ingredient_data in enumerate(ingredients_data):
+            try:
+                ingredient_data['nutrition_per_100g'] = ingredient_nutrition_schema.load(
+                    ingredient_data.get('nutrition_per_100g') or {}
+                )
+            except ValidationError as e:
+                errors[position] = e.messages
+        if errors:
+            return jsonify({'error': 'Valeurs nutritionnelles invalides', 'details': errors}), 400
+        
         for ingredient_data in ingredients_data:
             # Vérifier que l'ingrédient n'existe pas déjà
             existing = Ingredient.query.filter_by(name=ingredient_data['name']).first()
@@ -135,6 +181,8 @@ def create_bulk_ingredients():
                 created_ingredients.append(ingredient)
         
         db.session.commit()
+        catalog_cache.invalidate_ingredients()
+        ingredient_snapshot.invalidate()
         
         return jsonify({
             'message': f'{len(created_ingredients)} ingrédients créés avec succès',
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from database import db
 from models.meal_plan import MealPlan, ShoppingList
 from models.recipe import Recipe
@@ -6,20 +6,22 @@ from models.ingredient import Ingredient
 from models.user import User
 from schemas.meal_plan import (
     meal_plan_schema, meal_plans_schema, meal_plan_update_schema,
-    meal_plan_generation_schema, meal_plan_query_schema,
+    meal_plan_generation_schema, meal_plan_query_schema, bulk_meal_plan_generation_schema,
     shopping_list_schema, shopping_lists_schema, shopping_list_update_schema,
     # Nouveaux schémas US1.5
     optimized_shopping_list_schema, optimized_shopping_lists_schema,
     item_toggle_schema, bulk_toggle_schema, regenerate_list_schema,
     aggregation_preferences_schema, shopping_list_export_schema,
+    shopping_list_stream_export_schema, consolidated_shopping_list_schema,
     shopping_list_statistics_schema, shopping_list_history_schema,
     shopping_list_histories_schema
 )
 from services.shopping_service import ShoppingService
+from services.cache_service import cache_service
+from services.meal_plan_generator import meal_plan_generator, NUTRIENTS, SCORE_WEIGHTS
+from services.bulk_meal_plan_service import bulk_meal_plan_service
 from datetime import datetime, date, timedelta
-from collections import defaultdict
 from marshmallow import ValidationError
-import random
 
 meal_plans_bp = Blueprint('meal_plans', __name__)
 
@@ -161,6 +163,7 @@ def update_meal_plan(plan_id):
         meal_plan.updated_at = datetime.utcnow()
         
         db.session.commit()
+        cache_service.invalidate_shopping_list_caches(plan_id)
         return jsonify(meal_plan_schema.dump(meal_plan))
     
     except Exception as e:
@@ -181,6 +184,7 @@ def delete_meal_plan(plan_id):
         
         db.session.delete(meal_plan)
         db.session.commit()
+        cache_service.invalidate_shopping_list_caches(plan_id)
         
         return jsonify({'message': 'Plan de repas supprimé avec succès'})
     
@@ -224,19 +228,28 @@ def generate_meal_plan():
                     'target_fat': user.daily_fat_target or data['target_fat']
                 }
         
-        # Générer le plan de repas optimisé
-        meals = generate_optimized_meal_plan(
-            nutritional_goals=nutritional_goals,
-            meal_types_to_include=data['meal_types_to_include'],
-            max_repeats=data['max_repeats'],
-            preferred_categories=data.get('preferred_categories')
-        )
+        # Générer le plan de repas optimisé (tirages vectorisés ou recuit simulé)
+        generation_options = {
+            'nutritional_goals': nutritional_goals,
+            'meal_types_to_include': data['meal_types_to_include'],
+            'max_repeats': data['max_repeats'],
+            'preferred_categories': data.get('preferred_categories'),
+            'seed': data.get('seed')
+        }
+        if data['optimizer'] == 'annealing':
+            generation = meal_plan_generator.optimize(
+                time_budget_ms=data['time_budget_ms'],
+                **generation_options
+            )
+        else:
+            generation = meal_plan_generator.generate(**generation_options)
         
-        if not meals:
+        if not generation:
             return jsonify({'error': 'Impossible de générer un plan de repas avec les critères donnés'}), 400
         
-        # Calculer la nutrition
-        nutrition_summary = calculate_meal_plan_nutrition(meals)
+        # Nutrition calculée par le générateur sur les macros déjà chargées
+        meals = generation['meals']
+        nutrition_summary = generation['nutrition']
         
         # Créer le plan de repas
         meal_plan_data = {
@@ -255,7 +268,11 @@ def generate_meal_plan():
             'generation_info': {
                 'target_nutrition': nutritional_goals,
                 'actual_nutrition': nutrition_summary,
-                'accuracy': calculate_nutrition_accuracy(nutritional_goals, nutrition_summary)
+                'accuracy': calculate_nutrition_accuracy(nutritional_goals, nutrition_summary),
+                'score': generation['score'],
+                'seed': generation['seed'],
+                'optimizer': data['optimizer'],
+                'convergence': generation.get('convergence')
             }
         }), 201
     
@@ -263,6 +280,36 @@ def generate_meal_plan():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@meal_plans_bp.route('/meal-plans/bulk-generate', methods=['POST'])
+def bulk_generate_meal_plans():
+    """Lancer la génération des plans de la semaine pour plusieurs utilisateurs"""
+    try:
+        # Validation des données avec Marshmallow
+        try:
+            data = bulk_meal_plan_generation_schema.load(request.get_json() or {})
+        except ValidationError as e:
+            return jsonify({'error': 'Données invalides', 'details': e.messages}), 400
+        
+        user_ids = data.pop('user_ids')
+        job = bulk_meal_plan_service.start(current_app._get_current_object(), user_ids, data)
+        
+        return jsonify({
+            'job': job.to_dict(),
+            'status_url': f'/api/meal-plans/bulk-generate/{job.id}'
+        }), 202
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@meal_plans_bp.route('/meal-plans/bulk-generate/<job_id>', methods=['GET'])
+def get_bulk_generation_status(job_id):
+    """Suivre la progression d'une génération en lot"""
+    job = bulk_meal_plan_service.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Génération en lot non trouvée'}), 404
+    
+    return jsonify({'job': job.to_dict()})
+
 @meal_plans_bp.route('/meal-plans/<int:plan_id>/shopping-list', methods=['POST'])
 def generate_shopping_list(plan_id):
     """Générer une liste de courses optimisée pour un plan de repas (US1.5)"""
@@ -315,6 +362,56 @@ def generate_shopping_list(plan_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@meal_plans_bp.route('/shopping-lists/consolidated', methods=['POST'])
+def generate_consolidated_shopping_list():
+    """Générer une seule liste de courses pour plusieurs plans de repas"""
+    try:
+        # Validation des données de requête
+        try:
+            data = consolidated_shopping_list_schema.load(request.get_json() or {})
+        except ValidationError as e:
+            return jsonify({'error': 'Données invalides', 'details': e.messages}), 400
+        
+        # Charger tous les plans en une requête (ordre de la requête conservé, doublons ignorés)
+        meal_plan_ids = list(dict.fromkeys(data['meal_plan_ids']))
+        plans_by_id = {plan.id: plan for plan in MealPlan.query.filter(MealPlan.id.in_(meal_plan_ids))}
+        missing_ids = [plan_id for plan_id in meal_plan_ids if plan_id not in plans_by_id]
+        if missing_ids:
+            return jsonify({'error': 'Plan de repas non trouvé', 'missing_ids': missing_ids}), 404
+        meal_plans = [plans_by_id[plan_id] for plan_id in meal_plan_ids]
+        
+        # Générer la liste consolidée en une passe
+        optimized_data = ShoppingService.generate_consolidated_shopping_list(
+            meal_plans,
+            data['aggregation_preferences']
+        )
+        
+        # Rattacher la liste au premier plan, à la semaine la plus ancienne
+        shopping_list = ShoppingList.create_from_dict({
+            'meal_plan_id': meal_plans[0].id,
+            'week_start': min(plan.week_start for plan in meal_plans),
+            'items': optimized_data['items'],
+            'category_grouping': optimized_data['category_grouping'],
+            'estimated_budget': optimized_data['estimated_budget'],
+            'aggregation_rules': optimized_data['aggregation_rules']
+        })
+        db.session.add(shopping_list)
+        db.session.commit()
+        
+        return jsonify({
+            'shopping_list': optimized_shopping_list_schema.dump(shopping_list),
+            'generation_info': {
+                **optimized_data['statistics'],
+                'meal_plan_ids': meal_plan_ids
+            }
+        }), 201
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @meal_plans_bp.route('/shopping-lists', methods=['GET'])
 def get_shopping_lists():
     """Récupérer toutes les listes de courses"""
@@ -363,6 +460,7 @@ def update_shopping_list(list_id):
         
         if 'items' in data:
             shopping_list.items = data['items']
+            shopping_list.refresh_statistics()
         if 'is_completed' in data:
             shopping_list.is_completed = data['is_completed']
         
@@ -374,137 +472,26 @@ def update_shopping_list(list_id):
         return jsonify({'error': str(e)}), 500
 
 def calculate_meal_plan_nutrition(meals):
-    """Calculer les valeurs nutritionnelles moyennes d'un plan de repas"""
-    total_calories = 0
-    total_protein = 0
-    total_carbs = 0
-    total_fat = 0
-    day_count = 0
+    """
+    Calculer les valeurs nutritionnelles moyennes d'un plan de repas
     
-    for day, day_meals in meals.items():
-        day_calories = 0
-        day_protein = 0
-        day_carbs = 0
-        day_fat = 0
-        
-        for meal_type, recipe_id in day_meals.items():
-            if recipe_id:
-                recipe = Recipe.query.get(recipe_id)
-                if recipe:
-                    day_calories += recipe.total_calories or 0
-                    day_protein += recipe.total_protein or 0
-                    day_carbs += recipe.total_carbs or 0
-                    day_fat += recipe.total_fat or 0
-        
-        if day_calories > 0:  # Jour avec au moins un repas
-            total_calories += day_calories
-            total_protein += day_protein
-            total_carbs += day_carbs
-            total_fat += day_fat
-            day_count += 1
-    
-    if day_count > 0:
-        return {
-            'daily_calories': round(total_calories / day_count, 1),
-            'daily_protein': round(total_protein / day_count, 1),
-            'daily_carbs': round(total_carbs / day_count, 1),
-            'daily_fat': round(total_fat / day_count, 1)
-        }
-    else:
-        return {
-            'daily_calories': 0,
-            'daily_protein': 0,
-            'daily_carbs': 0,
-            'daily_fat': 0
-        }
-
-def generate_optimized_meal_plan(nutritional_goals, meal_types_to_include, max_repeats=2, preferred_categories=None):
-    """Générer un plan de repas optimisé selon les objectifs nutritionnels"""
-    try:
-        # Récupérer toutes les recettes disponibles
-        recipes_query = Recipe.query
-        
-        # Filtrer par catégories préférées si spécifiées
-        if preferred_categories:
-            recipes_query = recipes_query.filter(Recipe.category.in_(preferred_categories))
-        
-        all_recipes = recipes_query.all()
-        
-        if not all_recipes:
-            return None
-        
-        # Organiser les recettes par type de repas
-        recipes_by_type = defaultdict(list)
-        for recipe in all_recipes:
-            if recipe.meal_type in meal_types_to_include:
-                recipes_by_type[recipe.meal_type].append(recipe)
-        
-        # Vérifier qu'on a des recettes pour chaque type demandé
-        for meal_type in meal_types_to_include:
-            if not recipes_by_type[meal_type]:
-                # Si aucune recette pour un type, utiliser toutes les recettes
-                recipes_by_type[meal_type] = all_recipes
-        
-        days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        
-        # Algorithme génétique simple pour l'optimisation
-        best_plan = None
-        best_score = float('inf')
-        
-        # Essayer plusieurs générations
-        for attempt in range(50):  # 50 tentatives pour trouver un bon plan
-            meals = {}
-            recipe_usage = defaultdict(int)
-            
-            # Générer les repas pour chaque jour
-            for day in days:
-                meals[day] = {}
-                for meal_type in meal_types_to_include:
-                    available_recipes = [
-                        recipe for recipe in recipes_by_type[meal_type]
-                        if recipe_usage[recipe.id] < max_repeats
-                    ]
-                    
-                    if not available_recipes:
-                        # Si toutes les recettes ont été utilisées max_repeats fois,
-                        # réinitialiser et permettre une utilisation supplémentaire
-                        available_recipes = recipes_by_type[meal_type]
-                    
-                    if available_recipes:
-                        selected_recipe = random.choice(available_recipes)
-                        meals[day][meal_type] = selected_recipe.id
-                        recipe_usage[selected_recipe.id] += 1
-            
-            # Évaluer ce plan
-            nutrition = calculate_meal_plan_nutrition(meals)
-            score = calculate_nutrition_score(nutritional_goals, nutrition)
-            
-            if score < best_score:
-                best_score = score
-                best_plan = meals.copy()
-                
-                # Si le score est très bon, on peut s'arrêter
-                if score < 0.1:  # Moins de 10% d'écart
-                    break
-        
-        return best_plan
-    
-    except Exception as e:
-        print(f"Erreur lors de la génération du plan optimisé: {e}")
-        return None
+    Les macros de toutes les recettes du plan sont lues en une requête,
+    quel que soit le nombre de repas.
+    """
+    recipe_macros = Recipe.macros_for_ids(MealPlan.recipe_ids_in(meals))
+    return MealPlan.daily_nutrition(meals, recipe_macros)
 
 def calculate_nutrition_score(target, actual):
     """Calculer un score d'écart entre les objectifs et les valeurs actuelles"""
     try:
         # Calculer l'écart relatif pour chaque nutriment
-        calories_diff = abs(target['target_calories'] - actual['daily_calories']) / target['target_calories']
-        protein_diff = abs(target['target_protein'] - actual['daily_protein']) / target['target_protein']
-        carbs_diff = abs(target['target_carbs'] - actual['daily_carbs']) / target['target_carbs']
-        fat_diff = abs(target['target_fat'] - actual['daily_fat']) / target['target_fat']
-        
-        # Score pondéré (les calories ont plus d'importance)
-        score = (calories_diff * 0.4 + protein_diff * 0.25 + carbs_diff * 0.2 + fat_diff * 0.15)
-        return score
+        diffs = [
+            abs(target[f'target_{nutrient}'] - actual[f'daily_{nutrient}']) / target[f'target_{nutrient}']
+            for nutrient in NUTRIENTS
+        ]
+        
+        # Score pondéré, mêmes poids que le générateur (les calories ont plus d'importance)
+        return sum(diff * weight for diff, weight in zip(diffs, SCORE_WEIGHTS.tolist()))
     except (ZeroDivisionError, KeyError):
         return float('inf')
 
@@ -556,18 +543,28 @@ def toggle_shopping_item(list_id, item_id):
         data = request.get_json() or {}
         checked = data.get('checked', False)
         user_id = data.get('user_id')
+        expected_version = data.get('version')  # Version de l'article connue du client
         
-        # Utiliser le service pour mettre à jour l'état
-        success = ShoppingService.update_item_status(
+        # UPDATE atomique de la seule ligne de l'article
+        result = ShoppingService.toggle_item(
             shopping_list, 
             item_id, 
             checked, 
+            expected_version,
             user_id
         )
         
-        if success:
+        if result.get('not_found'):
+            return jsonify({'error': 'Article non trouvé dans la liste'}), 404
+        if result['conflict']:
+            return jsonify({
+                'error': 'Article modifié entre-temps, rechargez la liste',
+                'item': result['item']
+            }), 409
+        if result['success']:
             return jsonify({
                 'success': True,
+                'item': result['item'],
                 'shopping_list': optimized_shopping_list_schema.dump(shopping_list)
             })
         else:
@@ -591,11 +588,13 @@ def regenerate_shopping_list(list_id):
         # Récupérer les options de régénération
         data = request.get_json() or {}
         preserve_checked = data.get('preserve_checked_items', True)
+        incremental = data.get('incremental', True)
         
         # Régénérer avec le service
         result = ShoppingService.regenerate_shopping_list(
             shopping_list, 
-            preserve_checked
+            preserve_checked,
+            incremental
         )
         
         if result['success']:
@@ -687,26 +686,31 @@ def bulk_toggle_items(list_id):
         if not items_to_update:
             return jsonify({'error': 'Aucun article à mettre à jour'}), 400
         
-        # Mettre à jour en batch
+        # Mettre à jour en batch (une ligne par article)
         success_count = 0
+        conflicts = []
         for item_update in items_to_update:
             item_id = item_update.get('item_id')
             checked = item_update.get('checked', False)
             
             if item_id:
-                success = ShoppingService.update_item_status(
+                result = ShoppingService.toggle_item(
                     shopping_list, 
                     item_id, 
                     checked, 
+                    item_update.get('version'),
                     user_id
                 )
-                if success:
+                if result['success']:
                     success_count += 1
+                elif result['conflict']:
+                    conflicts.append(result['item'])
         
         return jsonify({
             'success': True,
             'updated_items': success_count,
             'total_items': len(items_to_update),
+            'conflicts': conflicts,
             'shopping_list': optimized_shopping_list_schema.dump(shopping_list)
         })
     
@@ -731,8 +735,10 @@ def get_shopping_list_history(list_id):
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
         
-        # Récupérer l'historique
+        # Récupérer l'historique (actions encore en file incluses)
         from models.shopping_history import ShoppingListHistory
+        from services.shopping_history_writer import history_writer
+        history_writer.flush()
         
         history_query = ShoppingListHistory.query.filter_by(
             shopping_list_id=list_id
@@ -793,6 +799,70 @@ def prepare_shopping_list_export(list_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@meal_plans_bp.route('/shopping-lists/<int:list_id>/export/stream', methods=['POST'])
+def stream_shopping_list_export(list_id):
+    """Télécharger une liste de courses en streaming (txt, csv, jsonl)"""
+    try:
+        # Validation de l'ID
+        if list_id <= 0:
+            return jsonify({'error': 'ID de liste invalide'}), 400
+        
+        shopping_list = ShoppingList.query.get(list_id)
+        if not shopping_list:
+            return jsonify({'error': 'Liste de courses non trouvée'}), 404
+        
+        # Validation des données de requête
+        try:
+            data = shopping_list_stream_export_schema.load(request.get_json() or {})
+        except ValidationError as e:
+            return jsonify({'error': 'Données invalides', 'details': e.messages}), 400
+        
+        filename = f"liste_courses_{shopping_list.week_start.strftime('%Y%m%d')}.{data['format']}"
+        return stream_export_response([shopping_list], data['format'], False, filename)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@meal_plans_bp.route('/shopping-lists/export/stream', methods=['POST'])
+def stream_shopping_lists_export():
+    """Télécharger plusieurs listes de courses en streaming, éventuellement fusionnées"""
+    try:
+        # Validation des données de requête
+        try:
+            data = shopping_list_stream_export_schema.load(request.get_json() or {})
+        except ValidationError as e:
+            return jsonify({'error': 'Données invalides', 'details': e.messages}), 400
+        
+        if not data['list_ids'] and not data['start_date']:
+            return jsonify({'error': 'list_ids ou start_date requis'}), 400
+        
+        # Seules les listes de l'utilisateur sont exportées
+        if not data['user_id']:
+            return jsonify({'error': 'user_id requis'}), 400
+        
+        shopping_lists = ShoppingService.iter_shopping_lists(
+            user_id=data['user_id'],
+            list_ids=data['list_ids'],
+            start_date=data['start_date'],
+            end_date=data['end_date']
+        )
+        
+        suffix = 'fusion' if data['merge'] else 'export'
+        filename = f"listes_courses_{suffix}_{datetime.utcnow().strftime('%Y%m%d')}.{data['format']}"
+        return stream_export_response(shopping_lists, data['format'], data['merge'], filename)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def stream_export_response(shopping_lists, export_format, merge, filename):
+    """Réponse HTTP écrite au fil de l'export (la session reste ouverte pendant le streaming)"""
+    chunks = ShoppingService.stream_export(shopping_lists, export_format, merge)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=ShoppingService._get_mime_type(export_format),
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @meal_plans_bp.route('/shopping-lists/categories', methods=['GET'])
 def get_store_categories():
     """Récupérer les catégories de rayons de magasin disponibles"""
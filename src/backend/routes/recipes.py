@@ -11,6 +11,10 @@ from schemas.recipe import (
 )
 from services.nutrition_calculator_service import nutrition_calculator
 from services.portion_adjustment_service import portion_adjustment
+from services.cache_service import cache_service
+from services.catalog_cache_service import catalog_cache
+from services.ingredient_snapshot_service import ingredient_snapshot
+from utils.batch_loader import batch_loader
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,66 +31,7 @@ def get_recipes():
         except ValidationError as err:
             return jsonify({'error': 'Paramètres de requête invalides', 'messages': err.messages}), 400
         
-        # Construction de la requête de base
-        query = Recipe.query
-        
-        # Filtres
-        if args.get('category'):
-            query = query.filter(Recipe.category == args['category'])
-        if args.get('meal_type'):
-            query = query.filter(Recipe.meal_type == args['meal_type'])
-        if args.get('search'):
-            search_term = f"%{args['search']}%"
-            query = query.filter(Recipe.name.ilike(search_term))
-        if args.get('max_calories'):
-            query = query.filter(Recipe.total_calories <= args['max_calories'])
-        if args.get('max_time'):
-            query = query.filter((Recipe.prep_time + Recipe.cook_time) <= args['max_time'])
-        if args.get('is_favorite') is not None:
-            query = query.filter(Recipe.is_favorite == args['is_favorite'])
-        if args.get('tags'):
-            # Filtrer par tags (recherche partielle dans le JSON)
-            tags = [tag.strip() for tag in args['tags'].split(',')]
-            for tag in tags:
-                query = query.filter(Recipe.tags_json.contains(tag))
-        if args.get('difficulty_level'):
-            query = query.filter(Recipe.difficulty_level == args['difficulty_level'])
-        if args.get('has_chef_mode') is not None:
-            query = query.filter(Recipe.has_chef_mode == args['has_chef_mode'])
-        
-        # Tri
-        sort_field = getattr(Recipe, args.get('sort_by', 'created_at'))
-        if args.get('order', 'desc') == 'desc':
-            query = query.order_by(desc(sort_field))
-        else:
-            query = query.order_by(asc(sort_field))
-        
-        # Pagination
-        page = args.get('page', 1)
-        per_page = args.get('per_page', 20)
-        
-        paginated_recipes = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
-        # Sérialisation des résultats
-        recipes_data = recipes_schema.dump(paginated_recipes.items)
-        
-        return jsonify({
-            'recipes': recipes_data,
-            'pagination': {
-                'page': paginated_recipes.page,
-                'per_page': paginated_recipes.per_page,
-                'total': paginated_recipes.total,
-                'pages': paginated_recipes.pages,
-                'has_prev': paginated_recipes.has_prev,
-                'has_next': paginated_recipes.has_next,
-                'prev_num': paginated_recipes.prev_num,
-                'next_num': paginated_recipes.next_num
-            }
-        })
+        return jsonify(catalog_cache.get_recipe_list(args))
     
     except Exception as e:
         return jsonify({'error': 'Erreur interne du serveur', 'message': str(e)}), 500
@@ -130,6 +75,7 @@ def create_recipe():
         recipe = Recipe.create_from_dict(validated_data)
         db.session.add(recipe)
         db.session.commit()
+        catalog_cache.invalidate_recipes()
         
         return jsonify(recipe_schema.dump(recipe)), 201
     
@@ -169,6 +115,7 @@ def update_recipe(recipe_id):
                 recipe.total_protein = nutrition['protein']
                 recipe.total_carbs = nutrition['carbs']
                 recipe.total_fat = nutrition['fat']
+                recipe.nutrient_totals = Ingredient.extended_values(nutrition)
             elif field == 'instructions':
                 recipe.instructions = value
             elif field == 'utensils':
@@ -192,6 +139,10 @@ def update_recipe(recipe_id):
                 setattr(recipe, field, value)
         
         db.session.commit()
+        cache_service.invalidate_tags(
+            cache_service.make_tag(cache_service.TAG_RECIPE, recipe_id),
+            cache_service.TAG_RECIPE_CATALOG
+        )
         return jsonify(recipe_schema.dump(recipe))
     
     except Exception as e:
@@ -208,6 +159,10 @@ def delete_recipe(recipe_id):
         
         db.session.delete(recipe)
         db.session.commit()
+        cache_service.invalidate_tags(
+            cache_service.make_tag(cache_service.TAG_RECIPE, recipe_id),
+            cache_service.TAG_RECIPE_CATALOG
+        )
         
         return jsonify({'message': 'Recette supprimée avec succès'}), 200
     
@@ -225,6 +180,7 @@ def toggle_favorite(recipe_id):
         
         recipe.is_favorite = not recipe.is_favorite
         db.session.commit()
+        catalog_cache.invalidate_recipes()
         
         return jsonify({
             'message': 'Statut favori mis à jour',
@@ -247,14 +203,17 @@ def get_cooking_guide(recipe_id):
         if not recipe.has_chef_mode:
             return jsonify({'error': 'Cette recette n\'a pas de mode chef disponible'}), 404
         
-        # Enrichir les ingrédients avec leurs noms
+        # Enrichir les ingrédients avec leurs noms (une requête pour tous)
+        loader = batch_loader(Ingredient).prime(
+            ing_data.get('ingredient_id') for ing_data in recipe.ingredients
+        )
         enriched_ingredients = []
         for ing_data in recipe.ingredients:
             ingredient_info = dict(ing_data)  # Copier les données existantes
             ingredient_id = ing_data.get('ingredient_id')
             
             if ingredient_id:
-                ingredient = Ingredient.query.get(ingredient_id)
+                ingredient = loader.load(ingredient_id)
                 if ingredient:
                     ingredient_info['name'] = ingredient.name
                 else:
@@ -288,32 +247,9 @@ def get_cooking_guide(recipe_id):
         return jsonify({'error': 'Erreur interne du serveur', 'message': str(e)}), 500
 
 def calculate_recipe_nutrition(ingredients_list):
-    """Calculer les valeurs nutritionnelles d'une recette"""
-    total_calories = 0
-    total_protein = 0
-    total_carbs = 0
-    total_fat = 0
-    
-    for ingredient_data in ingredients_list:
-        ingredient_id = ingredient_data.get('ingredient_id')
-        quantity = ingredient_data.get('quantity', 0)
-        
-        if ingredient_id:
-            ingredient = Ingredient.query.get(ingredient_id)
-            if ingredient:
-                # Calcul basé sur la quantité (supposée en grammes)
-                factor = quantity / 100.0
-                total_calories += ingredient.calories_per_100g * factor
-                total_protein += ingredient.protein_per_100g * factor
-                total_carbs += ingredient.carbs_per_100g * factor
-                total_fat += ingredient.fat_per_100g * factor
-    
-    return {
-        'calories': round(total_calories, 1),
-        'protein': round(total_protein, 1),
-        'carbs': round(total_carbs, 1),
-        'fat': round(total_fat, 1)
-    }
+    """Calculer les valeurs nutritionnelles d'une recette (quantités supposées en grammes)"""
+    totals = ingredient_snapshot.recipe_nutrition(ingredients_list)
+    return {nutrient: round(value, 1) for nutrient, value in totals.items()}
 
 
 # ===== ROUTES US1.7 : AJUSTEMENT AUTOMATIQUE DES PORTIONS =====
@@ -562,19 +498,20 @@ def get_nutrition_adjusted_recipes(user_id):
         # Calcul du profil nutritionnel utilisateur
         nutrition_profile = nutrition_calculator.calculate_nutrition_profile(user)
         
-        # Ajustement et scoring des recettes
+        # Ajustement des recettes en un seul lot (lecture de cache groupée)
+        adjustments = portion_adjustment.adjust_recipes_for_user(
+            recipes, user, meal_type, nutrition_profile
+        )
+        
+        # Scoring des recettes
         scored_recipes = []
         
         for recipe in recipes:
+            adjustment = adjustments.get(recipe.id)
+            if adjustment is None:
+                continue
+            
             try:
-                # Ajustement de la recette
-                adjustment = portion_adjustment.adjust_recipe_for_user(
-                    recipe=recipe,
-                    user=user,
-                    target_meal_type=meal_type,
-                    nutrition_profile=nutrition_profile
-                )
-                
                 # Calcul d'un score de pertinence
                 score = calculate_recipe_relevance_score(
                     recipe, user, adjustment, nutrition_profile, meal_type
@@ -239,6 +239,7 @@ def update_user_profile(user_id):
         db.session.commit()
         
         # Recalculer le profil nutritionnel avec les nouvelles données
+        nutrition_calculator.invalidate_cached_profiles(user.id)
         nutrition_profile = nutrition_calculator.calculate_nutrition_profile(user, force_recalculate=True)
         
         # Retourner le profil mis à jour
@@ -392,6 +393,7 @@ def add_weight_entry(user_id):
             
             # Invalider le cache nutritionnel pour forcer le recalcul
             user.invalidate_cache()
+            nutrition_calculator.invalidate_cached_profiles(user.id)
         
         db.session.commit()
         
@@ -129,6 +129,26 @@ class MealPlanGenerationSchema(Schema):
         fields.String(validate=validate.OneOf(['breakfast', 'lunch', 'dinner', 'snack'])),
         allow_none=True
     )
+    seed = fields.Integer(allow_none=True, validate=validate.Range(min=0, max=2**32 - 1))  # Génération reproductible
+    optimizer = fields.String(
+        validate=validate.OneOf(['sampling', 'annealing']),
+        load_default='sampling'
+    )
+    time_budget_ms = fields.Integer(  # Budget de la recherche locale (optimizer='annealing')
+        validate=validate.Range(min=10, max=5000),
+        load_default=200
+    )
+
+class BulkMealPlanGenerationSchema(MealPlanGenerationSchema):
+    """Schéma pour la génération des plans de plusieurs utilisateurs"""
+    user_ids = fields.List(
+        fields.Integer(validate=validate.Range(min=1)),
+        required=True,
+        validate=validate.Length(min=1, max=1000)
+    )
+    
+    class Meta:
+        exclude = ('user_id',)
 
 class MealPlanQuerySchema(Schema):
     """Schéma pour les paramètres de requête des plans de repas"""
@@ -221,7 +241,8 @@ class AggregationRulesSchema(Schema):
     total_raw_items = fields.Integer(validate=validate.Range(min=0))
     total_optimized_items = fields.Integer(validate=validate.Range(min=0))
     conversion_rules_applied = fields.List(fields.String())
-    timestamp = fields.DateTime(format='iso8601')
+    timestamp = fields.String()  # Date ISO 8601, stockée telle quelle dans le JSON
+    meal_plan_ids = fields.List(fields.Integer())  # Plans d'une liste consolidée
     version = fields.String(load_default='1.0')
 
 class ShoppingListStatisticsSchema(Schema):
@@ -239,6 +260,7 @@ class OptimizedShoppingListSchema(Schema):
     # Nouvelles propriétés US1.5
     items = fields.List(fields.Nested(OptimizedShoppingItemSchema), required=True)
     checked_items = fields.Dict(keys=fields.String(), values=fields.Boolean(), load_default=dict)
+    item_versions = fields.Dict(keys=fields.String(), values=fields.Integer(), dump_only=True)
     category_grouping = fields.Nested(CategoryGroupingSchema, load_default=dict)
     aggregation_rules = fields.Nested(AggregationRulesSchema, allow_none=True)
     estimated_budget = fields.Float(allow_none=True, validate=validate.Range(min=0))
@@ -254,11 +276,13 @@ class ItemToggleSchema(Schema):
     """Schéma pour cocher/décocher un article"""
     checked = fields.Boolean(required=True)
     user_id = fields.String(allow_none=True, validate=validate.Length(min=1, max=50))
+    version = fields.Integer(allow_none=True, validate=validate.Range(min=0))  # Version connue de l'article
 
 class BulkToggleItemSchema(Schema):
     """Schéma pour un article dans une mise à jour groupée"""
     item_id = fields.String(required=True)
     checked = fields.Boolean(required=True)
+    version = fields.Integer(allow_none=True, validate=validate.Range(min=0))
 
 class BulkToggleSchema(Schema):
     """Schéma pour les mises à jour groupées d'articles"""
@@ -272,6 +296,16 @@ class BulkToggleSchema(Schema):
 class RegenerateListSchema(Schema):
     """Schéma pour la régénération d'une liste de courses"""
     preserve_checked_items = fields.Boolean(load_default=True)
+    incremental = fields.Boolean(load_default=True)
+    aggregation_preferences = fields.Dict(load_default=dict)
+
+class ConsolidatedShoppingListSchema(Schema):
+    """Schéma pour la génération d'une liste consolidée sur plusieurs plans de repas"""
+    meal_plan_ids = fields.List(
+        fields.Integer(validate=validate.Range(min=1)),
+        required=True,
+        validate=validate.Length(min=1, max=12)
+    )
     aggregation_preferences = fields.Dict(load_default=dict)
 
 class AggregationPreferencesSchema(Schema):
@@ -290,6 +324,18 @@ class ShoppingListExportSchema(Schema):
     include_metadata = fields.Boolean(load_default=True)
     include_checked_items = fields.Boolean(load_default=True)
 
+class ShoppingListStreamExportSchema(Schema):
+    """Schéma pour l'export en streaming d'une ou plusieurs listes de courses"""
+    format = fields.String(
+        validate=validate.OneOf(['txt', 'csv', 'jsonl']),
+        load_default='txt'
+    )
+    list_ids = fields.List(fields.Integer(validate=validate.Range(min=1)), load_default=list)
+    user_id = fields.Integer(validate=validate.Range(min=1), allow_none=True, load_default=None)
+    start_date = fields.Date(allow_none=True, load_default=None)
+    end_date = fields.Date(allow_none=True, load_default=None)
+    merge = fields.Boolean(load_default=False)
+
 class ShoppingListHistorySchema(Schema):
     """Schéma pour l'historique des modifications"""
     id = fields.Integer(dump_only=True)
@@ -298,17 +344,18 @@ class ShoppingListHistorySchema(Schema):
         'item_checked', 'item_unchecked', 'regenerated', 'created', 'bulk_update'
     ]))
     item_id = fields.String(allow_none=True)
-    old_value = fields.Dict(allow_none=True)
-    new_value = fields.Dict(allow_none=True)
+    old_value = fields.Dict(attribute='old_value_dict', allow_none=True)
+    new_value = fields.Dict(attribute='new_value_dict', allow_none=True)
     user_id = fields.String(allow_none=True)
     timestamp = fields.DateTime(dump_only=True, format='iso8601')
-    metadata_json = fields.Dict(allow_none=True)
+    metadata_json = fields.Dict(attribute='metadata_dict', allow_none=True)
 
 # Instances des schémas
 meal_plan_schema = MealPlanSchema()
 meal_plans_schema = MealPlanSchema(many=True)
 meal_plan_update_schema = MealPlanUpdateSchema()
 meal_plan_generation_schema = MealPlanGenerationSchema()
+bulk_meal_plan_generation_schema = BulkMealPlanGenerationSchema()
 meal_plan_query_schema = MealPlanQuerySchema()
 
 shopping_list_schema = ShoppingListSchema()
@@ -321,8 +368,10 @@ optimized_shopping_lists_schema = OptimizedShoppingListSchema(many=True)
 item_toggle_schema = ItemToggleSchema()
 bulk_toggle_schema = BulkToggleSchema()
 regenerate_list_schema = RegenerateListSchema()
+consolidated_shopping_list_schema = ConsolidatedShoppingListSchema()
 aggregation_preferences_schema = AggregationPreferencesSchema()
 shopping_list_export_schema = ShoppingListExportSchema()
+shopping_list_stream_export_schema = ShoppingListStreamExportSchema()
 shopping_list_statistics_schema = ShoppingListStatisticsSchema()
 shopping_list_history_schema = ShoppingListHistorySchema()
 shopping_list_histories_schema = ShoppingListHistorySchema(many=True)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields, validate, ValidationError, post_load, pre_dump
+from marshmallow import Schema, fields, validate, ValidationError, post_load, pre_dump, EXCLUDE
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
 from models.recipe import Recipe
 
@@ -20,6 +20,9 @@ class NutritionSchema(Schema):
     protein = fields.Float(validate=validate.Range(min=0), allow_none=True)
     carbs = fields.Float(validate=validate.Range(min=0), allow_none=True)
     fat = fields.Float(validate=validate.Range(min=0), allow_none=True)
+    fiber = fields.Float(validate=validate.Range(min=0), allow_none=True)
+    sodium = fields.Float(validate=validate.Range(min=0), allow_none=True)
+    sugar = fields.Float(validate=validate.Range(min=0), allow_none=True)
 
 # Schemas pour les conseils de chef (US1.4)
 class CookingStepSchema(Schema):
@@ -159,7 +162,8 @@ class RecipeSchema(Schema):
                 'calories': obj.total_calories,
                 'protein': obj.total_protein,
                 'carbs': obj.total_carbs,
-                'fat': obj.total_fat
+                'fat': obj.total_fat,
+                **obj.extended_totals()
             }
         return obj
     
@@ -216,4 +220,6 @@ class RecipeQuerySchema(Schema):
 recipe_schema = RecipeSchema()
 recipes_schema = RecipeSchema(many=True)
 recipe_update_schema = RecipeUpdateSchema()
-recipe_query_schema = RecipeQuerySchema()
\ No newline at end of file
+recipe_query_schema = RecipeQuerySchema()
+# Valeurs pour 100g d'un ingrédient (clés inconnues ignorées, comme avant la validation)
+ingredient_nutrition_schema = NutritionSchema(unknown=EXCLUDE)
\ No newline at end of file
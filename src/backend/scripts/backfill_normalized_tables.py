@@ -0,0 +1,43 @@
+"""
+Script de reprise des données antérieures aux tables normalisées
+
+Les migrations 008 et 009 remplissent recipe_ingredients et shopping_list_items.
+Ce script fait la même reprise pour une base créée par db.create_all() sans
+passer par les migrations. À lancer une fois après la mise à jour ; il peut
+être relancé sans effet (seules les données non reprises sont traitées).
+
+Exemple:
+    python scripts/backfill_normalized_tables.py
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app
+from database import db
+from models.recipe import RecipeIngredient
+from models.meal_plan import ShoppingListItem
+
+
+def backfill_normalized_tables():
+    """Crée les tables manquantes puis reprend recettes et cases cochées"""
+    db.create_all()
+
+    indexed = RecipeIngredient.backfill_missing()
+    print(f"✅ {indexed} recette(s) indexée(s) dans recipe_ingredients")
+
+    migrated = ShoppingListItem.backfill_from_json()
+    print(f"✅ {migrated} liste(s) de courses reprise(s) dans shopping_list_items")
+    return True
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        try:
+            success = backfill_normalized_tables()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Erreur lors de la reprise: {e}")
+            success = False
+    sys.exit(0 if success else 1)
@@ -0,0 +1,79 @@
+"""
+Script de génération des plans de repas de la semaine pour plusieurs utilisateurs
+
+Exemples:
+    python scripts/bulk_generate_meal_plans.py --users 3,4,5 --week-start 2025-09-01
+    python scripts/bulk_generate_meal_plans.py --all --optimizer annealing --workers 4
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db
+from models.user import User
+from main import create_app
+from schemas.meal_plan import meal_plan_generation_schema
+from services.bulk_meal_plan_service import BulkMealPlanJob
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Génération des plans de repas en lot")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--users', help="IDs des utilisateurs séparés par des virgules")
+    target.add_argument('--all', action='store_true', help="Tous les utilisateurs actifs")
+    parser.add_argument('--week-start', help="Début de semaine (AAAA-MM-JJ, défaut: aujourd'hui)")
+    parser.add_argument('--optimizer', choices=['sampling', 'annealing'], default='sampling')
+    parser.add_argument('--time-budget-ms', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=0, help="Processus de calcul (0 = un par CPU)")
+    parser.add_argument('--seed', type=int, help="Graine du lot (génération reproductible)")
+    return parser.parse_args()
+
+
+def bulk_generate_meal_plans(args):
+    """Génère les plans et affiche la progression utilisateur par utilisateur"""
+    if args.all:
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.is_active.is_(True))]
+    else:
+        user_ids = [int(user_id) for user_id in args.users.split(',') if user_id.strip()]
+
+    # Options d'un plan seulement: la limite de user_ids de l'API (1000) ne s'applique pas au script
+    payload = {
+        'optimizer': args.optimizer,
+        'time_budget_ms': args.time_budget_ms,
+        'seed': args.seed
+    }
+    if args.week_start:
+        payload['week_start'] = args.week_start
+    options = meal_plan_generation_schema.load(payload)
+
+    def on_progress(job):
+        progress = job.progress
+        print(f"⏳ {progress['processed']}/{progress['total']} "
+              f"(✅ {progress['succeeded']} ⏭️ {progress['skipped']} ❌ {progress['failed']})", end='\r')
+
+    print(f"🍽️ Génération des plans de la semaine du {options['week_start']} pour {len(user_ids)} utilisateur(s)...")
+    job = BulkMealPlanJob(user_ids, options, workers=args.workers).run(on_progress)
+    print()
+
+    if job.status == 'failed':
+        print(f"❌ Génération interrompue: {job.error}")
+        return False
+
+    for user_id, result in job.results.items():
+        if result['status'] == 'succeeded':
+            print(f"✅ Utilisateur {user_id}: plan {result['meal_plan_id']} (score {result['score']})")
+        else:
+            print(f"{'⏭️' if result['status'] == 'skipped' else '❌'} Utilisateur {user_id}: {result['error']}")
+
+    progress = job.progress
+    print(f"🎉 {progress['succeeded']} plan(s) créé(s), {progress['skipped']} ignoré(s), {progress['failed']} échec(s)")
+    return progress['failed'] == 0
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    app = create_app()
+    with app.app_context():
+        success = bulk_generate_meal_plans(args)
+    sys.exit(0 if success else 1)
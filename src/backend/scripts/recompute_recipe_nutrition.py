@@ -0,0 +1,49 @@
+"""
+Script de recalcul des totaux nutritionnels des recettes depuis leurs ingrédients
+
+À lancer après une correction des valeurs des ingrédients ou des quantités des recettes.
+
+Exemples:
+    python scripts/recompute_recipe_nutrition.py
+    python scripts/recompute_recipe_nutrition.py --recipes 12,15 --dry-run
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app
+from services.ingredient_snapshot_service import ingredient_snapshot
+from services.recipe_nutrition_service import recipe_nutrition
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recalcul des totaux nutritionnels des recettes")
+    parser.add_argument('--recipes', help="IDs des recettes séparés par des virgules (défaut: toutes)")
+    parser.add_argument('--dry-run', action='store_true', help="Calculer sans écrire en base")
+    return parser.parse_args()
+
+
+def recompute_recipe_nutrition(args):
+    """Reconstruit l'instantané des ingrédients puis recalcule les totaux"""
+    recipe_ids = None
+    if args.recipes:
+        recipe_ids = [int(recipe_id) for recipe_id in args.recipes.split(',') if recipe_id.strip()]
+
+    # Les ingrédients ont pu être corrigés hors de l'API: instantané reconstruit
+    version = ingredient_snapshot.invalidate()
+    print(f"🥕 Instantané des ingrédients reconstruit (version {version})")
+
+    result = recipe_nutrition.recompute_totals(recipe_ids, dry_run=args.dry_run)
+    action = "à modifier" if result['dry_run'] else "modifiée(s)"
+    print(f"✅ {result['computed']} recette(s) calculée(s), {result['updated']} {action} "
+          f"en {result['duration_seconds']}s")
+    return True
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    app = create_app()
+    with app.app_context():
+        success = recompute_recipe_nutrition(args)
+    sys.exit(0 if success else 1)
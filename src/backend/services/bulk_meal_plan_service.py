@@ -0,0 +1,300 @@
+"""
+Génération de plans de repas en lot (ex: tous les clients d'un coach pour la semaine suivante)
+Objectifs chargés en une requête, matrice de recettes partagée, calcul dans un pool de processus
+"""
+
+import json
+import logging
+import os
+import secrets
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from database import db
+from models.meal_plan import MealPlan
+from models.user import User
+from services.meal_plan_generator import MealPlanGenerator, RecipeMatrix
+from services.nutrition_calculator_service import NutritionCalculationResult, nutrition_calculator
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Matrice de recettes d'un processus de calcul (transmise une fois par processus)
+_worker_matrix: Optional[RecipeMatrix] = None
+
+
+def _init_worker(matrix: RecipeMatrix) -> None:
+    """Initialise un processus de calcul avec la matrice partagée"""
+    global _worker_matrix
+    _worker_matrix = matrix
+
+
+def _generate_plan(task: Dict[str, Any], matrix: Optional[RecipeMatrix] = None) -> Dict[str, Any]:
+    """Génère le plan d'un utilisateur (exécuté dans un processus de calcul)"""
+    generator = MealPlanGenerator()
+    options = {
+        'nutritional_goals': task['nutritional_goals'],
+        'meal_types_to_include': task['meal_types_to_include'],
+        'max_repeats': task['max_repeats'],
+        'seed': task['seed'],
+        'matrix': matrix if matrix is not None else _worker_matrix
+    }
+    if task['optimizer'] == 'annealing':
+        return generator.optimize(time_budget_ms=task['time_budget_ms'], **options)
+    return generator.generate(**options)
+
+
+class BulkMealPlanJob:
+    """
+    Tâche de génération des plans de la semaine pour une liste d'utilisateurs
+
+    - Utilisateurs lus en une requête, profils nutritionnels calculés en un
+      lot (un seul commit) ; à défaut de profil (poids, taille ou âge
+      manquant), objectifs enregistrés de l'utilisateur puis ceux de la requête
+    - Recettes chargées une fois en matrice, transmise à chaque processus
+      de calcul à son démarrage
+    - Optimisation de chaque utilisateur dans un pool de processus
+    - Plans insérés par lots (INSERT multi-lignes)
+
+    La progression et le résultat de chaque utilisateur (succès, ignoré,
+    échec et raison) sont consultables pendant l'exécution (to_dict).
+    """
+
+    INSERT_BATCH_SIZE = 200
+
+    def __init__(self, user_ids: List[int], options: Dict[str, Any], workers: int = 0):
+        """
+        Args:
+            user_ids: Utilisateurs pour qui générer un plan
+            options: Paramètres de MealPlanGenerationSchema (week_start, objectifs par défaut, ...)
+            workers: Processus de calcul (0 = un par CPU, 1 = dans le processus courant)
+        """
+        self.id = uuid.uuid4().hex
+        self.user_ids = list(dict.fromkeys(user_ids))
+        self.options = options
+        self.workers = workers or os.cpu_count() or 1
+
+        self.status = 'pending'
+        self.error = None
+        self.results: Dict[int, Dict[str, Any]] = {}
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def run(self, on_progress: Optional[Callable[['BulkMealPlanJob'], None]] = None) -> 'BulkMealPlanJob':
+        """
+        Exécute la tâche (dans un contexte applicatif)
+
+        Args:
+            on_progress: Appelé après chaque utilisateur traité
+        """
+        self.status = 'running'
+        self.started_at = datetime.utcnow()
+        try:
+            self._run(on_progress)
+            self.status = 'completed'
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erreur lors de la génération en lot {self.id}: {e}")
+            self.status = 'failed'
+            self.error = str(e)
+        finally:
+            self.finished_at = datetime.utcnow()
+        return self
+
+    def _run(self, on_progress) -> None:
+        week_start = self.options['week_start']
+        meal_types = self.options['meal_types_to_include']
+
+        # 1. Utilisateurs en une requête, profils nutritionnels en un lot
+        users = {user.id: user for user in User.query.filter(User.id.in_(self.user_ids)).all()}
+        existing = {
+            user_id for (user_id,) in db.session.query(MealPlan.user_id).filter(
+                MealPlan.user_id.in_(self.user_ids),
+                MealPlan.week_start == week_start
+            )
+        }
+
+        to_generate = []
+        for user_id in self.user_ids:
+            if user_id not in users:
+                self._record(user_id, 'failed', error='Utilisateur non trouvé')
+            elif user_id in existing:
+                self._record(user_id, 'skipped', error='Un plan existe déjà pour cette semaine')
+            else:
+                to_generate.append(users[user_id])
+        profiles = nutrition_calculator.calculate_nutrition_profiles(to_generate)
+        tasks = [self._task(user, profiles.get(user.id)) for user in to_generate]
+
+        # 2. Recettes chargées une seule fois
+        matrix = MealPlanGenerator.load_recipes(meal_types, self.options.get('preferred_categories'))
+        if matrix is None:
+            for task in tasks:
+                self._record(task['user_id'], 'failed', error='Aucune recette disponible')
+            return
+
+        # 3. Optimisation par utilisateur, plans insérés au fil de l'eau
+        pending_rows = []
+        for task, generation, error in self._execute(tasks, matrix):
+            if error or not generation:
+                self._record(task['user_id'], 'failed', error=error or 'Génération impossible')
+            else:
+                # Calculé, en attente d'insertion avec le lot
+                self._record(task['user_id'], 'generated', score=generation['score'], seed=task['seed'])
+                pending_rows.append((task, generation))
+                if len(pending_rows) >= self.INSERT_BATCH_SIZE:
+                    self._insert_plans(pending_rows, week_start)
+                    pending_rows = []
+            if on_progress:
+                on_progress(self)
+
+        if pending_rows:
+            self._insert_plans(pending_rows, week_start)
+
+    def _task(self, user: User, profile: Optional[NutritionCalculationResult] = None) -> Dict[str, Any]:
+        """Paramètres de génération d'un utilisateur (profil, sinon objectifs enregistrés, sinon ceux de la requête)"""
+        base_seed = self.options.get('seed')
+        if profile is not None:
+            goals = (profile.adjusted_calories, profile.protein_target, profile.carbs_target, profile.fat_target)
+        else:
+            goals = (user.daily_calories_target, user.daily_protein_target,
+                     user.daily_carbs_target, user.daily_fat_target)
+        targets = ('target_calories', 'target_protein', 'target_carbs', 'target_fat')
+        return {
+            'user_id': user.id,
+            'nutritional_goals': {
+                target: value or self.options[target] for target, value in zip(targets, goals)
+            },
+            'meal_types_to_include': self.options['meal_types_to_include'],
+            'max_repeats': self.options['max_repeats'],
+            'optimizer': self.options.get('optimizer', 'sampling'),
+            'time_budget_ms': self.options.get('time_budget_ms', MealPlanGenerator.TIME_BUDGET_MS),
+            # Graine par utilisateur dérivée de la graine du lot (lot reproductible)
+            'seed': (base_seed + user.id) % 2**32 if base_seed is not None else secrets.randbits(32)
+        }
+
+    def _execute(self, tasks: List[Dict], matrix: RecipeMatrix):
+        """Itère sur (tâche, résultat, erreur) dans l'ordre de fin de calcul"""
+        if self.workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                try:
+                    yield task, _generate_plan(task, matrix), None
+                except Exception as e:
+                    yield task, None, str(e)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(tasks)),
+            initializer=_init_worker,
+            initargs=(matrix,)
+        ) as executor:
+            futures = {executor.submit(_generate_plan, task): task for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, str(e)
+
+    def _insert_plans(self, pending_rows: List, week_start: date) -> None:
+        """Insère un lot de plans en une requête et enregistre leurs IDs"""
+        now = datetime.utcnow()
+        rows = [{
+            'user_id': task['user_id'],
+            'week_start': week_start,
+            'meals_json': json.dumps(generation['meals']),
+            'daily_calories': generation['nutrition']['daily_calories'],
+            'daily_protein': generation['nutrition']['daily_protein'],
+            'daily_carbs': generation['nutrition']['daily_carbs'],
+            'daily_fat': generation['nutrition']['daily_fat'],
+            'is_active': True,
+            'created_at': now,
+            'updated_at': now
+        } for task, generation in pending_rows]
+
+        meal_plan_ids = db.session.scalars(
+            insert(MealPlan).returning(MealPlan.id, sort_by_parameter_order=True),
+            rows
+        ).all()
+        db.session.commit()
+
+        for (task, generation), meal_plan_id in zip(pending_rows, meal_plan_ids):
+            self._record(task['user_id'], 'succeeded', meal_plan_id=meal_plan_id,
+                         score=generation['score'], seed=task['seed'])
+
+    def _record(self, user_id: int, status: str, **details) -> None:
+        with self._lock:
+            self.results[user_id] = {'status': status, **details}
+
+    @property
+    def progress(self) -> Dict[str, int]:
+        with self._lock:
+            statuses = [result['status'] for result in self.results.values()]
+        return {
+            'total': len(self.user_ids),
+            'processed': len(statuses),
+            'generated': statuses.count('generated'),
+            'succeeded': statuses.count('succeeded'),
+            'skipped': statuses.count('skipped'),
+            'failed': statuses.count('failed')
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            results = {str(user_id): dict(result) for user_id, result in self.results.items()}
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'progress': self.progress,
+            'results': results,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class BulkMealPlanService:
+    """Lancement et suivi des générations en lot (un thread de fond par tâche)"""
+
+    MAX_TRACKED_JOBS = 50
+
+    def __init__(self):
+        self._jobs: Dict[str, BulkMealPlanJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, app, user_ids: List[int], options: Dict[str, Any]) -> BulkMealPlanJob:
+        """Lance la génération dans un thread de fond et retourne la tâche"""
+        job = BulkMealPlanJob(user_ids, options, workers=app.config.get('BULK_GENERATION_WORKERS', 0))
+        self._track(job)
+
+        def run():
+            with app.app_context():
+                job.run()
+                db.session.remove()
+
+        threading.Thread(target=run, name=f'bulk-meal-plans-{job.id[:8]}', daemon=True).start()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[BulkMealPlanJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _track(self, job: BulkMealPlanJob) -> None:
+        """Conserve les dernières tâches (les plus anciennes terminées sont oubliées)"""
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.MAX_TRACKED_JOBS:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest].status in ('pending', 'running'):
+                    break
+                del self._jobs[oldest]
+
+
+# Instance globale du service
+bulk_meal_plan_service = BulkMealPlanService()
@@ -0,0 +1,257 @@
+"""
+Sérialisation des valeurs du cache Redis (niveau L2)
+Codecs interchangeables (JSON, msgpack, pickle) choisis par préfixe de clé,
+compression zlib au-delà d'un seuil et métriques de taille par préfixe
+"""
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+import json
+import pickle
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+
+class CacheSerializationError(Exception):
+    """Erreur d'encodage ou de décodage d'une valeur de cache"""
+    pass
+
+
+class PickleCodec:
+    """Codec pickle : accepte tout objet Python, couplé aux classes du code"""
+
+    name = 'pickle'
+    marker = b'p'
+
+    def dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+def ensure_round_trip(value: Any, key_types: tuple) -> None:
+    """
+    Vérifie qu'une valeur est relue à l'identique par un codec compact
+
+    JSON et msgpack relisent un tuple comme une liste, et JSON une clé entière
+    comme une chaîne : la valeur lue dans Redis aurait alors d'autres types
+    que la même valeur lue dans le cache local. TypeError pour ces valeurs,
+    que CacheSerializer encode alors en pickle.
+    """
+    stack = [value]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            for item_key, item in current.items():
+                if type(item_key) not in key_types:
+                    raise TypeError(f"Clé de type {type(item_key).__name__} non conservée")
+                stack.append(item)
+        elif type(current) is list:
+            stack.extend(current)
+        elif isinstance(current, tuple):
+            raise TypeError("Tuple relu comme une liste")
+
+
+class JsonCodec:
+    """Codec JSON compact : dictionnaires (clés chaînes), listes, chaînes et nombres uniquement"""
+
+    name = 'json'
+    marker = b'j'
+
+    def dumps(self, value: Any) -> bytes:
+        ensure_round_trip(value, (str,))
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data.decode('utf-8'))
+
+
+class MsgpackCodec:
+    """Codec msgpack : binaire compact, mêmes types que JSON (clés entières conservées)"""
+
+    name = 'msgpack'
+    marker = b'm'
+
+    def dumps(self, value: Any) -> bytes:
+        ensure_round_trip(value, (str, int))
+        return msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+# Codec compact préféré selon les dépendances installées
+COMPACT_CODEC = MsgpackCodec() if MSGPACK_AVAILABLE else JsonCodec()
+
+
+class CacheSerializer:
+    """
+    Encode/décode les valeurs du cache avec un codec choisi par préfixe de clé
+
+    Format stocké : 1 octet de codec + 1 octet de compression + charge utile.
+    Les anciennes entrées en pickle brut (sans en-tête) restent lisibles.
+    Une valeur non supportée par le codec du préfixe est encodée en pickle.
+    """
+
+    # Seuil de compression zlib (octets sérialisés)
+    COMPRESSION_THRESHOLD = 1024
+    COMPRESSION_LEVEL = 6
+
+    FLAG_RAW = b'-'
+    FLAG_ZLIB = b'z'
+
+    # Premier octet d'un pickle protocole >= 2
+    LEGACY_PICKLE_MARKER = 0x80
+
+    def __init__(
+        self,
+        codecs_by_prefix: Optional[Dict[str, Any]] = None,
+        default_codec: Optional[Any] = None,
+        compression_threshold: Optional[int] = None
+    ):
+        """
+        Args:
+            codecs_by_prefix: Codec par préfixe de clé (ex: {"agg:": COMPACT_CODEC})
+            default_codec: Codec des préfixes non configurés (pickle par défaut)
+            compression_threshold: Taille à partir de laquelle compresser (None = défaut)
+        """
+        self.fallback_codec = PickleCodec()
+        self.default_codec = default_codec or self.fallback_codec
+        self.codecs_by_prefix = dict(codecs_by_prefix or {})
+        self.compression_threshold = (
+            self.COMPRESSION_THRESHOLD if compression_threshold is None else compression_threshold
+        )
+
+        self._codecs_by_marker = {
+            codec.marker: codec
+            for codec in [self.fallback_codec, JsonCodec(), self.default_codec,
+                          *self.codecs_by_prefix.values()]
+        }
+        if MSGPACK_AVAILABLE:
+            self._codecs_by_marker[MsgpackCodec.marker] = MsgpackCodec()
+
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def key_prefix(key: str) -> str:
+        """Retourne le préfixe d'une clé ("agg:abc" -> "agg:")"""
+        head, separator, _ = key.partition(':')
+        return f"{head}:" if separator else 'other'
+
+    def register_codec(self, prefix: str, codec: Any) -> None:
+        """Associe un codec à un préfixe de clé"""
+        self.codecs_by_prefix[prefix] = codec
+        self._codecs_by_marker[codec.marker] = codec
+
+    def codec_for(self, key: str) -> Any:
+        """Retourne le codec configuré pour une clé"""
+        return self.codecs_by_prefix.get(self.key_prefix(key), self.default_codec)
+
+    def encode(self, key: str, value: Any) -> bytes:
+        """
+        Sérialise une valeur pour Redis
+
+        Args:
+            key: Clé de cache (détermine le codec)
+            value: Valeur à sérialiser
+
+        Returns:
+            bytes: Données stockables
+        """
+        codec = self.codec_for(key)
+        try:
+            payload = codec.dumps(value)
+        except (TypeError, ValueError, OverflowError):
+            # Valeur hors du modèle de données du codec compact
+            codec = self.fallback_codec
+            try:
+                payload = codec.dumps(value)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                raise CacheSerializationError(f"Valeur non sérialisable pour {key}: {e}")
+        except Exception as e:
+            raise CacheSerializationError(f"Erreur d'encodage pour {key}: {e}")
+
+        raw_size = len(payload)
+        flag = self.FLAG_RAW
+        if self.compression_threshold and raw_size >= self.compression_threshold:
+            compressed = zlib.compress(payload, self.COMPRESSION_LEVEL)
+            if len(compressed) < raw_size:
+                payload = compressed
+                flag = self.FLAG_ZLIB
+
+        data = codec.marker + flag + payload
+        self._record(key, 'writes', 1, 'raw_bytes_written', raw_size, 'bytes_written', len(data))
+        return data
+
+    def decode(self, key: str, data: bytes) -> Any:
+        """
+        Désérialise une valeur lue depuis Redis
+
+        Args:
+            key: Clé de cache
+            data: Données stockées
+
+        Returns:
+            Any: Valeur d'origine
+        """
+        try:
+            if data[0] == self.LEGACY_PICKLE_MARKER:
+                value = pickle.loads(data)
+            else:
+                codec = self._codecs_by_marker.get(data[:1])
+                if codec is None:
+                    raise CacheSerializationError(f"Codec inconnu pour {key}: {data[:1]!r}")
+
+                payload = data[2:]
+                if data[1:2] == self.FLAG_ZLIB:
+                    payload = zlib.decompress(payload)
+                value = codec.loads(payload)
+        except CacheSerializationError:
+            raise
+        except Exception as e:
+            raise CacheSerializationError(f"Erreur de décodage pour {key}: {e}")
+
+        self._record(key, 'reads', 1, 'bytes_read', len(data))
+        return value
+
+    def _record(self, key: str, *counters) -> None:
+        """Incrémente des compteurs (nom, valeur, nom, valeur...) pour le préfixe de la clé"""
+        prefix = self.key_prefix(key)
+        with self._stats_lock:
+            stats = self._stats.setdefault(prefix, {
+                'writes': 0,
+                'raw_bytes_written': 0,
+                'bytes_written': 0,
+                'reads': 0,
+                'bytes_read': 0
+            })
+            for name, amount in zip(counters[::2], counters[1::2]):
+                stats[name] += amount
+
+    def get_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retourne les métriques de taille par préfixe
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Compteurs, codec et taux de compression par préfixe
+        """
+        with self._stats_lock:
+            snapshot = {prefix: dict(stats) for prefix, stats in self._stats.items()}
+
+        for prefix, stats in snapshot.items():
+            stats['codec'] = self.codecs_by_prefix.get(prefix, self.default_codec).name
+            stats['compression_ratio'] = round(
+                stats['bytes_written'] / stats['raw_bytes_written'], 3
+            ) if stats['raw_bytes_written'] else 1.0
+            stats['avg_bytes_written'] = round(
+                stats['bytes_written'] / stats['writes'], 1
+            ) if stats['writes'] else 0
+
+        return snapshot
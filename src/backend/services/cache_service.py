@@ -1,6 +1,11 @@
 """
 Service de cache Redis pour l'optimisation des performances (US1.5)
 Gère la mise en cache des agrégations et des listes de courses
+
+Architecture à deux niveaux :
+- L1 : cache mémoire local au processus (LRU borné, TTL par entrée)
+- L2 : Redis partagé entre les workers (optionnel)
+Le niveau L1 reste actif lorsque Redis est absent ou indisponible.
 """
 
 try:
@@ -8,30 +13,352 @@ try:
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
-    print("Redis not available - Cache disabled")
+    print("Redis not available - Local in-process cache only")
 
 import json
 import hashlib
-from typing import Any, Dict, List, Optional, Union
+import bisect
+import fnmatch
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 from datetime import datetime, timedelta
 from functools import wraps
-import pickle
+
+from services.cache_serializer import COMPACT_CODEC, CacheSerializationError, CacheSerializer
+
+# Sentinelle pour distinguer "absent du cache" d'une valeur None
+_MISSING = object()
+
+
+class LocalLRUCache:
+    """
+    Cache mémoire borné (niveau L1) avec TTL par entrée et éviction LRU
+    
+    Les valeurs sont conservées telles quelles (sans sérialisation) : elles sont
+    partagées entre les appelants et doivent être traitées en lecture seule.
+    Chaque entrée peut porter des tags (ex: "meal_plan:42") permettant une
+    invalidation ciblée sans parcourir toutes les clés.
+    """
+    
+    def __init__(self, max_entries: int = 1024, on_evict: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            max_entries: Nombre maximum d'entrées avant éviction LRU
+            on_evict: Fonction appelée avec la clé de chaque entrée évincée
+        """
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tag_index: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+        
+        # Compteurs
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _unindex(self, key: str, tags: Tuple[str, ...]) -> None:
+        """Retire une clé de l'index des tags (appelé sous verrou)"""
+        for tag in tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def _remove(self, key: str) -> bool:
+        """Supprime une entrée et ses références de tags (appelé sous verrou)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._unindex(key, entry[2])
+        return True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Récupère une entrée non expirée et la marque comme récemment utilisée
+        
+        Args:
+            key: Clé de cache
+            default: Valeur retournée si l'entrée est absente ou expirée
+        
+        Returns:
+            Any: Valeur cachée ou default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: float, tags: Optional[List[str]] = None) -> None:
+        """
+        Enregistre une entrée et évince les moins récemment utilisées si besoin
+        
+        Args:
+            key: Clé de cache
+            value: Valeur à cacher
+            ttl: Durée de vie en secondes
+            tags: Tags d'invalidation associés à l'entrée
+        """
+        if ttl <= 0:
+            self.delete(key)
+            return
+        
+        tags = tuple(tags or ())
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            
+            while len(self._entries) > self.max_entries:
+                evicted_key, (_, _, evicted_tags) = self._entries.popitem(last=False)
+                self._unindex(evicted_key, evicted_tags)
+                self.evictions += 1
+                if self.on_evict:
+                    self.on_evict(evicted_key)
+
+    def delete(self, key: str) -> bool:
+        """Supprime une entrée, retourne True si elle existait"""
+        with self._lock:
+            return self._remove(key)
+
+    def delete_pattern(self, pattern: str) -> int:
+        """Supprime les entrées dont la clé correspond au pattern glob"""
+        with self._lock:
+            keys = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Supprime toutes les entrées portant le tag, retourne leur nombre"""
+        with self._lock:
+            keys = self._tag_index.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        """Vide le cache local"""
+        with self._lock:
+            self._entries.clear()
+            self._tag_index.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Retourne les compteurs du cache local"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'tags': len(self._tag_index),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0
+            }
+
+
+class CacheMetrics:
+    """
+    Compteurs du cache par préfixe de clé (succès, échecs, écritures, évictions)
+    et histogrammes de latence des lectures/écritures
+    
+    Tenus en mémoire par le processus : leur lecture est O(nombre de préfixes),
+    sans aucune commande Redis.
+    """
+    
+    # Bornes supérieures des intervalles de latence (millisecondes)
+    LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+    
+    COUNTERS = ('hits', 'misses', 'sets', 'deletes', 'evictions', 'errors')
+    OPERATIONS = ('get', 'set')
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prefixes: Dict[str, Dict[str, Any]] = {}
+
+    def _prefix_stats(self, key: str) -> Dict[str, Any]:
+        """Retourne (en le créant) l'enregistrement du préfixe de la clé (appelé sous verrou)"""
+        prefix = CacheSerializer.key_prefix(key)
+        stats = self._prefixes.get(prefix)
+        if stats is None:
+            stats = {counter: 0 for counter in self.COUNTERS}
+            stats['latency'] = {
+                operation: {
+                    'buckets': [0] * (len(self.LATENCY_BUCKETS_MS) + 1),
+                    'count': 0,
+                    'sum_ms': 0.0
+                }
+                for operation in self.OPERATIONS
+            }
+            self._prefixes[prefix] = stats
+        return stats
+
+    def increment(self, key: str, counter: str, amount: int = 1) -> None:
+        """Incrémente un compteur pour le préfixe de la clé"""
+        with self._lock:
+            self._prefix_stats(key)[counter] += amount
+
+    def observe(self, key: str, operation: str, seconds: float, counter: Optional[str] = None) -> None:
+        """
+        Enregistre la durée d'une opération (et optionnellement son résultat)
+        
+        Args:
+            key: Clé de cache
+            operation: 'get' ou 'set'
+            seconds: Durée mesurée
+            counter: Compteur à incrémenter en même temps (ex: 'hits')
+        """
+        elapsed_ms = seconds * 1000.0
+        bucket = bisect.bisect_left(self.LATENCY_BUCKETS_MS, elapsed_ms)
+        
+        with self._lock:
+            stats = self._prefix_stats(key)
+            histogram = stats['latency'][operation]
+            histogram['buckets'][bucket] += 1
+            histogram['count'] += 1
+            histogram['sum_ms'] += elapsed_ms
+            if counter:
+                stats[counter] += 1
+
+    def reset(self) -> None:
+        """Remet tous les compteurs à zéro"""
+        with self._lock:
+            self._prefixes.clear()
+
+    def _format_histogram(self, histogram: Dict[str, Any]) -> Dict[str, Any]:
+        """Met en forme un histogramme de latence (bornes lisibles, moyenne)"""
+        labels = [f"le_{bound}ms" for bound in self.LATENCY_BUCKETS_MS] + ['le_inf']
+        count = histogram['count']
+        return {
+            'buckets': dict(zip(labels, histogram['buckets'])),
+            'count': count,
+            'avg_ms': round(histogram['sum_ms'] / count, 3) if count else 0
+        }
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retourne les compteurs par préfixe et le taux de succès global
+        
+        Returns:
+            Dict[str, Any]: {'hits', 'misses', 'hit_rate', 'prefixes': {...}}
+        """
+        with self._lock:
+            snapshot = {
+                prefix: {
+                    **{counter: stats[counter] for counter in self.COUNTERS},
+                    'latency': {
+                        operation: {
+                            'buckets': list(histogram['buckets']),
+                            'count': histogram['count'],
+                            'sum_ms': histogram['sum_ms']
+                        }
+                        for operation, histogram in stats['latency'].items()
+                    }
+                }
+                for prefix, stats in self._prefixes.items()
+            }
+        
+        total_hits = total_misses = 0
+        for stats in snapshot.values():
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0
+            stats['latency'] = {
+                operation: self._format_histogram(histogram)
+                for operation, histogram in stats['latency'].items()
+            }
+            total_hits += stats['hits']
+            total_misses += stats['misses']
+        
+        total_lookups = total_hits + total_misses
+        return {
+            'hits': total_hits,
+            'misses': total_misses,
+            'hit_rate': round(total_hits / total_lookups, 4) if total_lookups else 0,
+            'prefixes': snapshot
+        }
+
+
+class _Flight:
+    """Calcul en cours pour une clé de cache (single-flight)"""
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
 
 class CacheService:
-    """Service de cache Redis avec stratégies d'invalidation intelligentes"""
+    """Service de cache à deux niveaux (mémoire + Redis) avec stratégies d'invalidation"""
+    
+    # Taille par défaut du cache local L1
+    LOCAL_MAX_ENTRIES = 2048
     
-    def __init__(self, redis_url: str = "redis://localhost:6379/0"):
+    # Durée de vie maximale d'une entrée L1 quand Redis est connecté (secondes) :
+    # une invalidation faite par un autre worker n'atteint pas ce niveau, qui
+    # peut donc servir une valeur périmée au plus LOCAL_MAX_TTL secondes
+    LOCAL_MAX_TTL = 30
+    
+    # Attente maximale d'un calcul mené par un autre appelant (secondes)
+    SINGLE_FLIGHT_TIMEOUT = 30
+    
+    # Marqueur des valeurs stockées avec une fenêtre stale-while-revalidate
+    FRESH_UNTIL_FIELD = '__fresh_until__'
+    
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379/0",
+        local_max_entries: Optional[int] = None,
+        local_max_ttl: Optional[float] = None
+    ):
         """
-        Initialise la connexion Redis
+        Initialise le cache local et la connexion Redis
         
         Args:
             redis_url: URL de connexion Redis
+            local_max_entries: Taille maximale du cache local L1
+            local_max_ttl: Durée de vie maximale d'une entrée L1 lorsque Redis est connecté
         """
+        self.metrics = CacheMetrics()
+        self.local_max_ttl = local_max_ttl or self.LOCAL_MAX_TTL
+        self.local_cache = LocalLRUCache(
+            local_max_entries or self.LOCAL_MAX_ENTRIES,
+            on_evict=lambda key: self.metrics.increment(key, 'evictions')
+        )
+        self._stats_lock = threading.Lock()
+        self._redis_stats = {'hits': 0, 'misses': 0, 'errors': 0}
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        self.serializer = CacheSerializer({
+            prefix: COMPACT_CODEC for prefix in self.COMPACT_PREFIXES
+        })
+        
         if REDIS_AVAILABLE:
             try:
                 self.redis_client = redis.from_url(
                     redis_url,
-                    decode_responses=False,  # Pour supporter les objets pickle
+                    decode_responses=False,  # Valeurs binaires (voir CacheSerializer)
                     socket_connect_timeout=5,
                     socket_timeout=5
                 )
@@ -58,7 +385,46 @@ class CacheService:
     PREFIX_AGGREGATION = "agg:"
     PREFIX_MEAL_PLAN = "mp:"
     PREFIX_RECIPE = "recipe:"
+    PREFIX_INGREDIENT = "ingredient:"
     PREFIX_USER_PREF = "user_pref:"
+    PREFIX_NUTRITION_PROFILE = "nutrition_profile:"
+    PREFIX_TAG = "tag:"
+    
+    # Préfixes dont les valeurs sont des documents JSON (codec compact au lieu de pickle)
+    COMPACT_PREFIXES = (
+        PREFIX_SHOPPING_LIST,
+        PREFIX_AGGREGATION,
+        PREFIX_MEAL_PLAN,
+        PREFIX_RECIPE,
+        PREFIX_INGREDIENT,
+        PREFIX_NUTRITION_PROFILE
+    )
+    
+    # Types de tags d'invalidation (ex: "meal_plan:42")
+    TAG_MEAL_PLAN = "meal_plan"
+    TAG_RECIPE = "recipe"
+    TAG_USER = "user"
+    
+    # Tags des listes du catalogue (invalidés à chaque écriture de recette/ingrédient)
+    TAG_RECIPE_CATALOG = "catalog:recipes"
+    TAG_INGREDIENT_CATALOG = "catalog:ingredients"
+    
+    # Durée de vie minimale des index de tags dans Redis
+    TTL_TAG_INDEX = 86400          # 24 heures
+
+    @staticmethod
+    def make_tag(kind: str, identifier: Any) -> str:
+        """
+        Construit un tag d'invalidation
+        
+        Args:
+            kind: Type d'entité (TAG_MEAL_PLAN, TAG_RECIPE, TAG_USER)
+            identifier: Identifiant de l'entité
+        
+        Returns:
+            str: Tag (ex: "meal_plan:42")
+        """
+        return f"{kind}:{identifier}"
 
     def _generate_cache_key(self, prefix: str, *args, **kwargs) -> str:
         """
@@ -82,9 +448,21 @@ class CacheService:
         
         return f"{prefix}{key_hash}"
 
+    def _local_ttl(self, ttl: float) -> float:
+        """Durée de vie d'une entrée L1 (plafonnée si Redis porte la valeur partagée)"""
+        return min(ttl, self.local_max_ttl) if self.connected else ttl
+
+    def _record_redis_stat(self, counter: str) -> None:
+        """Incrémente un compteur du niveau Redis (L2)"""
+        with self._stats_lock:
+            self._redis_stats[counter] += 1
+
     def get(self, key: str) -> Optional[Any]:
         """
-        Récupère une valeur depuis le cache
+        Récupère une valeur depuis le cache (L1 puis Redis)
+        
+        Une valeur trouvée dans Redis est promue dans le cache local
+        pour la durée de vie restante de la clé, au plus LOCAL_MAX_TTL.
         
         Args:
             key: Clé de cache
@@ -92,82 +470,447 @@ class CacheService:
         Returns:
             Optional[Any]: Valeur cachée ou None
         """
+        started = time.perf_counter()
+        value = self._read(key)
+        self.metrics.observe(
+            key, 'get', time.perf_counter() - started,
+            'misses' if value is _MISSING else 'hits'
+        )
+        return None if value is _MISSING else value
+
+    def _read(self, key: str) -> Any:
+        """Lit une clé dans L1 puis dans Redis, retourne _MISSING si absente"""
+        value = self.local_cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        
         if not self.connected:
-            return None
+            return _MISSING
         
         try:
-            cached_data = self.redis_client.get(key)
+            pipe = self.redis_client.pipeline()
+            pipe.get(key)
+            pipe.pttl(key)
+            cached_data, remaining_ms = pipe.execute()
+            
             if cached_data:
-                return pickle.loads(cached_data)
-        except (redis.RedisError, pickle.PickleError) as e:
+                self._record_redis_stat('hits')
+                value = self.serializer.decode(key, cached_data)
+                if remaining_ms and remaining_ms > 0:
+                    self.local_cache.set(key, value, self._local_ttl(remaining_ms / 1000.0))
+                return value
+            
+            self._record_redis_stat('misses')
+        except (redis.RedisError, CacheSerializationError) as e:
+            self._record_redis_stat('errors')
+            self.metrics.increment(key, 'errors')
             print(f"Erreur lecture cache {key}: {e}")
         
-        return None
+        return _MISSING
 
-    def set(self, key: str, value: Any, ttl: int) -> bool:
+    def set(self, key: str, value: Any, ttl: int, tags: Optional[Iterable[str]] = None) -> bool:
         """
-        Met en cache une valeur
+        Met en cache une valeur dans les deux niveaux
         
         Args:
             key: Clé de cache
             value: Valeur à cacher
             ttl: Durée de vie en secondes
+            tags: Tags d'invalidation (voir make_tag)
         
         Returns:
-            bool: Succès de l'opération
+            bool: Succès de l'opération (au moins le niveau local)
         """
-        if not self.connected:
-            return False
+        started = time.perf_counter()
+        tags = list(tags or [])
+        self.local_cache.set(key, value, self._local_ttl(ttl), tags)
         
-        try:
-            serialized_data = pickle.dumps(value)
-            result = self.redis_client.setex(key, ttl, serialized_data)
-            return bool(result)
-        except (redis.RedisError, pickle.PickleError) as e:
-            print(f"Erreur écriture cache {key}: {e}")
-            return False
+        if self.connected:
+            try:
+                serialized_data = self.serializer.encode(key, value)
+                pipe = self.redis_client.pipeline()
+                pipe.setex(key, ttl, serialized_data)
+                for tag in tags:
+                    tag_key = f"{self.PREFIX_TAG}{tag}"
+                    pipe.sadd(tag_key, key)
+                    pipe.expire(tag_key, max(ttl, self.TTL_TAG_INDEX))
+                pipe.execute()
+            except (redis.RedisError, CacheSerializationError) as e:
+                self._record_redis_stat('errors')
+                self.metrics.increment(key, 'errors')
+                print(f"Erreur écriture cache {key}: {e}")
+        
+        self.metrics.observe(key, 'set', time.perf_counter() - started, 'sets')
+        return True
 
     def delete(self, key: str) -> bool:
         """
-        Supprime une entrée du cache
+        Supprime une entrée du cache (L1 et Redis)
         
         Args:
             key: Clé à supprimer
         
         Returns:
-            bool: Succès de l'opération
+            bool: True si l'entrée existait dans au moins un niveau
         """
+        self.metrics.increment(key, 'deletes')
+        deleted_locally = self.local_cache.delete(key)
+        
         if not self.connected:
-            return False
+            return deleted_locally
         
         try:
             result = self.redis_client.delete(key)
-            return bool(result)
+            return bool(result) or deleted_locally
         except redis.RedisError as e:
+            self._record_redis_stat('errors')
             print(f"Erreur suppression cache {key}: {e}")
-            return False
+            return deleted_locally
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Récupère plusieurs valeurs en un seul aller-retour Redis
+        
+        Le cache local est consulté d'abord ; seules les clés absentes
+        sont demandées à Redis, dans un unique pipeline.
+        
+        Args:
+            keys: Clés de cache
+        
+        Returns:
+            Dict[str, Any]: Valeurs trouvées, indexées par clé (clés absentes omises)
+        """
+        started = time.perf_counter()
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        remote_keys = []
+        
+        for key in keys:
+            value = self.local_cache.get(key, _MISSING)
+            if value is _MISSING:
+                remote_keys.append(key)
+            else:
+                found[key] = value
+        
+        if remote_keys and self.connected:
+            try:
+                pipe = self.redis_client.pipeline()
+                for key in remote_keys:
+                    pipe.get(key)
+                    pipe.pttl(key)
+                results = pipe.execute()
+                
+                for index, key in enumerate(remote_keys):
+                    cached_data, remaining_ms = results[2 * index], results[2 * index + 1]
+                    if not cached_data:
+                        self._record_redis_stat('misses')
+                        continue
+                    
+                    try:
+                        value = self.serializer.decode(key, cached_data)
+                    except CacheSerializationError as e:
+                        self._record_redis_stat('errors')
+                        self.metrics.increment(key, 'errors')
+                        print(f"Erreur lecture cache {key}: {e}")
+                        continue
+                    
+                    self._record_redis_stat('hits')
+                    found[key] = value
+                    if remaining_ms and remaining_ms > 0:
+                        self.local_cache.set(key, value, self._local_ttl(remaining_ms / 1000.0))
+            except redis.RedisError as e:
+                self._record_redis_stat('errors')
+                print(f"Erreur lecture groupée du cache ({len(remote_keys)} clés): {e}")
+        
+        # Latence répartie entre les clés du lot
+        if keys:
+            elapsed = (time.perf_counter() - started) / len(keys)
+            for key in keys:
+                self.metrics.observe(key, 'get', elapsed, 'hits' if key in found else 'misses')
+        
+        return found
+
+    def set_many(
+        self,
+        values: Dict[str, Any],
+        ttl: int,
+        tags: Optional[Dict[str, Iterable[str]]] = None
+    ) -> bool:
+        """
+        Met en cache plusieurs valeurs en un seul aller-retour Redis
+        
+        Args:
+            values: Valeurs à cacher, indexées par clé
+            ttl: Durée de vie en secondes
+            tags: Tags d'invalidation par clé (optionnel)
+        
+        Returns:
+            bool: Succès de l'opération (au moins le niveau local)
+        """
+        if not values:
+            return True
+        
+        started = time.perf_counter()
+        tags = tags or {}
+        for key, value in values.items():
+            self.local_cache.set(key, value, self._local_ttl(ttl), list(tags.get(key, [])))
+        
+        if self.connected:
+            try:
+                pipe = self.redis_client.pipeline()
+                for key, value in values.items():
+                    try:
+                        serialized_data = self.serializer.encode(key, value)
+                    except CacheSerializationError as e:
+                        self._record_redis_stat('errors')
+                        self.metrics.increment(key, 'errors')
+                        print(f"Erreur écriture cache {key}: {e}")
+                        continue
+                    
+                    pipe.setex(key, ttl, serialized_data)
+                    for tag in tags.get(key, []):
+                        tag_key = f"{self.PREFIX_TAG}{tag}"
+                        pipe.sadd(tag_key, key)
+                        pipe.expire(tag_key, max(ttl, self.TTL_TAG_INDEX))
+                pipe.execute()
+            except redis.RedisError as e:
+                self._record_redis_stat('errors')
+                print(f"Erreur écriture groupée du cache ({len(values)} clés): {e}")
+        
+        elapsed = (time.perf_counter() - started) / len(values)
+        for key in values:
+            self.metrics.observe(key, 'set', elapsed, 'sets')
+        
+        return True
+
+    def set_computed(
+        self,
+        key: str,
+        value: Any,
+        ttl: int,
+        tags: Optional[Iterable[str]] = None,
+        stale_ttl: int = 0
+    ) -> bool:
+        """
+        Met en cache une valeur calculée au format attendu par get_or_compute
+        
+        Avec stale_ttl > 0, l'entrée est conservée ttl + stale_ttl secondes
+        et marquée comme fraîche pendant ttl secondes seulement.
+        
+        Args:
+            key: Clé de cache
+            value: Valeur calculée
+            ttl: Durée de fraîcheur en secondes
+            tags: Tags d'invalidation
+            stale_ttl: Fenêtre pendant laquelle la valeur périmée reste servie
+        
+        Returns:
+            bool: Succès de l'opération
+        """
+        if stale_ttl > 0:
+            envelope = {self.FRESH_UNTIL_FIELD: time.time() + ttl, 'value': value}
+            return self.set(key, envelope, ttl + stale_ttl, tags=tags)
+        return self.set(key, value, ttl, tags=tags)
+
+    def _unwrap(self, cached: Any) -> Tuple[Any, bool]:
+        """Retourne (valeur, fraîche) pour une entrée écrite par set_computed"""
+        if isinstance(cached, dict) and self.FRESH_UNTIL_FIELD in cached:
+            return cached['value'], cached[self.FRESH_UNTIL_FIELD] > time.time()
+        return cached, True
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: int,
+        tags: Optional[Iterable[str]] = None,
+        stale_ttl: int = 0,
+        refresh: Optional[Callable[[], Any]] = None
+    ) -> Any:
+        """
+        Lit une valeur ou la calcule une seule fois pour tous les appelants concurrents
+        
+        Lors d'un défaut de cache, un seul appelant (par processus) exécute
+        compute ; les autres attendent son résultat. Avec stale_ttl > 0, une
+        valeur expirée reste servie pendant la fenêtre stale_ttl tandis qu'un
+        seul rafraîchissement s'exécute en arrière-plan.
+        
+        Args:
+            key: Clé de cache
+            compute: Fonction de calcul de la valeur (None n'est pas caché)
+            ttl: Durée de fraîcheur en secondes
+            tags: Tags d'invalidation
+            stale_ttl: Fenêtre stale-while-revalidate en secondes (0 = désactivée)
+            refresh: Fonction utilisée pour le rafraîchissement en arrière-plan
+                     (par défaut compute) ; elle s'exécute dans un autre thread,
+                     avec un contexte d'application Flask si disponible
+        
+        Returns:
+            Any: Valeur cachée ou calculée
+        """
+        cached = self.get(key)
+        if cached is not None:
+            value, fresh = self._unwrap(cached)
+            if not fresh:
+                self._refresh_in_background(key, refresh or compute, ttl, tags, stale_ttl)
+            return value
+        
+        return self._single_flight(
+            key,
+            lambda: self._compute_and_store(key, compute, ttl, tags, stale_ttl)
+        )
+
+    def _compute_and_store(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: int,
+        tags: Optional[Iterable[str]],
+        stale_ttl: int
+    ) -> Any:
+        """Calcule une valeur et la met en cache si elle n'est pas None"""
+        value = compute()
+        if value is not None:
+            self.set_computed(key, value, ttl, tags=tags, stale_ttl=stale_ttl)
+        return value
+
+    def _single_flight(self, key: str, task: Callable[[], Any]) -> Any:
+        """Exécute task une seule fois par clé, les appels concurrents partagent le résultat"""
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._flights[key] = flight
+        
+        if not is_leader:
+            if not flight.event.wait(self.SINGLE_FLIGHT_TIMEOUT):
+                # Calcul meneur trop lent : ne pas bloquer indéfiniment
+                return task()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        
+        try:
+            flight.value = task()
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def _refresh_in_background(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: int,
+        tags: Optional[Iterable[str]],
+        stale_ttl: int
+    ) -> None:
+        """Lance un rafraîchissement unique en arrière-plan pour une clé périmée"""
+        with self._flights_lock:
+            if key in self._flights:
+                return  # Rafraîchissement déjà en cours
+            flight = _Flight()
+            self._flights[key] = flight
+        
+        task = _with_app_context(
+            lambda: self._compute_and_store(key, compute, ttl, tags, stale_ttl)
+        )
+        
+        def run():
+            try:
+                flight.value = task()
+            except Exception as e:
+                flight.error = e
+                print(f"Erreur rafraîchissement cache {key}: {e}")
+            finally:
+                with self._flights_lock:
+                    self._flights.pop(key, None)
+                flight.event.set()
+        
+        threading.Thread(target=run, name=f"cache-refresh:{key}", daemon=True).start()
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        Supprime toutes les entrées enregistrées sous les tags donnés
+        
+        Le coût est proportionnel au nombre d'entrées taguées : aucun
+        parcours de l'espace de clés n'est effectué.
+        
+        Args:
+            *tags: Tags à invalider (voir make_tag)
+        
+        Returns:
+            int: Nombre d'entrées supprimées
+        """
+        deleted_locally = sum(self.local_cache.invalidate_tag(tag) for tag in tags)
+        
+        if not self.connected or not tags:
+            return deleted_locally
+        
+        try:
+            tag_keys = [f"{self.PREFIX_TAG}{tag}" for tag in tags]
+            pipe = self.redis_client.pipeline()
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = set()
+            for tag_members in pipe.execute():
+                members.update(tag_members)
+            
+            # Copies L1 promues depuis Redis (sans tags locaux) retirées avec leur valeur partagée
+            for member in members:
+                self.local_cache.delete(member.decode() if isinstance(member, bytes) else member)
+            
+            pipe = self.redis_client.pipeline()
+            if members:
+                pipe.delete(*members)
+            pipe.delete(*tag_keys)
+            results = pipe.execute()
+            
+            deleted = results[0] if members else 0
+            return max(deleted, deleted_locally)
+        except redis.RedisError as e:
+            self._record_redis_stat('errors')
+            print(f"Erreur invalidation tags {tags}: {e}")
+            return deleted_locally
 
     def delete_pattern(self, pattern: str) -> int:
         """
         Supprime toutes les entrées correspondant à un pattern
         
+        Utilise SCAN (non bloquant) ; préférer invalidate_tags pour
+        l'invalidation courante.
+        
         Args:
             pattern: Pattern de clés (ex: "sl:*")
         
         Returns:
             int: Nombre d'entrées supprimées
         """
+        deleted_locally = self.local_cache.delete_pattern(pattern)
+        
         if not self.connected:
-            return 0
+            return deleted_locally
         
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                return self.redis_client.delete(*keys)
-            return 0
+            deleted = 0
+            batch = []
+            for key in self.redis_client.scan_iter(match=pattern, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    deleted += self.redis_client.delete(*batch)
+                    batch = []
+            if batch:
+                deleted += self.redis_client.delete(*batch)
+            return max(deleted, deleted_locally)
         except redis.RedisError as e:
+            self._record_redis_stat('errors')
             print(f"Erreur suppression pattern {pattern}: {e}")
-            return 0
+            return deleted_locally
 
     def get_shopping_list_aggregation(
         self, 
@@ -222,7 +965,12 @@ class CacheService:
             'preferences': preferences
         }
         
-        return self.set(cache_key, cached_data, self.TTL_AGGREGATION)
+        return self.set(
+            cache_key,
+            cached_data,
+            self.TTL_AGGREGATION,
+            tags=[self.make_tag(self.TAG_MEAL_PLAN, meal_plan_id)]
+        )
 
     def get_meal_plan_ingredients(self, meal_plan_id: int) -> Optional[List[Dict]]:
         """
@@ -268,7 +1016,12 @@ class CacheService:
             'meal_plan_id': meal_plan_id
         }
         
-        return self.set(cache_key, cached_data, self.TTL_MEAL_PLAN_INGREDIENTS)
+        return self.set(
+            cache_key,
+            cached_data,
+            self.TTL_MEAL_PLAN_INGREDIENTS,
+            tags=[self.make_tag(self.TAG_MEAL_PLAN, meal_plan_id)]
+        )
 
     def invalidate_shopping_list_caches(self, meal_plan_id: int) -> int:
         """
@@ -280,68 +1033,107 @@ class CacheService:
         Returns:
             int: Nombre de caches invalidés
         """
-        patterns_to_clear = [
-            f"{self.PREFIX_SHOPPING_LIST}*{meal_plan_id}*",
-            f"{self.PREFIX_AGGREGATION}*{meal_plan_id}*",
-            f"{self.PREFIX_MEAL_PLAN}*{meal_plan_id}*"
-        ]
+        return self.invalidate_tags(self.make_tag(self.TAG_MEAL_PLAN, meal_plan_id))
+
+    def get_tier_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retourne les compteurs de succès/échecs/évictions par niveau de cache
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: Statistiques 'local' (L1) et 'redis' (L2)
+        """
+        with self._stats_lock:
+            redis_stats = dict(self._redis_stats)
         
-        total_cleared = 0
-        for pattern in patterns_to_clear:
-            total_cleared += self.delete_pattern(pattern)
+        lookups = redis_stats['hits'] + redis_stats['misses']
+        redis_stats['hit_rate'] = round(redis_stats['hits'] / lookups, 4) if lookups else 0
+        redis_stats['connected'] = self.connected
         
-        return total_cleared
+        return {
+            'local': self.local_cache.get_statistics(),
+            'redis': redis_stats,
+            'payloads': self.serializer.get_statistics()
+        }
 
     def get_cache_statistics(self) -> Dict[str, Any]:
         """
-        Récupère les statistiques du cache Redis
+        Récupère les statistiques du cache
+        
+        Les taux de succès proviennent des compteurs du service (par préfixe) ;
+        seule la commande INFO est envoyée à Redis, sans parcours des clés.
         
         Returns:
             Dict[str, Any]: Statistiques du cache
         """
+        stats = {
+            'connected': self.connected,
+            **self.metrics.get_statistics(),
+            'tiers': self.get_tier_statistics()
+        }
+        
         if not self.connected:
-            return {'connected': False, 'error': 'Redis non connecté'}
+            stats['error'] = 'Redis non connecté'
+            return stats
         
         try:
             info = self.redis_client.info()
+            keyspace_hits = info.get('keyspace_hits', 0)
+            keyspace_misses = info.get('keyspace_misses', 0)
+            keyspace_lookups = keyspace_hits + keyspace_misses
             
-            # Compter les clés par préfixe
-            key_counts = {}
-            prefixes = [
-                self.PREFIX_SHOPPING_LIST,
-                self.PREFIX_AGGREGATION,
-                self.PREFIX_MEAL_PLAN,
-                self.PREFIX_RECIPE,
-                self.PREFIX_USER_PREF
-            ]
-            
-            for prefix in prefixes:
-                keys = self.redis_client.keys(f"{prefix}*")
-                key_counts[prefix.rstrip(':')] = len(keys)
-            
-            return {
-                'connected': True,
+            stats['server'] = {
                 'total_keys': info.get('db0', {}).get('keys', 0),
                 'used_memory': info.get('used_memory_human', '0B'),
-                'hit_rate': info.get('keyspace_hit_rate', 0),
-                'key_counts_by_type': key_counts,
-                'uptime_seconds': info.get('uptime_in_seconds', 0)
+                'keyspace_hit_rate': round(keyspace_hits / keyspace_lookups, 4) if keyspace_lookups else 0,
+                'uptime_seconds': info.get('uptime_in_seconds', 0),
+                'evicted_keys': info.get('evicted_keys', 0)
             }
         except redis.RedisError as e:
-            return {
-                'connected': False,
-                'error': str(e)
-            }
+            stats['connected'] = False
+            stats['error'] = str(e)
+        
+        return stats
+
+def _with_app_context(task: Callable[[], Any]) -> Callable[[], Any]:
+    """Lie task au contexte d'application Flask courant (s'il existe) pour un autre thread"""
+    try:
+        from flask import current_app, has_app_context
+    except ImportError:
+        return task
+    
+    if not has_app_context():
+        return task
+    
+    app = current_app._get_current_object()
+    
+    def run_in_context():
+        with app.app_context():
+            return task()
+    
+    return run_in_context
+
 
 # Décorateur pour la mise en cache automatique
-def cached_method(cache_service: CacheService, ttl: int, prefix: str = "method:"):
+def cached_method(
+    cache_service: CacheService,
+    ttl: int,
+    prefix: str = "method:",
+    tags: Optional[Callable[..., Iterable[str]]] = None,
+    stale_ttl: int = 0
+):
     """
     Décorateur pour mettre en cache automatiquement les résultats de méthodes
     
+    Les appels concurrents sur une même clé sont coalescés (single-flight).
+    
     Args:
         cache_service: Instance du service de cache
         ttl: Durée de vie en secondes
         prefix: Préfixe des clés de cache
+        tags: Fonction recevant les arguments de l'appel et retournant
+              les tags d'invalidation du résultat
+        stale_ttl: Fenêtre stale-while-revalidate en secondes (0 = désactivée) ;
+                   le rafraîchissement rejoue l'appel dans un autre thread
     """
     def decorator(func):
         @wraps(func)
@@ -354,16 +1146,90 @@ def cached_method(cache_service: CacheService, ttl: int, prefix: str = "method:"
                 **kwargs
             )
             
-            # Essayer de récupérer depuis le cache
-            cached_result = cache_service.get(cache_key)
-            if cached_result is not None:
-                return cached_result
+            # Lire depuis le cache ou exécuter la fonction une seule fois
+            return cache_service.get_or_compute(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                ttl,
+                tags=tags(*args, **kwargs) if tags else None,
+                stale_ttl=stale_ttl
+            )
+        return wrapper
+    return decorator
+
+def cached_batch(
+    cache_service: CacheService,
+    ttl: int,
+    element_id: Callable[[Any], Any],
+    prefix: str = "batch:",
+    batch_index: int = 0,
+    key_args: Optional[Callable[..., Any]] = None,
+    tags: Optional[Callable[..., Iterable[str]]] = None
+):
+    """
+    Décorateur de mise en cache élément par élément d'un appel groupé
+    
+    La fonction décorée reçoit une liste d'éléments (argument positionnel
+    batch_index) et retourne un dictionnaire {element_id(élément): résultat}.
+    Les résultats déjà cachés sont lus en un seul get_many ; la fonction n'est
+    appelée que pour les éléments manquants, puis ceux-ci sont écrits en un
+    seul set_many.
+    
+    Args:
+        cache_service: Instance du service de cache
+        ttl: Durée de vie en secondes
+        element_id: Identifiant stable d'un élément (clé du résultat)
+        prefix: Préfixe des clés de cache
+        batch_index: Position de la liste d'éléments (1 pour une méthode)
+        key_args: Fonction recevant les arguments suivant la liste et retournant
+                  leur représentation stable pour la clé (par défaut les arguments bruts)
+        tags: Fonction recevant l'élément puis les arguments suivant la liste et
+              retournant les tags d'invalidation de son résultat
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            elements = list(args[batch_index])
+            context = args[batch_index + 1:]
+            key_context = key_args(*context, **kwargs) if key_args else (context, kwargs)
+            
+            keys = {
+                element_id(element): cache_service._generate_cache_key(
+                    prefix,
+                    func.__name__,
+                    element_id(element),
+                    key_context
+                )
+                for element in elements
+            }
+            cached = cache_service.get_many(keys.values())
+            
+            results = {
+                identifier: cached[key]
+                for identifier, key in keys.items()
+                if key in cached
+            }
+            missing = [element for element in elements if element_id(element) not in results]
             
-            # Exécuter la fonction et cacher le résultat
-            result = func(*args, **kwargs)
-            cache_service.set(cache_key, result, ttl)
+            if missing:
+                call_args = args[:batch_index] + (missing,) + context
+                computed = func(*call_args, **kwargs)
+                
+                to_cache = {}
+                element_tags = {}
+                for element in missing:
+                    identifier = element_id(element)
+                    if computed.get(identifier) is None:
+                        continue
+                    key = keys[identifier]
+                    to_cache[key] = computed[identifier]
+                    if tags:
+                        element_tags[key] = tags(element, *context, **kwargs)
+                
+                cache_service.set_many(to_cache, ttl, element_tags)
+                results.update(computed)
             
-            return result
+            return results
         return wrapper
     return decorator
 
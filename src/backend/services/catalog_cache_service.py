@@ -0,0 +1,271 @@
+"""
+Service de cache du catalogue (recettes, ingrédients)
+Lecture des listes via le cache et préchauffage au démarrage de l'application
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import asc, desc
+
+from models.ingredient import Ingredient
+from models.recipe import Recipe
+from models.user import User
+from schemas.recipe import recipes_schema, recipe_query_schema
+from services.cache_service import cache_service
+from services.nutrition_calculator_service import nutrition_calculator
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+
+class CatalogCacheService:
+    """Cache des listes du catalogue et préchauffage (warm-up) dans un budget de temps"""
+
+    # Paramètres du préchauffage
+    WARMUP_TIME_BUDGET = 20         # secondes
+    WARMUP_RECIPE_PAGES = 5         # pages de la liste par défaut
+    WARMUP_ACTIVE_USER_DAYS = 30    # utilisateurs connectés depuis N jours
+    WARMUP_MAX_USERS = 200
+
+    def __init__(self, cache=None):
+        """
+        Args:
+            cache: Service de cache (instance globale par défaut)
+        """
+        self.cache = cache or cache_service
+
+    def get_recipe_list(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Retourne une page de la liste des recettes (depuis le cache si possible)
+
+        Args:
+            args: Paramètres validés par RecipeQuerySchema
+
+        Returns:
+            Dict[str, Any]: Recettes sérialisées et informations de pagination
+        """
+        cache_key = self.cache._generate_cache_key(self.cache.PREFIX_RECIPE, 'list', **args)
+        return self.cache.get_or_compute(
+            cache_key,
+            lambda: self._build_recipe_list(args),
+            self.cache.TTL_RECIPE_DATA,
+            tags=[self.cache.TAG_RECIPE_CATALOG]
+        )
+
+    def _build_recipe_list(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Exécute la requête paginée des recettes et la sérialise"""
+        query = Recipe.query
+
+        # Filtres
+        if args.get('category'):
+            query = query.filter(Recipe.category == args['category'])
+        if args.get('meal_type'):
+            query = query.filter(Recipe.meal_type == args['meal_type'])
+        if args.get('search'):
+            search_term = f"%{args['search']}%"
+            query = query.filter(Recipe.name.ilike(search_term))
+        if args.get('max_calories'):
+            query = query.filter(Recipe.total_calories <= args['max_calories'])
+        if args.get('max_time'):
+            query = query.filter((Recipe.prep_time + Recipe.cook_time) <= args['max_time'])
+        if args.get('is_favorite') is not None:
+            query = query.filter(Recipe.is_favorite == args['is_favorite'])
+        if args.get('tags'):
+            # Filtrer par tags (recherche partielle dans le JSON)
+            tags = [tag.strip() for tag in args['tags'].split(',')]
+            for tag in tags:
+                query = query.filter(Recipe.tags_json.contains(tag))
+        if args.get('difficulty_level'):
+            query = query.filter(Recipe.difficulty_level == args['difficulty_level'])
+        if args.get('has_chef_mode') is not None:
+            query = query.filter(Recipe.has_chef_mode == args['has_chef_mode'])
+
+        # Tri
+        sort_field = getattr(Recipe, args.get('sort_by', 'created_at'))
+        if args.get('order', 'desc') == 'desc':
+            query = query.order_by(desc(sort_field))
+        else:
+            query = query.order_by(asc(sort_field))
+
+        # Pagination
+        paginated_recipes = query.paginate(
+            page=args.get('page', 1),
+            per_page=args.get('per_page', 20),
+            error_out=False
+        )
+
+        return {
+            'recipes': recipes_schema.dump(paginated_recipes.items),
+            'pagination': {
+                'page': paginated_recipes.page,
+                'per_page': paginated_recipes.per_page,
+                'total': paginated_recipes.total,
+                'pages': paginated_recipes.pages,
+                'has_prev': paginated_recipes.has_prev,
+                'has_next': paginated_recipes.has_next,
+                'prev_num': paginated_recipes.prev_num,
+                'next_num': paginated_recipes.next_num
+            }
+        }
+
+    def get_ingredient_list(self, category: Optional[str] = None, search: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Retourne la liste des ingrédients filtrée (depuis le cache si possible)
+
+        Args:
+            category: Catégorie (optionnel)
+            search: Texte recherché dans le nom (optionnel)
+
+        Returns:
+            List[Dict[str, Any]]: Ingrédients sérialisés, triés par nom
+        """
+        cache_key = self.cache._generate_cache_key(
+            self.cache.PREFIX_INGREDIENT, 'list', category=category, search=search
+        )
+        return self.cache.get_or_compute(
+            cache_key,
+            lambda: self._build_ingredient_list(category, search),
+            self.cache.TTL_RECIPE_DATA,
+            tags=[self.cache.TAG_INGREDIENT_CATALOG]
+        )
+
+    def _build_ingredient_list(self, category: Optional[str], search: Optional[str]) -> List[Dict[str, Any]]:
+        """Exécute la requête des ingrédients et la sérialise"""
+        query = Ingredient.query
+
+        if category:
+            query = query.filter(Ingredient.category == category)
+        if search:
+            query = query.filter(Ingredient.name.contains(search))
+
+        return [ingredient.to_dict() for ingredient in query.order_by(Ingredient.name).all()]
+
+    def invalidate_recipes(self) -> int:
+        """Invalide les pages de la liste des recettes"""
+        return self.cache.invalidate_tags(self.cache.TAG_RECIPE_CATALOG)
+
+    def invalidate_ingredients(self) -> int:
+        """Invalide les listes d'ingrédients"""
+        return self.cache.invalidate_tags(self.cache.TAG_INGREDIENT_CATALOG)
+
+    def warm_up(
+        self,
+        time_budget: Optional[float] = None,
+        progress: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Précharge le cache : pages de recettes, catalogue d'ingrédients,
+        puis profils nutritionnels des utilisateurs actifs
+
+        S'arrête dès que le budget de temps est épuisé ; les étapes sont
+        ordonnées de la plus rentable à la plus coûteuse.
+
+        Args:
+            time_budget: Durée maximale en secondes (WARMUP_TIME_BUDGET par défaut)
+            progress: Fonction recevant les messages d'avancement (logger par défaut)
+
+        Returns:
+            Dict[str, Any]: Rapport (éléments préchargés, erreurs, durée, budget épuisé)
+        """
+        budget = self.WARMUP_TIME_BUDGET if time_budget is None else time_budget
+        report = progress or logger.info
+        started = time.monotonic()
+        deadline = started + budget
+
+        summary = {
+            'recipe_pages': 0,
+            'ingredient_lists': 0,
+            'nutrition_profiles': 0,
+            'errors': 0,
+            'budget_exhausted': False
+        }
+
+        def within_budget() -> bool:
+            """Vérifie qu'il reste du temps pour une nouvelle étape"""
+            if time.monotonic() >= deadline:
+                summary['budget_exhausted'] = True
+                return False
+            return True
+
+        def attempt(counter: str, label: str, task: Callable[[], Any]) -> Any:
+            """Exécute une étape, une erreur n'interrompt pas le préchauffage"""
+            try:
+                result = task()
+                summary[counter] += 1
+                return result
+            except Exception as e:
+                summary['errors'] += 1
+                logger.warning(f"Préchauffage {label} en échec: {e}")
+                return None
+
+        # 1. Pages de la liste des recettes (paramètres par défaut du front)
+        page, pages = 1, 1
+        while page <= min(pages, self.WARMUP_RECIPE_PAGES) and within_budget():
+            args = recipe_query_schema.load({'page': page})
+            payload = attempt('recipe_pages', f"recettes page {page}", lambda: self.get_recipe_list(args))
+            if payload:
+                pages = payload['pagination']['pages']
+            page += 1
+        report(f"Préchauffage: {summary['recipe_pages']} page(s) de recettes")
+
+        # 2. Catalogue d'ingrédients (liste complète)
+        if within_budget():
+            attempt('ingredient_lists', "catalogue d'ingrédients", self.get_ingredient_list)
+            report(f"Préchauffage: {summary['ingredient_lists']} liste(s) d'ingrédients")
+
+        # 3. Profils nutritionnels des utilisateurs actifs
+        if within_budget():
+            active_since = datetime.utcnow() - timedelta(days=self.WARMUP_ACTIVE_USER_DAYS)
+            users = User.query.filter(
+                User.is_active.is_(True),
+                User.last_login >= active_since
+            ).order_by(User.last_login.desc()).limit(self.WARMUP_MAX_USERS).all()
+
+            for index, user in enumerate(users, start=1):
+                if not within_budget():
+                    break
+                attempt('nutrition_profiles', f"profil utilisateur {user.id}",
+                        lambda: nutrition_calculator.calculate_nutrition_profile(user))
+                if index % 25 == 0:
+                    report(f"Préchauffage: {index}/{len(users)} profils nutritionnels")
+            report(f"Préchauffage: {summary['nutrition_profiles']} profil(s) nutritionnel(s)")
+
+        summary['elapsed_seconds'] = round(time.monotonic() - started, 2)
+        report(
+            f"Préchauffage terminé en {summary['elapsed_seconds']}s"
+            + (" (budget épuisé)" if summary['budget_exhausted'] else "")
+        )
+        return summary
+
+    def start_background_warmup(self, app, time_budget: Optional[float] = None) -> threading.Thread:
+        """
+        Lance le préchauffage dans un thread, sans bloquer le démarrage du serveur
+
+        Les requêtes arrivant pendant le préchauffage partagent les calculs en
+        cours grâce à la coalescence (single-flight) du cache.
+
+        Args:
+            app: Application Flask
+            time_budget: Durée maximale en secondes
+
+        Returns:
+            threading.Thread: Thread de préchauffage (daemon)
+        """
+        def run():
+            with app.app_context():
+                try:
+                    self.warm_up(time_budget)
+                except Exception as e:
+                    logger.error(f"Erreur préchauffage du cache: {e}")
+
+        thread = threading.Thread(target=run, name='cache-warmup', daemon=True)
+        thread.start()
+        return thread
+
+
+# Instance globale du service
+catalog_cache = CatalogCacheService()
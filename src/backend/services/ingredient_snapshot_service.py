@@ -0,0 +1,309 @@
+"""
+Instantané des valeurs nutritionnelles du catalogue d'ingrédients
+Matrice float32 écrite sur disque et projetée en mémoire (mmap) par chaque worker
+"""
+
+import hashlib
+import json
+import logging
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from flask import current_app
+
+from database import db
+from models.ingredient import Ingredient
+from utils.batch_loader import batch_loader
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou entre processus
+    fcntl = None
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+MACRO_NUTRIENTS = ('calories', 'protein', 'carbs', 'fat')
+
+# Colonnes des macros (valeurs pour 100g)
+NUTRIENT_COLUMNS = (
+    Ingredient.calories_per_100g,
+    Ingredient.protein_per_100g,
+    Ingredient.carbs_per_100g,
+    Ingredient.fat_per_100g
+)
+
+# Colonnes de la matrice: macros puis nutriments complémentaires (extra_nutrients_json)
+INGREDIENT_NUTRIENTS = MACRO_NUTRIENTS + Ingredient.EXTENDED_NUTRIENTS
+
+
+@dataclass
+class IngredientSnapshot:
+    """Valeurs nutritionnelles du catalogue à une version donnée"""
+    version: int
+    index: np.ndarray       # (max_id + 1,) int32: ligne de l'ingrédient, -1 si absent
+    nutrients: np.ndarray   # (N, 7) float32: valeurs pour 100g dans l'ordre de INGREDIENT_NUTRIENTS
+
+    def rows(self, ingredient_ids: np.ndarray) -> np.ndarray:
+        """Lignes des ingrédients (-1 pour les IDs absents de l'instantané)"""
+        ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+        known = (ingredient_ids >= 0) & (ingredient_ids < len(self.index))
+        rows = np.full(ingredient_ids.shape, -1, dtype=np.int64)
+        rows[known] = self.index[ingredient_ids[known]]
+        return rows
+
+    def get(self, ingredient_id: int) -> Optional[np.ndarray]:
+        """Valeurs pour 100g d'un ingrédient (None si absent)"""
+        row = self.rows(np.array([ingredient_id]))[0]
+        return self.nutrients[row] if row >= 0 else None
+
+
+class IngredientSnapshotService:
+    """
+    Construit et partage l'instantané nutritionnel des ingrédients
+
+    L'instantané (index id -> ligne et matrice des nutriments) est écrit dans
+    un sous-répertoire de INGREDIENT_SNAPSHOT_DIR propre à la base
+    (empreinte de SQLALCHEMY_DATABASE_URI) sous un nom versionné, puis
+    projeté en lecture seule par chaque worker : tous partagent les mêmes
+    pages mémoire, et deux instances d'un même hôte sur des bases
+    différentes ne partagent ni version ni fichiers.
+    Le compteur de version du catalogue (fichier ingredients.version) est
+    incrémenté à chaque écriture sur /ingredients (invalidate) ; un worker
+    qui constate un changement de version projette le nouvel instantané.
+
+    Sans répertoire configuré (tests), l'instantané est gardé en mémoire
+    pour l'application courante.
+    """
+
+    VERSION_FILE = 'ingredients.version'
+    LOCK_FILE = 'ingredients.lock'
+
+    def snapshot(self) -> IngredientSnapshot:
+        """Retourne l'instantané à jour (construit ou projeté si besoin)"""
+        state = self._state()
+        directory = state['directory']
+        if directory is None:
+            if state['snapshot'] is None or state['snapshot'].version != state['version']:
+                state['snapshot'] = self._build(state['version'])
+            return state['snapshot']
+
+        version = self._read_version(directory)
+        snapshot = state['snapshot']
+        if snapshot is None or snapshot.version != version:
+            snapshot = self._open(directory, version)
+            if snapshot is None:
+                with self._lock(directory):
+                    version = self._read_version(directory)
+                    snapshot = self._open(directory, version) or self._write(directory, version)
+            state['snapshot'] = snapshot
+        return snapshot
+
+    def invalidate(self) -> int:
+        """
+        Incrémente la version du catalogue et reconstruit l'instantané
+
+        À appeler après chaque écriture sur les ingrédients (après commit).
+
+        Returns:
+            int: Nouvelle version
+        """
+        state = self._state()
+        directory = state['directory']
+        if directory is None:
+            state['version'] += 1
+            return state['version']
+
+        with self._lock(directory):
+            version = self._read_version(directory) + 1
+            state['snapshot'] = self._write(directory, version)
+            self._replace(os.path.join(directory, self.VERSION_FILE), str(version).encode())
+            self._remove_older_versions(directory, version)
+        logger.info(f"Instantané des ingrédients reconstruit (version {version})")
+        return version
+
+    def recipe_nutrition(
+        self,
+        ingredients_list: Iterable[Dict[str, Any]],
+        strict: bool = False
+    ) -> Optional[Dict[str, float]]:
+        """
+        Totaux nutritionnels d'une liste d'ingrédients ({ingredient_id, quantity} en grammes)
+
+        Les ingrédients absents de l'instantané (ajoutés hors de /ingredients)
+        sont lus en base, en une requête.
+
+        Args:
+            ingredients_list: Ingrédients de la recette
+            strict: Retourner None si une entrée n'est pas résolue (sans
+                ingredient_id ou ingrédient inconnu) au lieu d'une somme partielle
+        """
+        ingredient_ids, quantities = [], []
+        unresolved = 0
+        for ingredient_data in ingredients_list:
+            try:
+                ingredient_id = int(ingredient_data.get('ingredient_id') or 0)
+            except (TypeError, ValueError):
+                ingredient_id = 0
+            if not ingredient_id:
+                unresolved += 1
+            else:
+                ingredient_ids.append(ingredient_id)
+                quantities.append(float(ingredient_data.get('quantity') or 0))
+
+        totals = np.zeros(len(INGREDIENT_NUTRIENTS))
+        if ingredient_ids:
+            snapshot = self.snapshot()
+            rows = snapshot.rows(np.array(ingredient_ids))
+            factors = np.array(quantities) / 100.0
+            found = rows >= 0
+            totals += factors[found] @ snapshot.nutrients[rows[found]].astype(np.float64)
+
+            missing = [ingredient_ids[position] for position in np.flatnonzero(~found)]
+            if missing:
+                ingredients = batch_loader(Ingredient).load_many(missing)
+                for position in np.flatnonzero(~found):
+                    ingredient = ingredients.get(ingredient_ids[position])
+                    if ingredient:
+                        totals += factors[position] * np.array(self._nutrient_values(ingredient))
+                    else:
+                        unresolved += 1
+
+        if strict and unresolved:
+            return None
+        return dict(zip(INGREDIENT_NUTRIENTS, totals.tolist()))
+
+    def _state(self) -> Dict[str, Any]:
+        """État de l'application courante (répertoire, version, instantané projeté)"""
+        app = current_app._get_current_object()
+        state = app.extensions.get('ingredient_snapshot')
+        if state is None:
+            directory = app.config.get('INGREDIENT_SNAPSHOT_DIR')
+            if directory:
+                database_uri = str(app.config.get('SQLALCHEMY_DATABASE_URI', ''))
+                directory = os.path.join(directory, hashlib.sha1(database_uri.encode()).hexdigest()[:16])
+                os.makedirs(directory, exist_ok=True)
+            state = app.extensions['ingredient_snapshot'] = {
+                'directory': directory, 'version': 0, 'snapshot': None
+            }
+        return state
+
+    def _build(self, version: int) -> IngredientSnapshot:
+        """Lit le catalogue en une requête et construit l'instantané en mémoire"""
+        rows = db.session.query(
+            Ingredient.id, *NUTRIENT_COLUMNS, Ingredient.extra_nutrients_json
+        ).order_by(Ingredient.id).all()
+        ingredient_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        nutrients = np.zeros((len(rows), len(INGREDIENT_NUTRIENTS)), dtype=np.float32)
+        for position, row in enumerate(rows):
+            nutrients[position] = self._row_values(row[1:-1], row[-1])
+        np.nan_to_num(nutrients, copy=False)
+
+        index = np.full(int(ingredient_ids.max()) + 1 if len(ingredient_ids) else 0, -1, dtype=np.int32)
+        index[ingredient_ids] = np.arange(len(ingredient_ids), dtype=np.int32)
+        return IngredientSnapshot(version=version, index=index, nutrients=nutrients)
+
+    def _write(self, directory: str, version: int) -> IngredientSnapshot:
+        """Construit l'instantané, l'écrit sur disque et le projette"""
+        built = self._build(version)
+        for name, path in self._paths(directory, version).items():
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as handle:
+                np.save(handle, getattr(built, name))
+            os.replace(temporary, path)
+        # Catalogue vide: rien à projeter, l'instantané en mémoire suffit
+        return self._open(directory, version) or built
+
+    def _open(self, directory: str, version: int) -> Optional[IngredientSnapshot]:
+        """Projette en lecture seule l'instantané d'une version (None s'il n'existe pas)"""
+        paths = self._paths(directory, version)
+        try:
+            snapshot = IngredientSnapshot(
+                version=version,
+                index=np.load(paths['index'], mmap_mode='r'),
+                nutrients=np.load(paths['nutrients'], mmap_mode='r')
+            )
+        except (FileNotFoundError, ValueError):
+            # Fichier absent ou vide (mmap impossible): reconstruit à partir de la base
+            return None
+        if snapshot.nutrients.ndim != 2 or snapshot.nutrients.shape[1] != len(INGREDIENT_NUTRIENTS):
+            # Écrit avant l'ajout d'un nutriment: reconstruit
+            return None
+        return snapshot
+
+    def _paths(self, directory: str, version: int) -> Dict[str, str]:
+        return {
+            'index': os.path.join(directory, f"ingredients-v{version}.index.npy"),
+            'nutrients': os.path.join(directory, f"ingredients-v{version}.nutrients.npy")
+        }
+
+    def _read_version(self, directory: str) -> int:
+        try:
+            with open(os.path.join(directory, self.VERSION_FILE)) as handle:
+                return int(handle.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _remove_older_versions(self, directory: str, version: int) -> None:
+        """Supprime les anciens instantanés (les projections existantes restent valides)"""
+        current = set(self._paths(directory, version).values())
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith('ingredients-v') and name.endswith('.npy') and path not in current:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"Suppression impossible de {path}: {e}")
+
+    @staticmethod
+    def _replace(path: str, content: bytes) -> None:
+        """Écriture atomique d'un fichier"""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as handle:
+            handle.write(content)
+        os.replace(temporary, path)
+
+    @contextmanager
+    def _lock(self, directory: str):
+        """Verrou entre processus pendant la construction d'un instantané"""
+        with open(os.path.join(directory, self.LOCK_FILE), 'a') as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    @classmethod
+    def _nutrient_values(cls, ingredient: Ingredient) -> Tuple[float, ...]:
+        macros = [getattr(ingredient, column.key) for column in NUTRIENT_COLUMNS]
+        return cls._row_values(macros, ingredient.extra_nutrients_json)
+
+    @classmethod
+    def _row_values(cls, macros, extra_nutrients_json: Optional[str]) -> Tuple[float, ...]:
+        """Vecteur d'un ingrédient: macros puis nutriments complémentaires (0 si absents ou non numériques)"""
+        try:
+            extra = json.loads(extra_nutrients_json) if extra_nutrients_json else {}
+        except ValueError:
+            extra = {}
+        if not isinstance(extra, dict):
+            extra = {}
+        return tuple(cls._number(value) for value in macros) + tuple(
+            cls._number(extra.get(nutrient)) for nutrient in Ingredient.EXTENDED_NUTRIENTS
+        )
+
+    @staticmethod
+    def _number(value) -> float:
+        """Valeur numérique d'un nutriment (0 pour une valeur saisie avant validation, ex: "n/a")"""
+        try:
+            return float(value or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+
+# Instance globale du service
+ingredient_snapshot = IngredientSnapshotService()
@@ -0,0 +1,420 @@
+"""
+Générateur de plans de repas vectorisé
+Évalue des milliers de plans candidats en une fois sur les macros des recettes (NumPy)
+"""
+
+import logging
+import math
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+from models.recipe import Recipe
+from database import db
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fat')
+
+# Pondération de l'écart aux objectifs (les calories ont plus d'importance)
+SCORE_WEIGHTS = np.array([0.4, 0.25, 0.2, 0.15])
+
+
+@dataclass
+class RecipeMatrix:
+    """Recettes candidates chargées en tableaux"""
+    recipe_ids: np.ndarray          # (R,) identifiants
+    macros: np.ndarray              # (R, 4) calories, protéines, glucides, lipides
+    pools: List[np.ndarray]         # Par type de repas: indices des recettes éligibles
+    meal_types: List[str]
+
+
+class MealPlanGenerator:
+    """
+    Génère un plan de repas hebdomadaire proche des objectifs nutritionnels
+
+    Les macros des recettes sont chargées une fois (une requête) dans une
+    matrice. Un plan candidat est un tableau d'indices (jours x types de
+    repas) : la nutrition et le score de tous les candidats d'un lot sont
+    calculés en quelques opérations NumPy. Après un premier lot aléatoire,
+    les meilleurs plans sont mutés (un créneau changé) pendant quelques
+    tours. Le dépassement de max_repeats est pénalisé plutôt qu'interdit:
+    il n'est retenu que si aucun plan ne le respecte.
+
+    Avec une graine (seed), la génération est reproductible.
+
+    optimize() poursuit la recherche par recuit simulé (remplacement d'une
+    recette d'un créneau) dans un budget de temps, avec max_repeats comme
+    contrainte dure dès qu'un plan la respecte.
+    """
+
+    CANDIDATES = 1024          # Plans évalués par tour
+    REFINEMENT_ROUNDS = 12     # Tours de mutation des meilleurs plans
+    ELITE_SIZE = 32            # Plans conservés d'un tour à l'autre
+    REPEAT_PENALTY = 1.0       # Pénalité par utilisation au-delà de max_repeats
+
+    # Recuit simulé (optimize)
+    TIME_BUDGET_MS = 200
+    INITIAL_TEMPERATURE = 0.05     # En unités de score (écart relatif pondéré)
+    FINAL_TEMPERATURE = 0.0001
+    CLOCK_CHECK_INTERVAL = 256     # Itérations entre deux lectures de l'horloge
+    MAX_CONVERGENCE_POINTS = 50
+
+    def __init__(self, candidates: int = CANDIDATES, refinement_rounds: int = REFINEMENT_ROUNDS,
+                 elite_size: int = ELITE_SIZE):
+        self.candidates = candidates
+        self.refinement_rounds = refinement_rounds
+        self.elite_size = elite_size
+
+    def generate(
+        self,
+        nutritional_goals: Dict[str, float],
+        meal_types_to_include: List[str],
+        max_repeats: int = 2,
+        preferred_categories: Optional[List[str]] = None,
+        seed: Optional[int] = None,
+        matrix: Optional[RecipeMatrix] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Génère le plan le plus proche des objectifs
+
+        Args:
+            nutritional_goals: Objectifs journaliers (target_calories, target_protein, ...)
+            meal_types_to_include: Types de repas à remplir chaque jour
+            max_repeats: Nombre maximal d'utilisations d'une recette dans la semaine
+            preferred_categories: Catégories de recettes à privilégier
+            seed: Graine du générateur aléatoire (tirée au hasard si absente)
+            matrix: Recettes déjà chargées (génération en lot), sinon lues en base
+
+        Returns:
+            Dict: meals, nutrition (moyenne journalière), score, seed ; None si aucune recette
+        """
+        if matrix is None:
+            matrix = self.load_recipes(meal_types_to_include, preferred_categories)
+        if matrix is None:
+            return None
+
+        if seed is None:
+            seed = secrets.randbits(32)
+        rng = np.random.default_rng(seed)
+        targets = np.array([nutritional_goals[f'target_{nutrient}'] for nutrient in NUTRIENTS], dtype=float)
+
+        plans = self._random_plans(matrix, rng, self.candidates)
+        scores = self._score(matrix, plans, targets, max_repeats)
+
+        for _ in range(self.refinement_rounds):
+            elite = np.argsort(scores)[:self.elite_size]
+            children = self._mutate(matrix, plans[elite], rng, self.candidates)
+            child_scores = self._score(matrix, children, targets, max_repeats)
+
+            plans = np.concatenate([plans[elite], children])
+            scores = np.concatenate([scores[elite], child_scores])
+
+        best = int(np.argmin(scores))
+        best_plan = plans[best]
+
+        return {
+            'meals': self._plan_meals(matrix, best_plan),
+            'nutrition': self._plan_nutrition(matrix, best_plan),
+            'score': round(float(scores[best]), 4),
+            'seed': seed,
+            'candidates_evaluated': self.candidates * (self.refinement_rounds + 1)
+        }
+
+    def optimize(
+        self,
+        nutritional_goals: Dict[str, float],
+        meal_types_to_include: List[str],
+        max_repeats: int = 2,
+        preferred_categories: Optional[List[str]] = None,
+        seed: Optional[int] = None,
+        time_budget_ms: int = TIME_BUDGET_MS,
+        max_iterations: Optional[int] = None,
+        matrix: Optional[RecipeMatrix] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Optimise un plan par recuit simulé dans un budget de temps
+
+        Le point de départ est le meilleur plan d'un lot aléatoire. Chaque
+        itération remplace la recette d'un créneau par une autre recette
+        éligible (même type de repas, catégories préférées) ; un remplacement
+        qui ajouterait une répétition au-delà de max_repeats est refusé.
+        Le plan retourné est le meilleur rencontré.
+
+        Args:
+            nutritional_goals: Objectifs journaliers (target_calories, target_protein, ...)
+            meal_types_to_include: Types de repas à remplir chaque jour
+            max_repeats: Nombre maximal d'utilisations d'une recette dans la semaine
+            preferred_categories: Catégories de recettes à privilégier
+            seed: Graine du générateur aléatoire (tirée au hasard si absente)
+            time_budget_ms: Durée maximale de la recherche locale
+            max_iterations: Nombre maximal d'itérations (résultat reproductible avec seed)
+            matrix: Recettes déjà chargées (génération en lot), sinon lues en base
+
+        Returns:
+            Dict: comme generate(), plus les statistiques de convergence ; None si aucune recette
+        """
+        if matrix is None:
+            matrix = self.load_recipes(meal_types_to_include, preferred_categories)
+        if matrix is None:
+            return None
+
+        if seed is None:
+            seed = secrets.randbits(32)
+        rng = np.random.default_rng(seed)
+        targets = np.array([nutritional_goals[f'target_{nutrient}'] for nutrient in NUTRIENTS], dtype=float)
+
+        plans = self._random_plans(matrix, rng, self.candidates)
+        scores = self._score(matrix, plans, targets, max_repeats)
+        start = plans[int(np.argmin(scores))]
+
+        best_plan, convergence = self._anneal(
+            matrix, start, targets, max_repeats, rng, time_budget_ms / 1000.0, max_iterations
+        )
+
+        return {
+            'meals': self._plan_meals(matrix, best_plan),
+            'nutrition': self._plan_nutrition(matrix, best_plan),
+            'score': convergence['best_score'],
+            'seed': seed,
+            'candidates_evaluated': self.candidates + convergence['iterations'],
+            'convergence': convergence
+        }
+
+    def _anneal(
+        self,
+        matrix: RecipeMatrix,
+        start: np.ndarray,
+        targets: np.ndarray,
+        max_repeats: int,
+        rng: np.random.Generator,
+        time_budget: float,
+        max_iterations: Optional[int]
+    ):
+        """
+        Recuit simulé sur les remplacements de recette d'un créneau
+
+        Les totaux journaliers et les utilisations sont mis à jour à chaque
+        mouvement: évaluer un voisin coûte O(jours), sans recalcul du plan.
+        La température décroît géométriquement avec le temps écoulé.
+        """
+        macros = matrix.macros.tolist()
+        pools = [pool.tolist() for pool in matrix.pools]
+        targets = targets.tolist()
+        weights = SCORE_WEIGHTS.tolist()
+        day_count, slot_count = len(DAYS), len(pools)
+
+        plan = start.tolist()
+        daily = [[sum(macros[recipe][n] for recipe in plan[day]) for n in range(4)] for day in range(day_count)]
+        usage = {}
+        for day_meals in plan:
+            for recipe in day_meals:
+                usage[recipe] = usage.get(recipe, 0) + 1
+        excess = sum(max(count - max_repeats, 0) for count in usage.values())
+
+        def objective(daily_totals, plan_excess):
+            active = [totals for totals in daily_totals if totals[0] > 0]
+            days = len(active) or 1
+            score = 0.0
+            for n in range(4):
+                if targets[n] > 0:
+                    average = sum(totals[n] for totals in active) / days
+                    score += weights[n] * abs(targets[n] - average) / targets[n]
+            return score + plan_excess * self.REPEAT_PENALTY
+
+        current_score = objective(daily, excess)
+        best_score, best_plan = current_score, [list(day_meals) for day_meals in plan]
+        stats = {
+            'initial_score': round(current_score, 4),
+            'iterations': 0,
+            'accepted_moves': 0,
+            'improvements': 0,
+            'rejected_by_constraints': 0
+        }
+        history = [(0, 0.0, current_score)]
+
+        started = time.perf_counter()
+        temperature = self.INITIAL_TEMPERATURE
+        cooling = math.log(self.FINAL_TEMPERATURE / self.INITIAL_TEMPERATURE)
+        iteration = 0
+
+        while max_iterations is None or iteration < max_iterations:
+            # Tirages par paquets (moins d'appels NumPy dans la boucle)
+            batch = self.CLOCK_CHECK_INTERVAL
+            days = rng.integers(0, day_count, size=batch).tolist()
+            slots = rng.integers(0, slot_count, size=batch).tolist()
+            positions = rng.random(batch).tolist()
+            draws = rng.random(batch).tolist()
+
+            for day, slot, position, draw in zip(days, slots, positions, draws):
+                if max_iterations is not None and iteration >= max_iterations:
+                    break
+                iteration += 1
+                pool = pools[slot]
+                old = plan[day][slot]
+                new = pool[int(position * len(pool))]
+                if new == old:
+                    continue
+
+                # Contrainte dure: pas de répétition supplémentaire au-delà de max_repeats
+                excess_delta = (usage.get(new, 0) >= max_repeats) - (usage[old] > max_repeats)
+                if excess_delta > 0:
+                    stats['rejected_by_constraints'] += 1
+                    continue
+
+                old_totals = daily[day]
+                daily[day] = [old_totals[n] - macros[old][n] + macros[new][n] for n in range(4)]
+                candidate_score = objective(daily, excess + excess_delta)
+                delta = candidate_score - current_score
+
+                if delta <= 0 or draw < math.exp(-delta / temperature):
+                    plan[day][slot] = new
+                    usage[old] -= 1
+                    usage[new] = usage.get(new, 0) + 1
+                    excess += excess_delta
+                    current_score = candidate_score
+                    stats['accepted_moves'] += 1
+                    if current_score < best_score - 1e-12:
+                        best_score, best_plan = current_score, [list(day_meals) for day_meals in plan]
+                        stats['improvements'] += 1
+                        history.append((iteration, time.perf_counter() - started, best_score))
+                else:
+                    daily[day] = old_totals
+
+            elapsed = time.perf_counter() - started
+            if elapsed >= time_budget:
+                break
+            # Refroidissement selon le temps écoulé (ou les itérations, pour un résultat reproductible)
+            progress = iteration / max_iterations if max_iterations else elapsed / time_budget
+            temperature = self.INITIAL_TEMPERATURE * math.exp(cooling * min(progress, 1.0))
+
+        # Courbe de convergence échantillonnée (meilleur score au fil des itérations)
+        step = max(1, math.ceil(len(history) / self.MAX_CONVERGENCE_POINTS))
+        sampled = history[::step]
+        if sampled[-1] is not history[-1]:
+            sampled.append(history[-1])
+
+        stats.update({
+            'iterations': iteration,
+            'best_score': round(best_score, 4),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'time_budget_ms': round(time_budget * 1000),
+            'history': [
+                {'iteration': it, 'elapsed_ms': round(at * 1000, 1), 'best_score': round(score, 4)}
+                for it, at, score in sampled
+            ]
+        })
+        return np.array(best_plan, dtype=np.int64), stats
+
+    @staticmethod
+    def _plan_meals(matrix: RecipeMatrix, plan: np.ndarray) -> Dict[str, Dict[str, int]]:
+        """Plan au format MealPlan.meals: {jour: {type de repas: recipe_id}}"""
+        return {
+            day: {
+                meal_type: int(matrix.recipe_ids[plan[day_index, slot]])
+                for slot, meal_type in enumerate(matrix.meal_types)
+            }
+            for day_index, day in enumerate(DAYS)
+        }
+
+    @classmethod
+    def load_recipes(cls, meal_types: List[str], preferred_categories: Optional[List[str]] = None) -> Optional[RecipeMatrix]:
+        """Charge en une requête les macros des recettes candidates"""
+        if not meal_types:
+            return None
+
+        query = db.session.query(
+            Recipe.id, Recipe.meal_type,
+            Recipe.total_calories, Recipe.total_protein, Recipe.total_carbs, Recipe.total_fat
+        )
+        if preferred_categories:
+            query = query.filter(Recipe.category.in_(preferred_categories))
+        rows = query.order_by(Recipe.id).all()
+
+        if not rows:
+            return None
+
+        recipe_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        macros = np.array([[value or 0 for value in row[2:]] for row in rows], dtype=float)
+        row_meal_types = np.array([row[1] for row in rows], dtype=object)
+
+        pools = []
+        for meal_type in meal_types:
+            pool = np.flatnonzero(row_meal_types == meal_type)
+            if pool.size == 0:
+                # Aucune recette pour ce type: utiliser toutes les recettes
+                pool = np.arange(len(rows))
+            pools.append(pool)
+
+        return RecipeMatrix(recipe_ids=recipe_ids, macros=macros, pools=pools, meal_types=list(meal_types))
+
+    @staticmethod
+    def _random_plans(matrix: RecipeMatrix, rng: np.random.Generator, count: int) -> np.ndarray:
+        """Plans tirés au hasard: (count, jours, types de repas) indices de recettes"""
+        plans = np.empty((count, len(DAYS), len(matrix.pools)), dtype=np.int64)
+        for slot, pool in enumerate(matrix.pools):
+            plans[:, :, slot] = pool[rng.integers(0, pool.size, size=(count, len(DAYS)))]
+        return plans
+
+    @staticmethod
+    def _mutate(matrix: RecipeMatrix, parents: np.ndarray, rng: np.random.Generator, count: int) -> np.ndarray:
+        """Copies des meilleurs plans avec un créneau (jour, type de repas) changé"""
+        children = parents[rng.integers(0, len(parents), size=count)].copy()
+        days = rng.integers(0, len(DAYS), size=count)
+        slots = rng.integers(0, len(matrix.pools), size=count)
+
+        for slot, pool in enumerate(matrix.pools):
+            selected = np.flatnonzero(slots == slot)
+            if selected.size:
+                children[selected, days[selected], slot] = pool[rng.integers(0, pool.size, size=selected.size)]
+        return children
+
+    @classmethod
+    def _score(cls, matrix: RecipeMatrix, plans: np.ndarray, targets: np.ndarray, max_repeats: int) -> np.ndarray:
+        """
+        Score de chaque plan (plus bas = meilleur)
+
+        Écart relatif pondéré entre la moyenne journalière et les objectifs
+        (jours sans calories exclus, comme calculate_meal_plan_nutrition),
+        plus la pénalité de répétition.
+        """
+        averages = cls._daily_averages(matrix.macros, plans)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relative_diff = np.abs(targets - averages) / targets
+        relative_diff = np.where(targets > 0, relative_diff, 0)
+        scores = relative_diff @ SCORE_WEIGHTS
+
+        # Utilisations de chaque recette par plan (une seule bincount pour le lot)
+        count, recipe_count = len(plans), len(matrix.recipe_ids)
+        flat = plans.reshape(count, -1) + (np.arange(count) * recipe_count)[:, None]
+        usage = np.bincount(flat.ravel(), minlength=count * recipe_count).reshape(count, recipe_count)
+        excess = np.clip(usage - max_repeats, 0, None).sum(axis=1)
+
+        return scores + excess * cls.REPEAT_PENALTY
+
+    @staticmethod
+    def _daily_averages(macros: np.ndarray, plans: np.ndarray) -> np.ndarray:
+        """Moyenne journalière des macros de chaque plan: (plans, 4)"""
+        daily = macros[plans].sum(axis=2)                       # (plans, jours, 4)
+        active_days = daily[:, :, 0] > 0
+        day_count = np.maximum(active_days.sum(axis=1), 1)
+        return (daily * active_days[:, :, None]).sum(axis=1) / day_count[:, None]
+
+    @classmethod
+    def _plan_nutrition(cls, matrix: RecipeMatrix, plan: np.ndarray) -> Dict[str, float]:
+        """Nutrition journalière moyenne d'un plan (format de calculate_meal_plan_nutrition)"""
+        averages = cls._daily_averages(matrix.macros, plan[None])[0]
+        return {
+            f'daily_{nutrient}': round(float(value), 1)
+            for nutrient, value in zip(NUTRIENTS, averages)
+        }
+
+
+# Instance globale du générateur
+meal_plan_generator = MealPlanGenerator()
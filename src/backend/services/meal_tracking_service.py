@@ -19,6 +19,7 @@ from models.meal_tracking import MealTracking, DailyNutritionSummary, MealStatus
 from models.user import User
 from models.meal_plan import MealPlan
 from models.recipe import Recipe
+from utils.batch_loader import batch_loader
 
 
 class MealTrackingService:
@@ -52,6 +53,11 @@ class MealTrackingService:
         created_trackings = []
         day_meals = meals[day_key]
         
+        # Load all recipes of the day in one query
+        recipes = batch_loader(Recipe).prime(
+            meal_data.get('recipe_id') for meal_data in day_meals.values() if isinstance(meal_data, dict)
+        )
+        
         for meal_type, meal_data in day_meals.items():
             # Check if tracking already exists
             existing = MealTracking.query.filter_by(
@@ -63,28 +69,15 @@ class MealTrackingService:
             if existing:
                 continue  # Skip if already exists
             
-            # Create new tracking entry
-            tracking = MealTracking(
-                user_id=user_id,
-                meal_plan_id=meal_plan_id,
-                meal_date=target_date,
-                meal_type=meal_type,
-                status=MealStatus.PLANNED
+            # Create new tracking entry, planned nutrition from the primed recipe (unknown recipes are not linked)
+            recipe_id = meal_data.get('recipe_id') if isinstance(meal_data, dict) else None
+            tracking = MealTracking.create_from_meal_plan(
+                user_id, meal_plan_id, target_date, meal_type,
+                recipe_id if recipes.load(recipe_id) else None, recipes
             )
             
             # Extract nutrition data from meal plan
             if isinstance(meal_data, dict):
-                recipe_id = meal_data.get('recipe_id')
-                if recipe_id:
-                    recipe = Recipe.query.get(recipe_id)
-                    if recipe:
-                        tracking.recipe_id = recipe_id
-                        tracking.meal_name = recipe.name
-                        tracking.planned_calories = recipe.total_calories
-                        tracking.planned_protein = recipe.total_protein
-                        tracking.planned_carbs = recipe.total_carbs
-                        tracking.planned_fat = recipe.total_fat
-                
                 # Set planned nutrition from meal data if available
                 nutrition = meal_data.get('nutrition', {})
                 if nutrition:
@@ -92,9 +85,9 @@ class MealTrackingService:
                     tracking.planned_protein = nutrition.get('protein', tracking.planned_protein)
                     tracking.planned_carbs = nutrition.get('carbs', tracking.planned_carbs)
                     tracking.planned_fat = nutrition.get('fat', tracking.planned_fat)
-                    tracking.planned_fiber = nutrition.get('fiber', 0)
-                    tracking.planned_sodium = nutrition.get('sodium', 0)
-                    tracking.planned_sugar = nutrition.get('sugar', 0)
+                    tracking.planned_fiber = nutrition.get('fiber', tracking.planned_fiber or 0)
+                    tracking.planned_sodium = nutrition.get('sodium', tracking.planned_sodium or 0)
+                    tracking.planned_sugar = nutrition.get('sugar', tracking.planned_sugar or 0)
                 
                 # Set planned timing
                 timing = meal_data.get('time')
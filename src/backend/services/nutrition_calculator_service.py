@@ -11,7 +11,7 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 
 from models.user import User, db
-from services.cache_service import CacheService
+from services.cache_service import cache_service
 
 # Configuration du logger
 logger = logging.getLogger(__name__)
@@ -74,6 +74,7 @@ class NutritionCalculatorService:
     
     # Constantes de calcul
     CACHE_TTL_HOURS = 168  # 7 jours
+    STALE_WHILE_REVALIDATE_SECONDS = 3600  # Profil périmé servi 1h pendant son recalcul
     MIN_BMR = 800  # BMR minimum sécuritaire
     MAX_BMR = 4000  # BMR maximum réaliste
     MIN_CALORIES = 1000  # Calories minimum par jour
@@ -90,8 +91,8 @@ class NutritionCalculatorService:
     MAX_PROTEIN_PER_KG = 2.0    # g/kg maximum
     
     def __init__(self):
-        """Initialise le service avec cache"""
-        self.cache = CacheService()
+        """Initialise le service avec le cache partagé (L1 mémoire + Redis)"""
+        self.cache = cache_service
         logger.info("NutritionCalculatorService initialisé")
     
     def calculate_nutrition_profile(
@@ -111,14 +112,131 @@ class NutritionCalculatorService:
         Returns:
             NutritionCalculationResult: Profil nutritionnel complet
         """
-        cache_key = f"nutrition_profile:{user.id}:{goal_type or 'auto'}"
+        cache_key = f"{self.cache.PREFIX_NUTRITION_PROFILE}{user.id}:{goal_type or 'auto'}"
+        cache_tags = [self.cache.make_tag(self.cache.TAG_USER, user.id)]
+        cache_ttl = self.CACHE_TTL_HOURS * 3600  # Convertir heures en secondes
+        
+        if force_recalculate:
+            result = self._compute_nutrition_profile(user, goal_type)
+            self.cache.set_computed(
+                cache_key,
+                result.to_dict(),
+                cache_ttl,
+                tags=cache_tags,
+                stale_ttl=self.STALE_WHILE_REVALIDATE_SECONDS
+            )
+            return result
+        
+        # 1. Cache au niveau utilisateur
+        cached_result = self._get_user_cached_result(user)
+        if cached_result:
+            logger.info(f"Profil nutritionnel trouvé en cache pour utilisateur {user.id}")
+            return cached_result
+        
+        # 2. Cache service : un seul calcul pour les requêtes concurrentes
+        computed = []
+        
+        def compute():
+            result = self._compute_nutrition_profile(user, goal_type)
+            computed.append(result)
+            return result.to_dict()
+        
+        user_id = user.id
+        
+        def refresh():
+            # Exécuté dans un autre thread : recharger l'utilisateur dans sa propre session
+            refreshed_user = User.query.get(user_id)
+            if not refreshed_user:
+                return None
+            return self._compute_nutrition_profile(refreshed_user, goal_type).to_dict()
+        
+        cached_data = self.cache.get_or_compute(
+            cache_key,
+            compute,
+            cache_ttl,
+            tags=cache_tags,
+            stale_ttl=self.STALE_WHILE_REVALIDATE_SECONDS,
+            refresh=refresh
+        )
+        
+        if computed:
+            return computed[0]
+        
+        logger.info(f"Profil nutritionnel trouvé en cache pour utilisateur {user.id}")
+        # Les valeurs du cache local sont partagées : ne pas les modifier en place
+        return NutritionCalculationResult(**{
+            **cached_data,
+            'cache_used': True,
+            'calculated_at': datetime.fromisoformat(cached_data['calculated_at'])
+        })
+    
+    def calculate_nutrition_profiles(
+        self,
+        users: List[User],
+        goal_type: Optional[str] = None
+    ) -> Dict[int, NutritionCalculationResult]:
+        """
+        Calcule les profils nutritionnels de plusieurs utilisateurs en un lot
         
-        # Vérifier le cache si pas de recalcul forcé
-        if not force_recalculate:
-            cached_result = self._get_cached_result(user, cache_key)
+        Les profils encore valides dans le cache utilisateur sont repris tels
+        quels ; les autres sont calculés puis enregistrés en un seul commit
+        (au lieu d'un commit par utilisateur).
+        
+        Args:
+            users: Utilisateurs pour qui calculer
+            goal_type: Type d'objectif (optionnel, sinon détecté pour chacun)
+            
+        Returns:
+            Dict[int, NutritionCalculationResult]: Profil par ID utilisateur
+                (absent si les données de l'utilisateur sont insuffisantes)
+        """
+        profiles = {}
+        computed = []
+        for user in users:
+            cached_result = self._get_user_cached_result(user)
             if cached_result:
-                logger.info(f"Profil nutritionnel trouvé en cache pour utilisateur {user.id}")
-                return cached_result
+                profiles[user.id] = cached_result
+                continue
+            try:
+                result = self._calculate_profile(user, goal_type)
+            except ValueError as e:
+                logger.info(f"Profil nutritionnel non calculable pour utilisateur {user.id}: {e}")
+                continue
+            self._update_user_cache(user, result, commit=False)
+            profiles[user.id] = result
+            computed.append(user.id)
+        
+        if computed:
+            try:
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Erreur mise à jour du cache de {len(computed)} utilisateur(s): {e}")
+                db.session.rollback()
+        
+        logger.info(f"Profils nutritionnels en lot: {len(computed)} calculé(s), "
+                    f"{len(profiles) - len(computed)} en cache, {len(users) - len(profiles)} incomplet(s)")
+        return profiles
+    
+    def _compute_nutrition_profile(
+        self,
+        user: User,
+        goal_type: Optional[str] = None
+    ) -> NutritionCalculationResult:
+        """Calcule le profil nutritionnel et met à jour le cache utilisateur"""
+        result = self._calculate_profile(user, goal_type)
+        
+        # Mettre à jour le cache utilisateur
+        self._update_user_cache(user, result)
+        
+        logger.info(f"Profil nutritionnel calculé pour utilisateur {user.id}: BMR={result.bmr}, TDEE={result.tdee}")
+        return result
+    
+    def _calculate_profile(
+        self,
+        user: User,
+        goal_type: Optional[str] = None
+    ) -> NutritionCalculationResult:
+        """Calcule le profil nutritionnel (sans écriture en base)"""
         
         # Validation des données utilisateur
         self._validate_user_data(user)
@@ -140,7 +258,7 @@ class NutritionCalculatorService:
         water_target = self._calculate_water_needs(user)
         
         # Création du résultat
-        result = NutritionCalculationResult(
+        return NutritionCalculationResult(
             bmr=bmr,
             tdee=tdee,
             adjusted_calories=adjusted_calories,
@@ -153,13 +271,6 @@ class NutritionCalculatorService:
             cache_used=False,
             calculated_at=datetime.utcnow()
         )
-        
-        # Mettre à jour le cache utilisateur et service
-        self._update_user_cache(user, result)
-        self.cache.set(cache_key, result.to_dict(), ttl=self.CACHE_TTL_HOURS * 3600)  # Convertir heures en secondes
-        
-        logger.info(f"Profil nutritionnel calculé pour utilisateur {user.id}: BMR={bmr}, TDEE={tdee}")
-        return result
     
     def _calculate_bmr_mifflin_st_jeor(self, user: User) -> float:
         """
@@ -329,17 +440,16 @@ class NutritionCalculatorService:
         if errors:
             raise ValueError(f"Données utilisateur invalides: {'; '.join(errors)}")
     
-    def _get_cached_result(self, user: User, cache_key: str) -> Optional[NutritionCalculationResult]:
-        """Récupère un résultat depuis le cache multi-niveau"""
+    def _get_user_cached_result(self, user: User) -> Optional[NutritionCalculationResult]:
+        """Récupère un résultat depuis le cache au niveau utilisateur (colonnes cached_*)"""
         
-        # 1. Cache en mémoire (utilisateur)
         if (user.cached_bmr and user.cached_tdee and user.cache_last_updated and
             (datetime.utcnow() - user.cache_last_updated).total_seconds() < self.CACHE_TTL_HOURS * 3600):
             
             return NutritionCalculationResult(
                 bmr=user.cached_bmr,
                 tdee=user.cached_tdee,
-                adjusted_calories=user.cached_tdee,  # Approximation
+                adjusted_calories=user.daily_calories_target or user.cached_tdee,  # Objectif enregistré avec le profil
                 protein_target=user.daily_protein_target or 100,
                 carbs_target=user.daily_carbs_target or 200,
                 fat_target=user.daily_fat_target or 80,
@@ -350,17 +460,22 @@ class NutritionCalculatorService:
                 calculated_at=user.cache_last_updated
             )
         
-        # 2. Cache service (Redis/mémoire)
-        cached_data = self.cache.get(cache_key)
-        if cached_data:
-            cached_data['cache_used'] = True
-            cached_data['calculated_at'] = datetime.fromisoformat(cached_data['calculated_at'])
-            return NutritionCalculationResult(**cached_data)
-        
         return None
     
-    def _update_user_cache(self, user: User, result: NutritionCalculationResult) -> None:
-        """Met à jour le cache au niveau utilisateur"""
+    def invalidate_cached_profiles(self, user_id: int) -> int:
+        """
+        Invalide les profils nutritionnels cachés d'un utilisateur (tous objectifs)
+        
+        Args:
+            user_id: ID de l'utilisateur
+            
+        Returns:
+            int: Nombre d'entrées supprimées
+        """
+        return self.cache.invalidate_tags(self.cache.make_tag(self.cache.TAG_USER, user_id))
+    
+    def _update_user_cache(self, user: User, result: NutritionCalculationResult, commit: bool = True) -> None:
+        """Met à jour le cache au niveau utilisateur (commit=False: enregistré avec le lot)"""
         user.cached_bmr = result.bmr
         user.cached_tdee = result.tdee
         user.cache_last_updated = result.calculated_at
@@ -373,6 +488,8 @@ class NutritionCalculatorService:
         user.daily_fiber_target = result.fiber_target
         user.daily_water_target = result.water_target
         
+        if not commit:
+            return
         try:
             db.session.commit()
             logger.info(f"Cache utilisateur mis à jour pour {user.id}")
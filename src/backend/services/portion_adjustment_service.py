@@ -11,6 +11,8 @@ from decimal import Decimal, ROUND_HALF_UP
 from models.user import User
 from models.recipe import Recipe
 from services.nutrition_calculator_service import nutrition_calculator, NutritionCalculationResult
+from services.cache_service import cache_service, cached_batch
+from services.ingredient_snapshot_service import ingredient_snapshot
 
 # Configuration du logger
 logger = logging.getLogger(__name__)
@@ -42,6 +44,10 @@ class PortionAdjustmentService:
     CALORIE_TOLERANCE = 0.10  # 10% de tolérance
     MACRO_TOLERANCE = 0.15    # 15% de tolérance pour macros
     
+    # Cache des ajustements (invalidé par les tags recette/utilisateur)
+    CACHE_TTL_SECONDS = 3600
+    CACHE_PREFIX = "portion:"
+    
     def __init__(self):
         """Initialise le service"""
         logger.info("PortionAdjustmentService initialisé")
@@ -112,6 +118,57 @@ class PortionAdjustmentService:
         
         return result
     
+    @cached_batch(
+        cache_service,
+        CACHE_TTL_SECONDS,
+        element_id=lambda recipe: recipe.id,
+        prefix=CACHE_PREFIX,
+        batch_index=1,
+        key_args=lambda user, target_meal_type, nutrition_profile: (
+            user.id, target_meal_type, nutrition_profile.adjusted_calories
+        ),
+        tags=lambda recipe, user, *_: [
+            cache_service.make_tag(cache_service.TAG_RECIPE, recipe.id),
+            cache_service.make_tag(cache_service.TAG_USER, user.id)
+        ]
+    )
+    def adjust_recipes_for_user(
+        self,
+        recipes: List[Recipe],
+        user: User,
+        target_meal_type: str,
+        nutrition_profile: NutritionCalculationResult
+    ) -> Dict[int, PortionAdjustment]:
+        """
+        Ajuste un lot de recettes pour un même utilisateur et type de repas
+        
+        Les ajustements sont cachés par recette : un lot de N recettes ne coûte
+        qu'une lecture de cache groupée, et seules les recettes absentes du cache
+        sont recalculées. Le profil nutritionnel (calories ajustées) fait partie
+        de la clé, un changement de profil produit donc de nouvelles entrées.
+        
+        Args:
+            recipes: Recettes à ajuster
+            user: Utilisateur pour qui ajuster
+            target_meal_type: Type de repas (main, snack, side...)
+            nutrition_profile: Profil nutritionnel de l'utilisateur
+            
+        Returns:
+            Dict[int, PortionAdjustment]: Ajustements par recipe_id (recettes en erreur omises)
+        """
+        adjustments = {}
+        for recipe in recipes:
+            try:
+                adjustments[recipe.id] = self.adjust_recipe_for_user(
+                    recipe=recipe,
+                    user=user,
+                    target_meal_type=target_meal_type,
+                    nutrition_profile=nutrition_profile
+                )
+            except Exception as e:
+                logger.warning(f"Erreur ajustement recette {recipe.id} pour utilisateur {user.id}: {e}")
+        return adjustments
+    
     def adjust_meal_plan_portions(
         self,
         recipes: List[Recipe],
@@ -143,17 +200,15 @@ class PortionAdjustmentService:
         # Classifier les recettes par type de repas (basé sur les tags ou nom)
         recipe_types = self._classify_recipes_by_meal_type(recipes)
         
+        recipes_by_meal_type: Dict[str, List[Recipe]] = {}
         for recipe in recipes:
-            meal_type = recipe_types.get(recipe.id, 'main')
-            
-            adjustment = self.adjust_recipe_for_user(
-                recipe=recipe,
-                user=user,
-                target_meal_type=meal_type,
-                nutrition_profile=nutrition_profile
-            )
-            
-            adjustments[recipe.id] = adjustment
+            recipes_by_meal_type.setdefault(recipe_types.get(recipe.id, 'main'), []).append(recipe)
+        
+        # Un lot (une lecture de cache groupée) par type de repas
+        for meal_type, meal_recipes in recipes_by_meal_type.items():
+            adjustments.update(self.adjust_recipes_for_user(
+                meal_recipes, user, meal_type, nutrition_profile
+            ))
         
         logger.info(f"Plan de repas ajusté pour utilisateur {user.id}: {len(adjustments)} recettes")
         return adjustments
@@ -303,17 +358,20 @@ class PortionAdjustmentService:
             return round(quantity, 2)
     
     def _calculate_adjusted_nutrition(self, recipe: Recipe, multiplier: float) -> Dict[str, float]:
-        """Calcule les valeurs nutritionnelles ajustées"""
-        
-        return {
-            'calories': round((recipe.calories or 0) * multiplier, 1),
-            'protein': round((recipe.protein or 0) * multiplier, 1),
-            'carbs': round((recipe.carbs or 0) * multiplier, 1),
-            'fat': round((recipe.fat or 0) * multiplier, 1),
-            'fiber': round((recipe.fiber or 0) * multiplier, 1),
-            'sodium': round((recipe.sodium or 0) * multiplier, 1),
-            'sugar': round((recipe.sugar or 0) * multiplier, 1)
-        }
+        """Calcule les valeurs nutritionnelles ajustées (depuis l'instantané des ingrédients)"""
+        
+        nutrition = ingredient_snapshot.recipe_nutrition(recipe.ingredients, strict=True)
+        if nutrition is None or not any(nutrition.values()):
+            # Ingrédients non tous résolus: totaux enregistrés sur la recette
+            nutrition = {
+                'calories': recipe.total_calories or 0,
+                'protein': recipe.total_protein or 0,
+                'carbs': recipe.total_carbs or 0,
+                'fat': recipe.total_fat or 0,
+                **recipe.extended_totals()
+            }
+        
+        return {nutrient: round((value or 0) * multiplier, 1) for nutrient, value in nutrition.items()}
     
     def _classify_recipes_by_meal_type(self, recipes: List[Recipe]) -> Dict[int, str]:
         """Classifie les recettes par type de repas basé sur les indices disponibles"""
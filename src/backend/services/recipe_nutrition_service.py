@@ -0,0 +1,241 @@
+"""
+Calcul vectorisé des totaux nutritionnels des recettes
+Matrice creuse recettes x ingrédients (quantités) multipliée par la matrice des nutriments
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import or_, update
+
+from database import db
+from models.meal_plan import MealPlan
+from models.recipe import Recipe, RecipeIngredient
+from services.cache_service import cache_service
+from services.catalog_cache_service import catalog_cache
+from models.ingredient import Ingredient
+from services.ingredient_snapshot_service import INGREDIENT_NUTRIENTS, MACRO_NUTRIENTS, ingredient_snapshot
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Colonnes des totaux d'une recette, dans l'ordre de MACRO_NUTRIENTS
+TOTAL_COLUMNS = ('total_calories', 'total_protein', 'total_carbs', 'total_fat')
+
+
+class RecipeNutritionService:
+    """
+    Recalcule les totaux nutritionnels (macros et nutriments complémentaires) de toutes les recettes
+
+    Les lignes recipe_ingredients sont lues en une requête et forment une
+    matrice creuse (format COO : recette, ingrédient, quantité) ; son produit
+    par la matrice des nutriments de l'instantané des ingrédients donne les
+    totaux de toutes les recettes en quelques opérations NumPy. Les totaux
+    modifiés sont réécrits par lots (UPDATE groupé par clé primaire).
+
+    Après la modification d'un ingrédient, propagate_ingredient_change ne
+    recalcule que les recettes qui l'utilisent, puis les plans de repas qui
+    contiennent ces recettes.
+    """
+
+    UPDATE_BATCH_SIZE = 1000
+    TOLERANCE = 0.05    # Écart en dessous duquel un total n'est pas réécrit
+    MEAL_PLAN_PREFILTER_LIMIT = 50  # Recettes au-delà desquelles les plans sont tous relus
+
+    def compute_totals(self, recipe_ids: Optional[Iterable[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcule les totaux des recettes ayant des ingrédients référencés
+
+        Args:
+            recipe_ids: Recettes à calculer (toutes par défaut)
+
+        Returns:
+            Tuple: (IDs des recettes (R,), totaux (R, 7) arrondis au dixième, ordre INGREDIENT_NUTRIENTS)
+        """
+        query = db.session.query(
+            RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id, RecipeIngredient.quantity
+        )
+        if recipe_ids is not None:
+            query = query.filter(RecipeIngredient.recipe_id.in_(list(recipe_ids)))
+        rows = np.array(query.all(), dtype=np.float64).reshape(-1, 3)
+
+        recipe_column, ingredient_column, quantities = rows.T
+        ids, recipe_rows = np.unique(recipe_column.astype(np.int64), return_inverse=True)
+
+        snapshot = ingredient_snapshot.snapshot()
+        ingredient_rows = snapshot.rows(ingredient_column.astype(np.int64))
+        known = ingredient_rows >= 0
+
+        # Produit creux: chaque ligne (recette, ingrédient, quantité) ajoute quantité/100 x nutriments
+        contributions = (quantities[known] / 100.0)[:, None] * snapshot.nutrients[ingredient_rows[known]]
+        totals = np.column_stack([
+            np.bincount(recipe_rows[known], weights=contributions[:, column], minlength=len(ids))
+            for column in range(len(INGREDIENT_NUTRIENTS))
+        ]) if len(ids) else np.zeros((0, len(INGREDIENT_NUTRIENTS)))
+
+        return ids, np.round(totals, 1)
+
+    def recompute_totals(
+        self,
+        recipe_ids: Optional[Iterable[int]] = None,
+        dry_run: bool = False,
+        include_empty: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Recalcule et réécrit les totaux nutritionnels des recettes
+
+        Args:
+            recipe_ids: Recettes à recalculer (toutes par défaut)
+            dry_run: Calculer sans écrire
+            include_empty: Remettre à zéro les recettes de recipe_ids sans
+                plus aucun ingrédient référencé (ingrédient supprimé)
+
+        Returns:
+            Dict: Recettes calculées, modifiées et durée en secondes
+        """
+        started = time.perf_counter()
+        if recipe_ids is not None:
+            recipe_ids = list(recipe_ids)
+        ids, totals = self.compute_totals(recipe_ids)
+        if include_empty and recipe_ids:
+            empty = sorted(set(recipe_ids) - set(ids.tolist()))
+            if empty:
+                ids = np.concatenate([ids, np.array(empty, dtype=ids.dtype)])
+                totals = np.vstack([totals, np.zeros((len(empty), totals.shape[1]))])
+
+        # Totaux actuels (une requête) pour ne réécrire que les recettes modifiées
+        query = db.session.query(
+            Recipe.id, *(getattr(Recipe, column) for column in TOTAL_COLUMNS), Recipe.nutrient_totals_json
+        )
+        if recipe_ids is not None:
+            query = query.filter(Recipe.id.in_(recipe_ids))
+        current = {row[0]: self._stored_totals(row[1:-1], row[-1]) for row in query}
+
+        macro_count = len(MACRO_NUTRIENTS)
+        changes = []
+        for recipe_id, recipe_totals in zip(ids.tolist(), totals.tolist()):
+            previous = current.get(recipe_id)
+            if previous is None:
+                continue
+            if any(abs(old - new) >= self.TOLERANCE for old, new in zip(previous, recipe_totals)):
+                changes.append({
+                    'id': recipe_id,
+                    **dict(zip(TOTAL_COLUMNS, recipe_totals[:macro_count])),
+                    'nutrient_totals_json': json.dumps(
+                        dict(zip(Ingredient.EXTENDED_NUTRIENTS, recipe_totals[macro_count:]))
+                    )
+                })
+
+        if changes and not dry_run:
+            for start in range(0, len(changes), self.UPDATE_BATCH_SIZE):
+                db.session.execute(update(Recipe), changes[start:start + self.UPDATE_BATCH_SIZE])
+            db.session.commit()
+            self._invalidate_caches([change['id'] for change in changes])
+
+        result = {
+            'computed': len(ids),
+            'updated': len(changes),
+            'updated_recipe_ids': [change['id'] for change in changes],
+            'dry_run': dry_run,
+            'duration_seconds': round(time.perf_counter() - started, 3)
+        }
+        logger.info(f"Totaux nutritionnels recalculés: {result}")
+        return result
+
+    def propagate_ingredient_change(self, ingredient_id: int, recipe_ids: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+        """
+        Met à jour ce qui dépend d'un ingrédient dont les valeurs pour 100g ont changé
+
+        L'index inverse ingrédient -> recettes est la table recipe_ingredients
+        (dérivée des ingrédients JSON des recettes, indexée par ingrédient).
+        À appeler après la reconstruction de l'instantané des ingrédients.
+
+        Args:
+            ingredient_id: Ingrédient modifié ou supprimé
+            recipe_ids: Recettes dépendantes, à relever avant une suppression
+                (les lignes recipe_ingredients disparaissent avec l'ingrédient)
+
+        Returns:
+            Dict: Recettes dépendantes, recettes et plans de repas modifiés
+        """
+        if recipe_ids is None:
+            recipe_ids = RecipeIngredient.recipe_ids_for_ingredient(ingredient_id)
+        recipe_ids = list(recipe_ids)
+        result = self.recompute_totals(recipe_ids, include_empty=True)
+
+        # Ajustements de portions calculés depuis l'ingrédient: caches de toutes les recettes dépendantes
+        unchanged = set(recipe_ids) - set(result['updated_recipe_ids'])
+        if unchanged:
+            self._invalidate_caches(sorted(unchanged))
+
+        result['dependent_recipe_ids'] = sorted(recipe_ids)
+        result['meal_plan_ids'] = self._refresh_meal_plans(result['updated_recipe_ids'])
+        return result
+
+    def _refresh_meal_plans(self, recipe_ids) -> list:
+        """Recalcule les moyennes des plans contenant ces recettes et invalide leurs caches"""
+        if not recipe_ids:
+            return []
+
+        changed = set(recipe_ids)
+        query = db.session.query(MealPlan.id, MealPlan.meals_json)
+        if len(changed) <= self.MEAL_PLAN_PREFILTER_LIMIT:
+            # Préfiltre SQL (un plan contenant la recette 12 contient le texte "12"), confirmé ci-dessous
+            query = query.filter(or_(*(MealPlan.meals_json.contains(str(recipe_id)) for recipe_id in changed)))
+
+        plans = {}
+        for meal_plan_id, meals_json in query:
+            try:
+                meals = json.loads(meals_json) if meals_json else {}
+            except ValueError:
+                continue
+            if isinstance(meals, dict) and MealPlan.recipe_ids_in(meals) & changed:
+                plans[meal_plan_id] = meals
+        if not plans:
+            return []
+
+        # Macros de toutes les recettes des plans concernés en une requête
+        recipe_macros = Recipe.macros_for_ids(set().union(*map(MealPlan.recipe_ids_in, plans.values())))
+        db.session.execute(update(MealPlan), [
+            {'id': meal_plan_id, **MealPlan.daily_nutrition(meals, recipe_macros)}
+            for meal_plan_id, meals in plans.items()
+        ])
+        db.session.commit()
+
+        try:
+            cache_service.invalidate_tags(*(
+                cache_service.make_tag(cache_service.TAG_MEAL_PLAN, meal_plan_id) for meal_plan_id in plans
+            ))
+        except Exception as e:
+            logger.warning(f"Erreur lors de l'invalidation du cache des plans de repas: {e}")
+        return sorted(plans)
+
+    @staticmethod
+    def _stored_totals(macros, nutrient_totals_json) -> list:
+        """Totaux enregistrés d'une recette, dans l'ordre de INGREDIENT_NUTRIENTS"""
+        try:
+            extended = json.loads(nutrient_totals_json) if nutrient_totals_json else {}
+        except ValueError:
+            extended = {}
+        if not isinstance(extended, dict):
+            extended = {}
+        return [value or 0 for value in macros] + [
+            extended.get(nutrient) or 0 for nutrient in Ingredient.EXTENDED_NUTRIENTS
+        ]
+
+    def _invalidate_caches(self, recipe_ids) -> None:
+        """Invalide les caches des recettes modifiées"""
+        try:
+            catalog_cache.invalidate_recipes()
+            cache_service.invalidate_tags(*(
+                cache_service.make_tag(cache_service.TAG_RECIPE, recipe_id) for recipe_id in recipe_ids
+            ))
+        except Exception as e:
+            logger.warning(f"Erreur lors de l'invalidation du cache des recettes: {e}")
+
+
+# Instance globale du service
+recipe_nutrition = RecipeNutritionService()
@@ -0,0 +1,248 @@
+"""
+Écriture différée (write-behind) de l'historique des listes de courses
+Les actions sont mises en file et insérées par lots depuis un thread de fond
+"""
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, has_app_context
+
+from database import db
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Réveille le thread d'écriture lors de l'arrêt
+_WAKE_UP = object()
+
+
+class ShoppingHistoryWriter:
+    """
+    Tampon d'écriture pour shopping_list_history
+
+    record() ne fait que mettre l'action en file (horodatée à l'appel) :
+    la requête ne paie plus un INSERT + COMMIT par article coché. Le thread
+    de fond vide la file dès que BATCH_SIZE actions sont en attente ou au
+    plus tard toutes les FLUSH_INTERVAL secondes, en une transaction par lot.
+    La file est bornée : au-delà de MAX_QUEUE actions en attente, les
+    nouvelles actions sont ignorées et comptées (l'historique ne doit jamais
+    bloquer les courses).
+
+    Sans thread démarré (tests, scripts), ou depuis une autre application que
+    celle du thread, chaque action est écrite immédiatement.
+    """
+
+    FLUSH_INTERVAL = 2.0    # secondes
+    BATCH_SIZE = 100
+    MAX_QUEUE = 5000
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, batch_size: int = BATCH_SIZE,
+                 max_queue: int = MAX_QUEUE):
+        """
+        Args:
+            flush_interval: Délai maximal avant écriture d'une action
+            batch_size: Nombre d'actions déclenchant une écriture
+            max_queue: Nombre maximal d'actions en attente
+        """
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_queue)
+
+        self._app = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {'recorded': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self._atexit_registered = False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, app, flush_interval: Optional[float] = None, batch_size: Optional[int] = None) -> threading.Thread:
+        """
+        Démarre le thread d'écriture (idempotent) et la vidange à l'arrêt
+
+        Args:
+            app: Application Flask utilisée pour les écritures
+            flush_interval: Délai maximal avant écriture (secondes)
+            batch_size: Taille des lots
+
+        Returns:
+            threading.Thread: Thread d'écriture (daemon)
+        """
+        self._app = app
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        if batch_size is not None:
+            self.batch_size = batch_size
+
+        if not self.running:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='shopping-history-writer', daemon=True)
+            self._thread.start()
+
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+        return self._thread
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Arrête le thread et écrit les actions encore en attente"""
+        self._stop_event.set()
+        try:
+            self.queue.put_nowait(_WAKE_UP)
+        except queue.Full:
+            pass  # File pleine: le thread n'est pas en attente
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def record(self, shopping_list_id: int, action: str, item_id: Optional[str] = None,
+               old_value: Optional[Dict] = None, new_value: Optional[Dict] = None,
+               user_id: Optional[str] = None, metadata: Optional[Dict] = None) -> bool:
+        """
+        Met une action en file (mêmes arguments que ShoppingListHistory.record_action)
+
+        Returns:
+            bool: False si l'action a été ignorée (file pleine)
+        """
+        entry = {
+            'shopping_list_id': shopping_list_id,
+            'action': action,
+            'item_id': item_id,
+            'old_value': json.dumps(old_value) if old_value else None,
+            'new_value': json.dumps(new_value) if new_value else None,
+            'user_id': user_id,
+            'timestamp': datetime.utcnow(),
+            'metadata_json': json.dumps(metadata) if metadata else None
+        }
+
+        if not self.running or not self._in_writer_app():
+            self._write([entry])
+            return True
+
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self._increment('dropped')
+            logger.warning(f"File d'historique pleine: action '{action}' ignorée (liste {shopping_list_id})")
+            return False
+
+        self._increment('recorded')
+        return True
+
+    def flush(self) -> int:
+        """
+        Écrit immédiatement toutes les actions en attente
+
+        Returns:
+            int: Nombre d'actions écrites
+        """
+        written = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Compteurs de l'écriture différée"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            'pending': self.queue.qsize(),
+            'running': self.running,
+            'flush_interval': self.flush_interval,
+            'batch_size': self.batch_size
+        })
+        return stats
+
+    def _run(self) -> None:
+        """Boucle du thread: lots par taille ou par délai"""
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+
+    def _collect_batch(self) -> List[Dict]:
+        """Attend la première action puis complète le lot jusqu'à la taille ou au délai"""
+        try:
+            entry = self.queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        if entry is _WAKE_UP:
+            return []
+
+        batch = [entry]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _WAKE_UP:
+                break
+            batch.append(entry)
+        return batch
+
+    def _drain(self, limit: int) -> List[Dict]:
+        """Retire sans attendre jusqu'à limit actions de la file"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _WAKE_UP:
+                batch.append(entry)
+        return batch
+
+    def _in_writer_app(self) -> bool:
+        """Vrai hors contexte applicatif ou dans l'application du thread d'écriture"""
+        return not has_app_context() or current_app._get_current_object() is self._app
+
+    def _write(self, batch: List[Dict]) -> int:
+        """Insère un lot en une transaction, regroupé par liste"""
+        from models.shopping_history import ShoppingListHistory
+
+        app = current_app._get_current_object() if has_app_context() else self._app
+        if app is None:
+            logger.error(f"Historique non écrit ({len(batch)} actions): aucune application Flask")
+            self._increment('failed', len(batch))
+            return 0
+
+        batch.sort(key=lambda entry: (entry['shopping_list_id'], entry['timestamp']))
+        with app.app_context():
+            try:
+                db.session.execute(ShoppingListHistory.__table__.insert(), batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erreur lors de l'écriture de l'historique ({len(batch)} actions): {e}")
+                self._increment('failed', len(batch))
+                return 0
+
+        self._increment('written', len(batch))
+        self._increment('batches')
+        return len(batch)
+
+    def _increment(self, counter: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+
+# Instance globale du writer
+history_writer = ShoppingHistoryWriter()
@@ -5,14 +5,20 @@ Gère l'agrégation, le groupement et les calculs d'optimisation
 
 from collections import defaultdict
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Iterable, Iterator
+import csv
+import io
 import json
-from datetime import datetime
+from datetime import datetime, date, timedelta
 
-from models.recipe import Recipe
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from models.recipe import Recipe, RecipeIngredient
 from models.ingredient import Ingredient
-from models.meal_plan import MealPlan, ShoppingList
+from models.meal_plan import MealPlan, ShoppingList, ShoppingListItem, ShoppingListCategoryStats
 from database import db
+from utils.batch_loader import batch_loader
 
 class ShoppingService:
     """Service principal pour la gestion des listes de courses interactives"""
@@ -47,6 +53,27 @@ class ShoppingService:
         'bakery': 'bakery',
         'beverage': 'beverages'
     }
+    
+    # Intitulés des rayons dans l'export texte
+    EXPORT_CATEGORY_NAMES = {
+        'protein': '🥩 PROTÉINES',
+        'nuts': '🥜 OLÉAGINEUX',
+        'vegetable': '🥬 LÉGUMES FRAIS',
+        'fruit': '🍓 FRUITS',
+        'dairy': '🥛 PRODUITS LAITIERS',
+        'grain': '🌾 CÉRÉALES',
+        'condiment': '🫒 CONDIMENTS & ÉPICES',
+        'supplement': '💊 COMPLÉMENTS',
+        'other': '📦 AUTRES'
+    }
+    
+    # Export en streaming (voir stream_export)
+    STREAM_EXPORT_FORMATS = ('txt', 'csv', 'jsonl')
+    CSV_EXPORT_COLUMNS = [
+        'shopping_list_ids', 'week_start', 'store_section', 'item_id', 'name',
+        'quantity', 'unit', 'checked', 'note'
+    ]
+    EXPORT_BATCH_SIZE = 20  # Listes chargées par requête
 
     @classmethod
     def generate_optimized_shopping_list(
@@ -64,9 +91,43 @@ class ShoppingService:
         Returns:
             Dict contenant la liste optimisée avec métadonnées
         """
+        return cls._generate_from_meal_plans([meal_plan], aggregation_preferences)
+
+    @classmethod
+    def generate_consolidated_shopping_list(
+        cls,
+        meal_plans: List[MealPlan],
+        aggregation_preferences: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """
+        Génère une seule liste de courses pour plusieurs plans de repas
+        
+        Les ingrédients de toutes les recettes de tous les plans sont lus en
+        une requête puis agrégés en une passe: le nombre de requêtes ne dépend
+        pas du nombre de plans. Chaque source d'article indique son plan.
+        
+        Args:
+            meal_plans: Plans de repas sources (ex: deux foyers, deux semaines)
+            aggregation_preferences: Préférences d'agrégation utilisateur
+        
+        Returns:
+            Dict contenant la liste consolidée avec métadonnées
+        """
+        if not meal_plans:
+            raise ValueError("Aucun plan de repas fourni")
+        
+        return cls._generate_from_meal_plans(meal_plans, aggregation_preferences)
+
+    @classmethod
+    def _generate_from_meal_plans(
+        cls,
+        meal_plans: List[MealPlan],
+        aggregation_preferences: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Génération commune aux listes d'un plan et aux listes consolidées"""
         
         # Étape 1: Collecter tous les ingrédients nécessaires
-        raw_ingredients = cls._collect_ingredients_from_meal_plan(meal_plan)
+        raw_ingredients = cls._collect_ingredients_from_meal_plans(meal_plans)
         
         if not raw_ingredients:
             raise ValueError("Aucun ingrédient trouvé dans le plan de repas")
@@ -88,6 +149,14 @@ class ShoppingService:
         
         # Étape 6: Générer les métadonnées et règles d'agrégation
         aggregation_rules = cls._generate_aggregation_rules(raw_ingredients, optimized_ingredients)
+        if len(meal_plans) == 1:
+            # Plan source conservé pour les régénérations incrémentales et les statistiques
+            aggregation_rules['source_meals'] = meal_plans[0].meals
+            aggregation_rules['meal_plan_info'] = cls._meal_plan_info(meal_plans[0])
+        else:
+            # Liste consolidée: régénérée entièrement depuis ses plans
+            aggregation_rules['meal_plan_ids'] = [meal_plan.id for meal_plan in meal_plans]
+            aggregation_rules['meal_plan_info'] = cls._consolidated_meal_plan_info(meal_plans)
         
         return {
             'items': optimized_ingredients,
@@ -106,31 +175,111 @@ class ShoppingService:
     @classmethod
     def _collect_ingredients_from_meal_plan(cls, meal_plan: MealPlan) -> List[Dict]:
         """Collecte tous les ingrédients nécessaires depuis le plan de repas"""
-        ingredients_list = []
+        return cls._collect_ingredients_from_meal_plans([meal_plan])
+
+    @classmethod
+    def _collect_ingredients_from_meal_plans(cls, meal_plans: List[MealPlan]) -> List[Dict]:
+        """
+        Collecte tous les ingrédients nécessaires depuis un ou plusieurs plans
         
-        for day, meals in meal_plan.meals.items():
-            for meal_type, recipe_id in meals.items():
-                if recipe_id:
-                    recipe = Recipe.query.get(recipe_id)
-                    if recipe and recipe.ingredients:
-                        for ingredient_data in recipe.ingredients:
-                            ingredient_entry = {
-                                'recipe_id': recipe_id,
-                                'recipe_name': recipe.name,
-                                'day': day,
-                                'meal_type': meal_type,
-                                'ingredient_id': ingredient_data.get('ingredient_id'),
-                                'quantity': float(ingredient_data.get('quantity', 0)),
-                                'unit': ingredient_data.get('unit', 'unités'),
-                                'original_ingredient_data': ingredient_data
-                            }
-                            ingredients_list.append(ingredient_entry)
+        Les lignes recipe_ingredients de toutes les recettes des plans sont lues
+        en une seule requête (jointes aux recettes et ingrédients), quel que
+        soit le nombre de plans et de créneaux.
+        """
+        slots_by_plan = [(meal_plan.id, cls._meal_slots(meal_plan.meals)) for meal_plan in meal_plans]
+        entries_by_recipe = cls._load_recipe_ingredient_entries({
+            recipe_id for _, slots in slots_by_plan for recipe_id in slots.values()
+        })
+        
+        ingredients_list = []
+        for meal_plan_id, slots in slots_by_plan:
+            for (day, meal_type), recipe_id in slots.items():
+                recipe_name, entries = entries_by_recipe.get(recipe_id, (None, []))
+                for ingredient_data, ingredient_info in entries:
+                    ingredients_list.append({
+                        'meal_plan_id': meal_plan_id,
+                        'recipe_id': recipe_id,
+                        'recipe_name': recipe_name,
+                        'day': day,
+                        'meal_type': meal_type,
+                        'ingredient_id': ingredient_data['ingredient_id'],
+                        'quantity': ingredient_data['quantity'],
+                        'unit': ingredient_data['unit'],
+                        'ingredient_info': ingredient_info,
+                        'original_ingredient_data': ingredient_data
+                    })
         
         return ingredients_list
 
+    @classmethod
+    def _load_recipe_ingredient_entries(cls, recipe_ids) -> Dict[int, Tuple[str, List[Tuple[Dict, Dict]]]]:
+        """Charge en une requête les ingrédients des recettes: {recipe_id: (nom, [(donnée, info ingrédient)])}"""
+        if not recipe_ids:
+            return {}
+        
+        rows = db.session.query(
+            RecipeIngredient.recipe_id,
+            Recipe.name,
+            RecipeIngredient.ingredient_id,
+            RecipeIngredient.quantity,
+            RecipeIngredient.unit,
+            Ingredient
+        ).join(
+            Recipe, Recipe.id == RecipeIngredient.recipe_id
+        ).join(
+            Ingredient, Ingredient.id == RecipeIngredient.ingredient_id
+        ).filter(
+            RecipeIngredient.recipe_id.in_(recipe_ids)
+        ).order_by(
+            RecipeIngredient.recipe_id, RecipeIngredient.position
+        ).all()
+        
+        entries_by_recipe = {}
+        for recipe_id, recipe_name, ingredient_id, quantity, unit, ingredient in rows:
+            _, entries = entries_by_recipe.setdefault(recipe_id, (recipe_name, []))
+            entries.append((
+                {'ingredient_id': ingredient_id, 'quantity': float(quantity or 0), 'unit': unit or 'unités'},
+                cls._ingredient_info(ingredient)
+            ))
+        
+        return entries_by_recipe
+
+    @staticmethod
+    def _meal_slots(meals: Dict) -> Dict[Tuple[str, str], int]:
+        """Créneaux remplis d'un plan: {(jour, type de repas): recipe_id}"""
+        slots = {}
+        for day, day_meals in (meals or {}).items():
+            for meal_type, recipe_id in (day_meals or {}).items():
+                try:
+                    if recipe_id:
+                        slots[(day, meal_type)] = int(recipe_id)
+                except (TypeError, ValueError):
+                    continue
+        return slots
+
+    @staticmethod
+    def _item_id(ingredient_id, unit) -> str:
+        """ID stable d'un article: un article par couple (ingrédient, unité d'origine)"""
+        return f"ing_{ingredient_id}_{unit}"
+
+    @staticmethod
+    def _ingredient_info(ingredient: Ingredient) -> Dict[str, Any]:
+        """Informations d'un ingrédient reprises dans la liste de courses"""
+        return {
+            'name': ingredient.name,
+            'category': getattr(ingredient, 'category', 'other'),
+            'unit_price': getattr(ingredient, 'unit_price', None),
+            'preferred_brand': getattr(ingredient, 'preferred_brand', None)
+        }
+
     @classmethod
     def _aggregate_ingredient_quantities(cls, raw_ingredients: List[Dict]) -> List[Dict]:
-        """Agrège les quantités des mêmes ingrédients"""
+        """
+        Agrège les quantités des mêmes ingrédients en une passe
+        
+        Les informations d'ingrédient absentes des entrées brutes sont chargées
+        en une seule requête pour l'ensemble des ingrédients concernés.
+        """
         ingredient_totals = defaultdict(lambda: {
             'total_quantity': 0,
             'unit': 'unités',
@@ -150,29 +299,32 @@ class ShoppingService:
             ingredient_totals[key]['unit'] = item['unit']
             ingredient_totals[key]['ingredient_id'] = ingredient_id
             ingredient_totals[key]['sources'].append({
+                'meal_plan_id': item.get('meal_plan_id'),
                 'recipe_name': item['recipe_name'],
                 'day': item['day'],
                 'meal_type': item['meal_type'],
                 'quantity': item['quantity']
             })
-            
-            # Récupérer les informations de l'ingrédient si pas encore fait
             if not ingredient_totals[key]['ingredient_info']:
-                ingredient = Ingredient.query.get(ingredient_id)
-                if ingredient:
-                    ingredient_totals[key]['ingredient_info'] = {
-                        'name': ingredient.name,
-                        'category': getattr(ingredient, 'category', 'other'),
-                        'unit_price': getattr(ingredient, 'unit_price', None),
-                        'preferred_brand': getattr(ingredient, 'preferred_brand', None)
-                    }
+                ingredient_totals[key]['ingredient_info'] = item.get('ingredient_info')
+        
+        # Récupérer en une requête les informations encore manquantes
+        missing_ids = {data['ingredient_id'] for data in ingredient_totals.values() if not data['ingredient_info']}
+        if missing_ids:
+            infos = {
+                ingredient_id: cls._ingredient_info(ingredient)
+                for ingredient_id, ingredient in batch_loader(Ingredient).load_many(missing_ids).items()
+            }
+            for data in ingredient_totals.values():
+                if not data['ingredient_info']:
+                    data['ingredient_info'] = infos.get(data['ingredient_id'])
         
-        # Convertir en liste avec IDs uniques
+        # Convertir en liste avec IDs stables (ingrédient + unité)
         aggregated_list = []
-        for idx, (key, data) in enumerate(ingredient_totals.items()):
+        for key, data in ingredient_totals.items():
             if data['ingredient_info']:  # Ne garder que les ingrédients valides
                 aggregated_list.append({
-                    'id': f"agg_{idx + 1}",
+                    'id': cls._item_id(data['ingredient_id'], data['unit']),
                     'ingredient_id': data['ingredient_id'],
                     'name': data['ingredient_info']['name'],
                     'quantity': data['total_quantity'],
@@ -334,6 +486,30 @@ class ShoppingService:
             'version': '1.0'
         }
 
+    @classmethod
+    def _meal_plan_info(cls, meal_plan: MealPlan) -> Dict[str, Any]:
+        """Résumé du plan de repas repris dans les statistiques de la liste"""
+        return {
+            'id': meal_plan.id,
+            'week_start': meal_plan.week_start.isoformat() if meal_plan.week_start else None,
+            'total_recipes': len(cls._meal_slots(meal_plan.meals)),
+            'daily_calories': meal_plan.daily_calories,
+            'daily_protein': meal_plan.daily_protein
+        }
+
+    @classmethod
+    def _consolidated_meal_plan_info(cls, meal_plans: List[MealPlan]) -> Dict[str, Any]:
+        """Résumé des plans d'une liste consolidée (le premier plan est le plan de rattachement)"""
+        plans_info = [cls._meal_plan_info(meal_plan) for meal_plan in meal_plans]
+        weeks = [info['week_start'] for info in plans_info if info['week_start']]
+        return {
+            'id': plans_info[0]['id'],
+            'meal_plan_ids': [info['id'] for info in plans_info],
+            'week_start': min(weeks) if weeks else None,
+            'total_recipes': sum(info['total_recipes'] for info in plans_info),
+            'plans': plans_info
+        }
+
     @classmethod
     def _calculate_aggregation_savings(
         cls, 
@@ -368,46 +544,173 @@ class ShoppingService:
         Returns:
             bool: Succès de l'opération
         """
+        return cls.toggle_item(shopping_list, item_id, checked, user_id=user_id)['success']
+
+    @classmethod
+    def toggle_item(
+        cls,
+        shopping_list: ShoppingList,
+        item_id: str,
+        checked: bool,
+        expected_version: Optional[int] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Coche/décoche un article par un UPDATE atomique de sa seule ligne
+        
+        La liste elle-même n'est pas réécrite: seule sa version est incrémentée
+        côté base (version = version + 1), ce qui évite toute perte de mise à
+        jour lorsque plusieurs personnes cochent des articles en même temps.
+        
+        Args:
+            shopping_list: Liste de courses à modifier
+            item_id: ID de l'article à modifier
+            checked: Nouveau statut
+            expected_version: Version de l'article connue du client (0 si jamais
+                modifié); si elle a changé entre-temps, rien n'est modifié
+            user_id: ID utilisateur pour l'historique
+            
+        Returns:
+            Dict: {'success', 'conflict', 'item'} avec l'état actuel de l'article
+                ('not_found' si l'article n'appartient pas à la liste)
+        """
+        item_id = str(item_id)
+        list_id = shopping_list.id
+        
         try:
-            checked_items = shopping_list.checked_items.copy()
-            old_status = checked_items.get(item_id, False)
-            checked_items[item_id] = checked
+            for attempt in range(2):
+                # La ligne ne change que si son état diffère: l'ancien état est donc l'inverse
+                previous_checked = not checked
+                state = cls._update_item_state(list_id, item_id, checked, expected_version, user_id)
+                if state is not None:
+                    break
+                
+                current = ShoppingListItem.query.filter_by(shopping_list_id=list_id, item_id=item_id).first()
+                if current is not None and current.checked == checked and expected_version in (None, current.version):
+                    # Déjà dans l'état demandé: rien à écrire
+                    return {'success': True, 'conflict': False, 'item': current.to_dict()}
+                
+                if current is not None or expected_version not in (None, 0):
+                    # Modifié entre-temps par quelqu'un d'autre
+                    db.session.rollback()
+                    current_state = current.to_dict() if current else {
+                        'item_id': item_id, 'checked': False, 'version': 0
+                    }
+                    return {'success': False, 'conflict': True, 'item': current_state}
+                
+                # Première modification de l'article: création de sa ligne (non coché par défaut)
+                item = cls._find_item(shopping_list, item_id)
+                if item is None:
+                    db.session.rollback()
+                    return {'success': False, 'conflict': False, 'not_found': True, 'item': None}
+                previous_checked = False
+                try:
+                    state = ShoppingListItem(
+                        shopping_list_id=list_id, item_id=item_id, category=item.get('category', 'other'),
+                        checked=checked, version=1, updated_by=user_id
+                    )
+                    db.session.add(state)
+                    db.session.flush()
+                    break
+                except IntegrityError:
+                    # Ligne créée en parallèle: réessayer la mise à jour
+                    db.session.rollback()
+                    state = None
             
-            shopping_list.checked_items = checked_items
-            shopping_list.version += 1
-            shopping_list.last_updated = datetime.utcnow()
+            if state is None:
+                return {'success': False, 'conflict': True, 'item': None}
+            
+            ShoppingList.query.filter_by(id=list_id).update({
+                ShoppingList.version: ShoppingList.version + 1,
+                ShoppingList.last_updated: datetime.utcnow()
+            }, synchronize_session=False)
+            
+            # Compteurs de la catégorie, puis complétion (écrit la liste seulement si l'état change)
+            delta = int(checked) - int(previous_checked)
+            if delta:
+                cls._adjust_category_completion(shopping_list, state, delta)
+            total_items, completed_items = db.session.query(
+                func.coalesce(func.sum(ShoppingListCategoryStats.total_items), 0),
+                func.coalesce(func.sum(ShoppingListCategoryStats.completed_items), 0)
+            ).filter(ShoppingListCategoryStats.shopping_list_id == list_id).one()
+            cls._apply_completion_status(shopping_list, 0 < total_items <= completed_items)
+            
+            item_state = state.to_dict()
+            db.session.commit()
             
             # Enregistrer dans l'historique
             cls._record_shopping_list_change(
-                shopping_list.id,
+                list_id,
                 'item_checked' if checked else 'item_unchecked',
                 item_id,
-                {'checked': old_status},
-                {'checked': checked},
+                {'version': item_state['version'] - 1},
+                {'checked': checked, 'version': item_state['version']},
                 user_id
             )
-            
-            # Vérifier si la liste est complète
-            items = shopping_list.items
-            all_checked = all(
-                checked_items.get(str(item.get('id', '')), False) 
-                for item in items
-            )
-            
-            if all_checked and not shopping_list.is_completed:
-                shopping_list.is_completed = True
-                shopping_list.completion_date = datetime.utcnow()
-            elif not all_checked and shopping_list.is_completed:
-                shopping_list.is_completed = False
-                shopping_list.completion_date = None
-            
-            db.session.commit()
-            return True
+            return {'success': True, 'conflict': False, 'item': item_state}
             
         except Exception as e:
             db.session.rollback()
             print(f"Erreur lors de la mise à jour de l'article {item_id}: {e}")
-            return False
+            return {'success': False, 'conflict': False, 'item': None}
+
+    @classmethod
+    def _update_item_state(
+        cls,
+        list_id: int,
+        item_id: str,
+        checked: bool,
+        expected_version: Optional[int],
+        user_id: Optional[str]
+    ) -> Optional[ShoppingListItem]:
+        """UPDATE conditionnel de la ligne d'un article; None si aucune ligne modifiée (état identique, version périmée ou ligne absente)"""
+        filters = [
+            ShoppingListItem.shopping_list_id == list_id,
+            ShoppingListItem.item_id == item_id,
+            ShoppingListItem.checked != checked
+        ]
+        if expected_version is not None:
+            filters.append(ShoppingListItem.version == expected_version)
+        
+        updated = ShoppingListItem.query.filter(*filters).update({
+            ShoppingListItem.checked: checked,
+            ShoppingListItem.version: ShoppingListItem.version + 1,
+            ShoppingListItem.updated_at: datetime.utcnow(),
+            ShoppingListItem.updated_by: user_id
+        }, synchronize_session=False)
+        if not updated:
+            return None
+        
+        state = ShoppingListItem.query.filter_by(shopping_list_id=list_id, item_id=item_id).first()
+        db.session.refresh(state)
+        return state
+
+    @staticmethod
+    def _find_item(shopping_list: ShoppingList, item_id: str) -> Optional[Dict]:
+        """Article de la liste portant cet ID (None s'il n'en fait pas partie)"""
+        return next((item for item in shopping_list.items or [] if str(item.get('id', '')) == item_id), None)
+
+    @classmethod
+    def _adjust_category_completion(cls, shopping_list: ShoppingList, state: ShoppingListItem, delta: int) -> None:
+        """Reporte une bascule sur le compteur de sa catégorie (UPDATE atomique d'une ligne)"""
+        if state.category is None:
+            # Ligne antérieure à la colonne category: catégorie lue une fois dans les articles
+            item = cls._find_item(shopping_list, state.item_id)
+            if item is None:
+                return  # Article absent de la liste: aucun compteur concerné
+            state.category = item.get('category', 'other')
+        
+        updated = ShoppingListCategoryStats.query.filter_by(
+            shopping_list_id=shopping_list.id, category=state.category
+        ).update({
+            ShoppingListCategoryStats.completed_items: ShoppingListCategoryStats.completed_items + delta
+        }, synchronize_session=False)
+        
+        if not updated:
+            # Liste antérieure aux compteurs: les calculer une fois depuis les articles
+            db.session.expire(shopping_list, ['item_states', 'category_stats'])
+            shopping_list.refresh_statistics()
+            db.session.flush()
 
     @classmethod
     def _record_shopping_list_change(
@@ -419,11 +722,11 @@ class ShoppingService:
         new_value: Dict,
         user_id: Optional[str]
     ) -> None:
-        """Enregistre une modification dans l'historique"""
+        """Enregistre une modification dans l'historique (écriture différée, par lots)"""
         try:
-            from models.shopping_history import ShoppingListHistory
+            from services.shopping_history_writer import history_writer
             
-            ShoppingListHistory.record_action(
+            history_writer.record(
                 shopping_list_id=shopping_list_id,
                 action=action,
                 item_id=item_id,
@@ -440,14 +743,20 @@ class ShoppingService:
     def regenerate_shopping_list(
         cls,
         shopping_list: ShoppingList,
-        preserve_checked_items: bool = True
+        preserve_checked_items: bool = True,
+        incremental: bool = True
     ) -> Dict[str, Any]:
         """
         Régénère une liste de courses en préservant optionnellement les cases cochées
         
+        Si la liste connaît le plan dont elle est issue, seuls les créneaux
+        modifiés depuis sont appliqués (voir apply_meal_plan_changes) ;
+        sinon la liste est entièrement reconstruite.
+        
         Args:
             shopping_list: Liste existante à régénérer
             preserve_checked_items: Conserver les cases cochées
+            incremental: Autoriser la mise à jour à partir des seuls créneaux modifiés
             
         Returns:
             Dict: Nouvelle liste générée avec métadonnées
@@ -455,12 +764,39 @@ class ShoppingService:
         try:
             # Récupérer le plan de repas associé
             meal_plan = shopping_list.meal_plan
+            source_meals = (shopping_list.aggregation_rules or {}).get('source_meals')
+            
+            if incremental and preserve_checked_items and source_meals is not None:
+                changes = cls.apply_meal_plan_changes(shopping_list, source_meals, meal_plan.meals)
+                shopping_list.aggregation_rules = {
+                    **shopping_list.aggregation_rules,
+                    'meal_plan_info': cls._meal_plan_info(meal_plan)
+                }
+                db.session.commit()
+                
+                return {
+                    'success': True,
+                    'shopping_list': shopping_list.to_dict(),
+                    'statistics': {
+                        'total_items': len(shopping_list.items),
+                        'total_categories': len(shopping_list.category_grouping or {}),
+                        'incremental': True,
+                        **changes
+                    }
+                }
             
-            # Sauvegarder l'ancien état si nécessaire
-            old_checked_items = shopping_list.checked_items.copy() if preserve_checked_items else {}
+            # Sauvegarder l'ancien état si nécessaire (IDs d'articles historiques inclus)
+            old_checked_items = cls._checked_items_by_stable_id(shopping_list) if preserve_checked_items else {}
             
-            # Régénérer la liste
-            new_list_data = cls.generate_optimized_shopping_list(meal_plan)
+            # Régénérer la liste (depuis tous ses plans si elle est consolidée)
+            meal_plan_ids = (shopping_list.aggregation_rules or {}).get('meal_plan_ids')
+            if meal_plan_ids:
+                plans_by_id = {plan.id: plan for plan in MealPlan.query.filter(MealPlan.id.in_(meal_plan_ids))}
+                new_list_data = cls.generate_consolidated_shopping_list(
+                    [plans_by_id[plan_id] for plan_id in meal_plan_ids if plan_id in plans_by_id]
+                )
+            else:
+                new_list_data = cls.generate_optimized_shopping_list(meal_plan)
             
             # Restaurer les cases cochées si demandé
             if preserve_checked_items:
@@ -478,7 +814,7 @@ class ShoppingService:
             shopping_list.last_updated = datetime.utcnow()
             
             if preserve_checked_items:
-                # Reconstruire l'état des cases cochées pour les nouveaux IDs
+                # Reconstruire l'état des cases cochées pour les articles de la liste
                 new_checked_items = {}
                 for item in new_list_data['items']:
                     item_id = str(item['id'])
@@ -502,10 +838,186 @@ class ShoppingService:
                 'error': str(e)
             }
 
+    @classmethod
+    def _checked_items_by_stable_id(cls, shopping_list: ShoppingList) -> Dict[str, bool]:
+        """État des cases cochées indexé par ID stable (convertit les anciens IDs agg_N)"""
+        checked_items = shopping_list.checked_items or {}
+        by_stable_id = dict(checked_items)
+        
+        for item in shopping_list.items or []:
+            item_id = str(item.get('id', ''))
+            if item_id in checked_items and item.get('ingredient_id'):
+                stable_id = cls._item_id(item['ingredient_id'], item.get('original_unit', item.get('unit')))
+                by_stable_id[stable_id] = checked_items[item_id]
+        
+        return by_stable_id
+
+    @classmethod
+    def apply_meal_plan_changes(
+        cls,
+        shopping_list: ShoppingList,
+        old_meals: Dict,
+        new_meals: Dict
+    ) -> Dict[str, int]:
+        """
+        Met à jour une liste de courses à partir des seuls créneaux modifiés du plan
+        
+        Seuls les articles des recettes retirées ou ajoutées sont recalculés:
+        changer un dîner ne lit que les ingrédients de la nouvelle recette.
+        Les quantités retirées sont celles enregistrées dans les sources des
+        articles à la génération, pas celles de la recette actuelle (qui a pu
+        être modifiée depuis). Les articles gardent leur ID et leur état coché ;
+        ceux qui n'ont plus aucune source sont retirés. Ne valide pas la session.
+        
+        Args:
+            shopping_list: Liste à mettre à jour
+            old_meals: Repas du plan lors de la dernière génération
+            new_meals: Repas actuels du plan
+            
+        Returns:
+            Dict: Nombre de créneaux modifiés, d'articles mis à jour et retirés
+        """
+        old_slots = cls._meal_slots(old_meals)
+        new_slots = cls._meal_slots(new_meals)
+        changed_slots = [
+            slot for slot in set(old_slots) | set(new_slots)
+            if old_slots.get(slot) != new_slots.get(slot)
+        ]
+        
+        entries_by_recipe = cls._load_recipe_ingredient_entries(
+            {new_slots[slot] for slot in changed_slots if slot in new_slots}
+        )
+        
+        items = {str(item['id']): item for item in shopping_list.items or []}
+        touched = {}
+        
+        # Articles alimentés par chaque créneau retiré, d'après les sources enregistrées
+        removed_slots = {slot for slot in changed_slots if slot in old_slots}
+        contributions = defaultdict(list)
+        for item_id, item in items.items():
+            for source in item.get('sources', []):
+                slot = (source.get('day'), source.get('meal_type'))
+                if slot in removed_slots and source.get('meal_plan_id') in (None, shopping_list.meal_plan_id):
+                    contributions[slot].append(item_id)
+        
+        def touch(item_id, ingredient_data, ingredient_info):
+            """Article de base (quantité et unité d'origine) à recalculer"""
+            if item_id not in touched:
+                existing = items.get(item_id)
+                if existing:
+                    touched[item_id] = {
+                        **existing,
+                        'quantity': existing.get('original_quantity', existing['quantity']),
+                        'unit': existing.get('original_unit', existing['unit']),
+                        'sources': list(existing.get('sources', []))
+                    }
+                else:
+                    touched[item_id] = {
+                        'id': item_id,
+                        'ingredient_id': ingredient_data['ingredient_id'],
+                        'name': ingredient_info['name'],
+                        'quantity': 0,
+                        'unit': ingredient_data['unit'],
+                        'category': ingredient_info['category'],
+                        'sources': [],
+                        'unit_price': ingredient_info.get('unit_price'),
+                        'preferred_brand': ingredient_info.get('preferred_brand'),
+                        'checked': False
+                    }
+            return touched[item_id]
+        
+        removed_entries = added_entries = 0
+        for day, meal_type in sorted(changed_slots):
+            # Retirer les quantités que l'ancienne recette avait apportées au créneau
+            for item_id in contributions.get((day, meal_type), []):
+                item = touch(item_id, None, None)
+                for index, source in enumerate(item['sources']):
+                    if (source.get('day'), source.get('meal_type')) == (day, meal_type):
+                        item['quantity'] -= source['quantity']
+                        del item['sources'][index]
+                        removed_entries += 1
+                        break
+            
+            # Ajouter celles de la nouvelle recette
+            if (day, meal_type) in new_slots:
+                recipe_name, entries = entries_by_recipe.get(new_slots[(day, meal_type)], (None, []))
+                for ingredient_data, ingredient_info in entries:
+                    item_id = cls._item_id(ingredient_data['ingredient_id'], ingredient_data['unit'])
+                    item = touch(item_id, ingredient_data, ingredient_info)
+                    item['quantity'] += ingredient_data['quantity']
+                    item['sources'].append({
+                        'meal_plan_id': shopping_list.meal_plan_id,
+                        'recipe_name': recipe_name,
+                        'day': day,
+                        'meal_type': meal_type,
+                        'quantity': ingredient_data['quantity']
+                    })
+                    added_entries += 1
+        
+        # Recalculer uniquement les articles touchés
+        removed_ids = []
+        for item_id, item in touched.items():
+            if not item['sources'] or item['quantity'] <= 0:
+                items.pop(item_id, None)
+                removed_ids.append(item_id)
+            else:
+                items[item_id] = cls._optimize_units_and_quantities([item])[0]
+        
+        updated_items = list(items.values())
+        checked_items = {
+            item_id: is_checked for item_id, is_checked in (shopping_list.checked_items or {}).items()
+            if item_id not in removed_ids
+        }
+        
+        aggregation_rules = dict(shopping_list.aggregation_rules or {})
+        aggregation_rules.update({
+            'total_raw_items': aggregation_rules.get('total_raw_items', 0) + added_entries - removed_entries,
+            'total_optimized_items': len(updated_items),
+            'timestamp': datetime.utcnow().isoformat(),
+            'source_meals': new_meals
+        })
+        
+        shopping_list.items = updated_items
+        shopping_list.checked_items = checked_items
+        shopping_list.category_grouping = cls._group_by_store_categories(updated_items)
+        shopping_list.estimated_budget = cls._calculate_estimated_budget(updated_items) if updated_items else None
+        shopping_list.aggregation_rules = aggregation_rules
+        cls._update_completion_status(shopping_list, checked_items)
+        shopping_list.version += 1
+        shopping_list.last_updated = datetime.utcnow()
+        
+        return {
+            'changed_slots': len(changed_slots),
+            'updated_items': len(touched) - len(removed_ids),
+            'removed_items': len(removed_ids)
+        }
+
+    @classmethod
+    def _update_completion_status(cls, shopping_list: ShoppingList, checked_items: Dict[str, bool]) -> None:
+        """Met à jour is_completed selon l'état coché de tous les articles (jamais pour une liste vide)"""
+        cls._apply_completion_status(shopping_list, bool(shopping_list.items) and all(
+            checked_items.get(str(item.get('id', '')), False)
+            for item in shopping_list.items
+        ))
+
+    @classmethod
+    def _apply_completion_status(cls, shopping_list: ShoppingList, all_checked: bool) -> None:
+        """Passe la liste en complétée / non complétée si l'état change"""
+        if all_checked and not shopping_list.is_completed:
+            shopping_list.is_completed = True
+            shopping_list.completion_date = datetime.utcnow()
+        elif not all_checked and shopping_list.is_completed:
+            shopping_list.is_completed = False
+            shopping_list.completion_date = None
+
     @classmethod
     def get_shopping_list_statistics(cls, shopping_list: ShoppingList) -> Dict[str, Any]:
         """
-        Calcule les statistiques détaillées d'une liste de courses
+        Retourne les statistiques détaillées d'une liste de courses
+        
+        Les compteurs par catégorie sont tenus à jour à chaque bascule et
+        régénération (ShoppingListCategoryStats): la lecture ne parcourt pas
+        les articles et ne charge pas le plan de repas.
         
         Args:
             shopping_list: La liste de courses à analyser
@@ -514,66 +1026,30 @@ class ShoppingService:
             Dict: Statistiques complètes de la liste
         """
         try:
-            items = shopping_list.items or []
-            checked_items = shopping_list.checked_items or {}
+            category_rows = shopping_list.category_stats
+            if not category_rows and shopping_list.items:
+                # Liste antérieure aux compteurs: les calculer une fois
+                shopping_list.refresh_statistics()
+                db.session.commit()
+                category_rows = shopping_list.category_stats
             
-            total_items = len(items)
-            completed_items = sum(1 for item_id, is_checked in checked_items.items() if is_checked)
-            
-            # Statistiques par catégorie
-            category_stats = defaultdict(lambda: {
-                'total': 0, 
-                'completed': 0, 
-                'estimated_cost': 0,
-                'items': []
-            })
-            
-            total_estimated_cost = 0
-            
-            for item in items:
-                category = item.get('category', 'other')
-                item_id = str(item.get('id', ''))
-                
-                category_stats[category]['total'] += 1
-                category_stats[category]['items'].append(item)
-                
-                if checked_items.get(item_id, False):
-                    category_stats[category]['completed'] += 1
-                
-                # Coût estimé
-                unit_price = item.get('unit_price', 0) or 0
-                quantity = item.get('quantity', 0)
-                item_cost = unit_price * quantity
-                category_stats[category]['estimated_cost'] += item_cost
-                total_estimated_cost += item_cost
-            
-            # Calcul des pourcentages de completion par catégorie
-            for category_data in category_stats.values():
-                total_cat = category_data['total']
-                completed_cat = category_data['completed']
-                category_data['completion_percentage'] = (
-                    round((completed_cat / total_cat * 100) if total_cat > 0 else 0, 1)
-                )
+            # Statistiques par catégorie (compteurs tenus à jour à chaque bascule)
+            category_stats = {row.category: row.to_dict() for row in category_rows}
+            total_items = sum(row.total_items for row in category_rows)
+            completed_items = sum(row.completed_items for row in category_rows)
+            total_estimated_cost = sum(row.estimated_cost for row in category_rows)
             
-            # Statistiques sur les agrégations
-            aggregation_info = shopping_list.aggregation_rules or {}
+            # Statistiques sur les agrégations (sans les données internes de régénération)
+            aggregation_rules = shopping_list.aggregation_rules or {}
+            aggregation_info = {
+                key: value for key, value in aggregation_rules.items()
+                if key not in ('source_meals', 'meal_plan_info')
+            }
             
-            # Informations sur le plan de repas associé
-            meal_plan_info = {}
-            if shopping_list.meal_plan:
-                meal_plan_meals = shopping_list.meal_plan.meals or {}
-                total_recipes = len([
-                    recipe_id for day_meals in meal_plan_meals.values()
-                    for recipe_id in day_meals.values() if recipe_id
-                ])
-                
-                meal_plan_info = {
-                    'id': shopping_list.meal_plan_id,
-                    'week_start': shopping_list.week_start.isoformat(),
-                    'total_recipes': total_recipes,
-                    'daily_calories': shopping_list.meal_plan.daily_calories,
-                    'daily_protein': shopping_list.meal_plan.daily_protein
-                }
+            # Informations sur le plan de repas associé (relevées à la génération)
+            meal_plan_info = aggregation_rules.get('meal_plan_info')
+            if meal_plan_info is None and shopping_list.meal_plan:
+                meal_plan_info = cls._meal_plan_info(shopping_list.meal_plan)
             
             # Temps estimé pour faire les courses (basé sur le nombre d'articles et catégories)
             estimated_shopping_time = cls._calculate_estimated_shopping_time(
@@ -594,9 +1070,9 @@ class ShoppingService:
                     'last_updated': shopping_list.last_updated.isoformat() if shopping_list.last_updated else None,
                     'version': shopping_list.version or 1
                 },
-                'by_category': dict(category_stats),
+                'by_category': category_stats,
                 'aggregation_info': aggregation_info,
-                'meal_plan_info': meal_plan_info,
+                'meal_plan_info': meal_plan_info or {},
                 'efficiency_metrics': {
                     'aggregation_reduction': aggregation_info.get('aggregation_savings', {}).get('items_reduced', 0),
                     'items_per_category': round(total_items / len(category_stats) if category_stats else 0, 1),
@@ -770,60 +1246,249 @@ class ShoppingService:
     def _format_list_as_text(cls, shopping_list: ShoppingList) -> str:
         """Formate la liste de courses en texte plain"""
         try:
-            text_lines = []
-            text_lines.append(f"LISTE DE COURSES - Semaine du {shopping_list.week_start.strftime('%d/%m/%Y')}")
-            text_lines.append("=" * 60)
-            text_lines.append("")
+            return "\n".join(cls._iter_text_lines(cls._list_sections([shopping_list])))
+            
+        except Exception as e:
+            return f"Erreur lors du formatage: {str(e)}"
+
+    @classmethod
+    def stream_export(
+        cls,
+        shopping_lists: Iterable[ShoppingList],
+        export_format: str = 'txt',
+        merge: bool = False
+    ) -> Iterator[str]:
+        """
+        Exporte une ou plusieurs listes morceau par morceau (réponse Flask en streaming)
+        
+        Les listes sont consommées une à une et chaque article est écrit dès
+        qu'il est formaté: seule la liste en cours est en mémoire. Avec merge,
+        les articles de toutes les listes sont fusionnés (un article par
+        ingrédient et unité) en une seule liste.
+        
+        Args:
+            shopping_lists: Listes à exporter (itérable, voir iter_shopping_lists)
+            export_format: Format d'export ('txt', 'csv', 'jsonl')
+            merge: Fusionner les listes en une seule
             
+        Returns:
+            Iterator[str]: Morceaux de l'export
+        """
+        if export_format not in cls.STREAM_EXPORT_FORMATS:
+            raise ValueError(f"Format d'export non supporté: {export_format}")
+        
+        sections = cls._merged_sections(shopping_lists) if merge else cls._list_sections(shopping_lists)
+        
+        if export_format == 'csv':
+            return cls._iter_csv_export(sections)
+        if export_format == 'jsonl':
+            return cls._iter_jsonl_export(sections)
+        return (line + "\n" for line in cls._iter_text_lines(sections))
+
+    @classmethod
+    def iter_shopping_lists(
+        cls,
+        user_id: Optional[int] = None,
+        list_ids: Optional[List[int]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[ShoppingList]:
+        """
+        Charge les listes à exporter par lots, triées par semaine
+        
+        Chaque liste est détachée de la session une fois consommée pour que
+        la mémoire ne croisse pas avec le nombre de semaines exportées.
+        """
+        query = db.session.query(ShoppingList.id)
+        if user_id is not None:
+            # Les listes appartiennent à l'utilisateur de leur plan de repas
+            query = query.join(MealPlan, ShoppingList.meal_plan_id == MealPlan.id).filter(
+                MealPlan.user_id == user_id
+            )
+        if list_ids:
+            query = query.filter(ShoppingList.id.in_(list_ids))
+        if start_date:
+            query = query.filter(ShoppingList.week_start >= start_date)
+        if end_date:
+            query = query.filter(ShoppingList.week_start <= end_date)
+        ids = [row[0] for row in query.order_by(ShoppingList.week_start, ShoppingList.id)]
+        
+        for offset in range(0, len(ids), batch_size):
+            chunk = ids[offset:offset + batch_size]
+            batch = {
+                shopping_list.id: shopping_list
+                for shopping_list in ShoppingList.query.filter(ShoppingList.id.in_(chunk))
+            }
+            for shopping_list in (batch[list_id] for list_id in chunk if list_id in batch):
+                yield shopping_list
+                db.session.expunge(shopping_list)
+
+    @classmethod
+    def _list_sections(cls, shopping_lists: Iterable[ShoppingList]) -> Iterator[Dict[str, Any]]:
+        """Une section d'export par liste: en-tête et articles groupés par rayon"""
+        for shopping_list in shopping_lists:
+            checked_items = shopping_list.checked_items or {}
+            yield {
+                'shopping_list_ids': [shopping_list.id],
+                'title': f"LISTE DE COURSES - Semaine du {shopping_list.week_start.strftime('%d/%m/%Y')}",
+                'week_start': shopping_list.week_start,
+                'estimated_budget': shopping_list.estimated_budget,
+                'categories': cls._group_by_store_categories([
+                    dict(item, checked=checked_items.get(str(item.get('id', '')), False))
+                    for item in shopping_list.items or []
+                ])
+            }
+
+    @classmethod
+    def _merged_sections(cls, shopping_lists: Iterable[ShoppingList]) -> Iterator[Dict[str, Any]]:
+        """
+        Fusionne les listes en une section unique
+        
+        Les quantités d'un même ingrédient sont additionnées dans son unité de
+        base (g, ml...) puis reconverties pour l'affichage ;
+        l'article fusionné est coché s'il est coché dans toutes les listes.
+        La mémoire est bornée par le nombre d'articles distincts.
+        """
+        merged = {}
+        list_ids = []
+        weeks = []
+        budget = None
+        
+        for shopping_list in shopping_lists:
+            list_ids.append(shopping_list.id)
+            weeks.append(shopping_list.week_start)
             if shopping_list.estimated_budget:
-                text_lines.append(f"Budget estimé: {shopping_list.estimated_budget}€")
-                text_lines.append("")
+                budget = (budget or 0) + shopping_list.estimated_budget
             
-            # Grouper par catégorie
-            categorized = cls._group_by_store_categories(shopping_list.items or [])
             checked_items = shopping_list.checked_items or {}
+            for item in shopping_list.items or []:
+                # Quantité dans l'unité de base (avant conversion d'affichage: 1.2 kg -> 1200 g)
+                quantity = item.get('original_quantity', item.get('quantity', 0))
+                unit = item.get('original_unit', item.get('unit', ''))
+                key = (item.get('ingredient_id') or item.get('name'), unit)
+                checked = checked_items.get(str(item.get('id', '')), False)
+                entry = merged.get(key)
+                if entry is None:
+                    merged[key] = {
+                        'id': item.get('id'),
+                        'ingredient_id': item.get('ingredient_id'),
+                        'name': item.get('name', ''),
+                        'quantity': quantity,
+                        'unit': unit,
+                        'category': item.get('category', 'other'),
+                        'unit_price': item.get('unit_price'),
+                        'lists': 1,
+                        'checked': checked
+                    }
+                else:
+                    entry['quantity'] += quantity
+                    entry['lists'] += 1
+                    entry['checked'] = entry['checked'] and checked
+        
+        if not list_ids:
+            return
+        
+        for entry in merged.values():
+            # Conversion d'affichage appliquée au total fusionné
+            entry['quantity'], entry['unit'], _ = cls._apply_unit_conversion(
+                round(entry['quantity'], 2), entry['unit'], {}
+            )
+            entry['quantity'] = round(entry['quantity'], 2)
+            entry['note'] = f"{entry.pop('lists')} liste(s)"
+        
+        first_week, last_week = min(weeks), max(weeks)
+        yield {
+            'shopping_list_ids': list_ids,
+            'title': (
+                f"LISTE DE COURSES - Du {first_week.strftime('%d/%m/%Y')} "
+                f"au {(last_week + timedelta(days=6)).strftime('%d/%m/%Y')} ({len(list_ids)} listes)"
+            ),
+            'week_start': first_week,
+            'estimated_budget': round(budget, 2) if budget else None,
+            'categories': cls._group_by_store_categories(list(merged.values()))
+        }
+
+    @classmethod
+    def _iter_text_lines(cls, sections: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """Lignes de l'export texte"""
+        for section in sections:
+            yield section['title']
+            yield "=" * 60
+            yield ""
             
-            category_names = {
-                'protein': '🥩 PROTÉINES',
-                'nuts': '🥜 OLÉAGINEUX',
-                'vegetable': '🥬 LÉGUMES FRAIS',
-                'fruit': '🍓 FRUITS',
-                'dairy': '🥛 PRODUITS LAITIERS',
-                'grain': '🌾 CÉRÉALES',
-                'condiment': '🫒 CONDIMENTS & ÉPICES',
-                'supplement': '💊 COMPLÉMENTS',
-                'other': '📦 AUTRES'
-            }
+            if section['estimated_budget']:
+                yield f"Budget estimé: {section['estimated_budget']}€"
+                yield ""
             
-            for category, items in categorized.items():
+            for category, items in section['categories'].items():
                 if items:
-                    category_name = category_names.get(category, category.upper())
-                    text_lines.append(category_name)
-                    text_lines.append("-" * len(category_name))
+                    category_name = cls.EXPORT_CATEGORY_NAMES.get(category, category.upper())
+                    yield category_name
+                    yield "-" * len(category_name)
                     
                     for item in items:
-                        item_id = str(item.get('id', ''))
-                        status = '✓' if checked_items.get(item_id, False) else '☐'
-                        name = item.get('name', '')
-                        quantity = item.get('quantity', 0)
-                        unit = item.get('unit', '')
-                        note = item.get('note', '')
-                        
-                        line = f"{status} {name} - {quantity} {unit}"
-                        if note:
-                            line += f" ({note})"
-                        text_lines.append(line)
+                        status = '✓' if item.get('checked') else '☐'
+                        line = f"{status} {item.get('name', '')} - {item.get('quantity', 0)} {item.get('unit', '')}"
+                        if item.get('note'):
+                            line += f" ({item['note']})"
+                        yield line
                     
-                    text_lines.append("")
-            
-            text_lines.append("=" * 60)
-            text_lines.append(f"Généré le {datetime.utcnow().strftime('%d/%m/%Y à %H:%M')}")
-            text_lines.append("DietTracker - Application de planification nutritionnelle")
-            
-            return "\n".join(text_lines)
-            
-        except Exception as e:
-            return f"Erreur lors du formatage: {str(e)}"
+                    yield ""
+        
+        yield "=" * 60
+        yield f"Généré le {datetime.utcnow().strftime('%d/%m/%Y à %H:%M')}"
+        yield "DietTracker - Application de planification nutritionnelle"
+
+    @classmethod
+    def _iter_csv_export(cls, sections: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """Lignes de l'export CSV (une ligne par article)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        def flush_row(row):
+            writer.writerow(row)
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return value
+        
+        yield flush_row(cls.CSV_EXPORT_COLUMNS)
+        for section in sections:
+            list_ids = ';'.join(str(list_id) for list_id in section['shopping_list_ids'])
+            week_start = section['week_start'].isoformat()
+            for category, items in section['categories'].items():
+                for item in items:
+                    yield flush_row([
+                        list_ids, week_start, category, item.get('id', ''), item.get('name', ''),
+                        item.get('quantity', 0), item.get('unit', ''),
+                        1 if item.get('checked') else 0, item.get('note', '')
+                    ])
+
+    @classmethod
+    def _iter_jsonl_export(cls, sections: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """Lignes de l'export JSON lines: un en-tête par liste puis un objet par article"""
+        for section in sections:
+            yield json.dumps({
+                'type': 'shopping_list',
+                'shopping_list_ids': section['shopping_list_ids'],
+                'title': section['title'],
+                'week_start': section['week_start'].isoformat(),
+                'estimated_budget': section['estimated_budget']
+            }, ensure_ascii=False) + "\n"
+            for category, items in section['categories'].items():
+                for item in items:
+                    yield json.dumps({
+                        'type': 'item',
+                        'store_section': category,
+                        'id': item.get('id'),
+                        'name': item.get('name', ''),
+                        'quantity': item.get('quantity', 0),
+                        'unit': item.get('unit', ''),
+                        'category': item.get('category', 'other'),
+                        'checked': bool(item.get('checked')),
+                        'note': item.get('note', '')
+                    }, ensure_ascii=False) + "\n"
 
     @classmethod
     def _get_mime_type(cls, export_format: str) -> str:
@@ -832,6 +1497,8 @@ class ShoppingService:
             'json': 'application/json',
             'pdf': 'application/pdf',
             'txt': 'text/plain',
-            'email': 'text/plain'
+            'email': 'text/plain',
+            'csv': 'text/csv',
+            'jsonl': 'application/x-ndjson'
         }
         return mime_types.get(export_format, 'application/octet-stream')
\ No newline at end of file
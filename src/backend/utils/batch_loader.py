@@ -0,0 +1,107 @@
+"""
+Chargement groupé des modèles par ID, mémoïsé pendant la requête
+Remplace les Model.query.get() appelés dans une boucle par une requête IN
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import g, has_request_context
+
+
+class BatchLoader:
+    """
+    Charge les instances d'un modèle par ID en regroupant les lectures
+
+    Les IDs annoncés (prime) sont mis en attente puis résolus ensemble, en une
+    requête IN, au premier accès (load, load_many). Les instances trouvées,
+    comme les IDs absents de la base, sont mémoïsés : une recette déjà chargée
+    pendant la requête n'est plus relue.
+
+    Les instances sont celles de la session courante (identity map) : les
+    modifications faites pendant la requête restent visibles.
+    """
+
+    # Nombre maximal d'IDs par requête IN (limite de variables de SQLite)
+    CHUNK_SIZE = 500
+
+    def __init__(self, model):
+        """
+        Args:
+            model: Modèle SQLAlchemy ayant une clé primaire "id"
+        """
+        self.model = model
+        self._pending = set()
+        self._loaded: Dict[int, Optional[Any]] = {}
+
+    def prime(self, ids: Iterable[Any]) -> 'BatchLoader':
+        """Met en attente des IDs (les valeurs vides ou non entières sont ignorées)"""
+        for raw_id in ids:
+            model_id = self._normalize(raw_id)
+            if model_id is not None and model_id not in self._loaded:
+                self._pending.add(model_id)
+        return self
+
+    def load(self, model_id: Any) -> Optional[Any]:
+        """Retourne l'instance d'un ID (None si absente), avec les IDs en attente"""
+        model_id = self._normalize(model_id)
+        if model_id is None:
+            return None
+        self.prime([model_id])
+        self._flush()
+        return self._loaded.get(model_id)
+
+    def load_many(self, ids: Iterable[Any]) -> Dict[int, Any]:
+        """Retourne {id: instance} des IDs trouvés (une requête pour tous les IDs inconnus)"""
+        model_ids = [model_id for model_id in map(self._normalize, ids) if model_id is not None]
+        self.prime(model_ids)
+        self._flush()
+        return {
+            model_id: self._loaded[model_id]
+            for model_id in model_ids
+            if self._loaded.get(model_id) is not None
+        }
+
+    def clear(self) -> None:
+        """Oublie les instances mémoïsées (ex: après suppression)"""
+        self._pending.clear()
+        self._loaded.clear()
+
+    def _flush(self) -> None:
+        """Résout les IDs en attente en requêtes IN"""
+        if not self._pending:
+            return
+
+        pending: List[int] = sorted(self._pending)
+        self._pending.clear()
+        for start in range(0, len(pending), self.CHUNK_SIZE):
+            chunk = pending[start:start + self.CHUNK_SIZE]
+            for instance in self.model.query.filter(self.model.id.in_(chunk)).all():
+                self._loaded[instance.id] = instance
+            for model_id in chunk:
+                self._loaded.setdefault(model_id, None)
+
+    @staticmethod
+    def _normalize(raw_id: Any) -> Optional[int]:
+        if raw_id is None or isinstance(raw_id, bool):
+            return None
+        try:
+            return int(raw_id)
+        except (TypeError, ValueError):
+            return None
+
+
+def batch_loader(model) -> BatchLoader:
+    """
+    Retourne le chargeur du modèle pour la requête HTTP en cours
+
+    Le chargeur est conservé sur flask.g : tous les services appelés pendant
+    la requête partagent ses instances mémoïsées. Hors requête (scripts,
+    tâches de fond), un chargeur neuf est retourné à chaque appel.
+    """
+    if not has_request_context():
+        return BatchLoader(model)
+
+    loaders = g.setdefault('batch_loaders', {})
+    if model not in loaders:
+        loaders[model] = BatchLoader(model)
+    return loaders[model]
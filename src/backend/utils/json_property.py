@@ -0,0 +1,60 @@
+"""
+Propriétés JSON mémoïsées pour les modèles SQLAlchemy
+Évite de reparser une colonne *_json à chaque accès à l'attribut
+"""
+
+import json
+from typing import Any, Callable
+
+
+class JSONProperty:
+    """
+    Expose une colonne Text contenant du JSON sous forme de valeur Python
+
+    La valeur parsée est conservée sur l'instance avec la chaîne dont elle
+    provient : tant que la colonne référence la même chaîne, les accès suivants
+    ne reparsent pas. Toute affectation de la colonne (via cette propriété,
+    directement sur *_json, ou par un rechargement depuis la base) remplace la
+    chaîne et invalide donc la valeur mémoïsée.
+
+    La valeur retournée est partagée entre les accès et n'est pas copiée
+    (une copie profonde coûte plus cher que le json.loads évité). Une
+    modification en place n'est donc pas enregistrée : la colonne n'est pas
+    marquée modifiée, mais les accès suivants voient la valeur modifiée.
+    Toujours réaffecter la valeur modifiée (ex: items = liste.items ;
+    items.append(article) ; liste.items = items), ce qui la sérialise.
+    """
+
+    def __init__(self, column_name: str, default_factory: Callable[[], Any] = list):
+        """
+        Args:
+            column_name: Nom de la colonne JSON (ex: "ingredients_json")
+            default_factory: Valeur retournée si la colonne est vide
+        """
+        self.column_name = column_name
+        self.default_factory = default_factory
+        self.memo_attr = f"_{column_name}_parsed"
+
+    def __set_name__(self, owner, name):
+        self.__doc__ = f"Valeur parsée de {owner.__name__}.{self.column_name}"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        raw = getattr(instance, self.column_name)
+        if not raw:
+            return self.default_factory()
+
+        memo = instance.__dict__.get(self.memo_attr)
+        if memo is not None and memo[0] is raw:
+            return memo[1]
+
+        value = json.loads(raw)
+        instance.__dict__[self.memo_attr] = (raw, value)
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.column_name, json.dumps(value))
+        # La valeur fournie reste modifiable par l'appelant : reparser au prochain accès
+        instance.__dict__.pop(self.memo_attr, None)
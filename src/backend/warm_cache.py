@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Script de préchauffage du cache (recettes, ingrédients, profils nutritionnels).
+Utile après un déploiement lorsque Redis est partagé entre les workers.
+
+Usage: python warm_cache.py [--budget SECONDES]
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Configuration du path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Le préchauffage est lancé ici, pas dans un thread au démarrage de l'application
+os.environ['CACHE_WARMUP_ON_STARTUP'] = 'false'
+
+
+def warm_cache(time_budget):
+    """Précharge le cache dans le budget de temps donné."""
+    from main import create_app
+    from services.cache_service import cache_service
+    from services.catalog_cache_service import catalog_cache
+
+    app = create_app()
+
+    with app.app_context():
+        if not cache_service.connected:
+            print("⚠️ Redis non connecté - le cache local de ce processus sera perdu à la sortie")
+
+        print(f"🔥 Préchauffage du cache (budget: {time_budget}s)...")
+        summary = catalog_cache.warm_up(time_budget, progress=lambda message: print(f"   {message}"))
+
+        print(f"✅ {summary['recipe_pages']} page(s) de recettes, "
+              f"{summary['ingredient_lists']} liste(s) d'ingrédients, "
+              f"{summary['nutrition_profiles']} profil(s) nutritionnel(s)")
+        if summary['errors']:
+            print(f"⚠️ {summary['errors']} erreur(s) pendant le préchauffage")
+        return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Préchauffage du cache DietTracker")
+    parser.add_argument('--budget', type=float, default=60,
+                        help="Durée maximale du préchauffage en secondes (défaut: 60)")
+    options = parser.parse_args()
+
+    summary = warm_cache(options.budget)
+    sys.exit(1 if summary['errors'] else 0)
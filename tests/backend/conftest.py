@@ -0,0 +1,30 @@
+"""
+Fixtures partagées des tests backend
+Application Flask de test avec base SQLite en mémoire, recréée pour chaque test
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from main import create_app
+from database import db
+
+
+@pytest.fixture
+def app():
+    """Application Flask avec base SQLite en mémoire"""
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    """Client de test Flask"""
+    return app.test_client()
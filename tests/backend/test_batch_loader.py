@@ -0,0 +1,94 @@
+"""
+Tests unitaires pour le chargement groupé par ID
+Teste la requête IN unique, la mémoïsation sur flask.g et les routes portées
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.ingredient import Ingredient
+from models.recipe import Recipe
+from utils.batch_loader import BatchLoader, batch_loader
+
+
+class TestBatchLoader:
+    """Tests du chargeur groupé sur base réelle"""
+
+    @pytest.fixture
+    def ingredients(self, app):
+        """Cinq ingrédients de 100 à 500 kcal pour 100g"""
+        ingredients = [
+            Ingredient(name=f"Ingrédient {index}", category='autres', unit='g',
+                       calories_per_100g=index * 100, protein_per_100g=index * 10,
+                       carbs_per_100g=index * 5, fat_per_100g=index)
+            for index in range(1, 6)
+        ]
+        db.session.add_all(ingredients)
+        db.session.commit()
+        return ingredients
+
+    def _count_queries(self, func):
+        """Exécute func et retourne (résultat, nombre de requêtes SQL)"""
+        from sqlalchemy import event
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return result, len(statements)
+
+    def test_pending_ids_resolved_in_one_query(self, ingredients):
+        """Test la résolution groupée et la mémoïsation des IDs trouvés ou absents"""
+        loader = BatchLoader(Ingredient).prime([ingredient.id for ingredient in ingredients] + [999, None, 'abc'])
+
+        first, queries = self._count_queries(lambda: loader.load(ingredients[0].id))
+        assert first is ingredients[0]
+        assert queries == 1
+
+        found, queries = self._count_queries(
+            lambda: loader.load_many([str(ingredients[1].id), ingredients[4].id, 999])
+        )
+        assert found == {ingredients[1].id: ingredients[1], ingredients[4].id: ingredients[4]}
+        assert loader.load(999) is None
+        assert queries == 0
+
+    def test_loader_shared_during_request(self, app, ingredients):
+        """Test le chargeur partagé sur flask.g pendant une requête"""
+        with app.test_request_context():
+            loader = batch_loader(Ingredient)
+            assert batch_loader(Ingredient) is loader
+            loader.load(ingredients[0].id)
+
+            _, queries = self._count_queries(lambda: batch_loader(Ingredient).load(ingredients[0].id))
+            assert queries == 0
+
+    def test_cooking_guide_names_in_one_query(self, client, ingredients):
+        """Test que le guide de cuisson nomme tous ses ingrédients en une requête"""
+        import json
+
+        recipe = Recipe(
+            name='Bol complet', category='lunch', meal_type='repas2', has_chef_mode=True,
+            ingredients_json=json.dumps(
+                [{'ingredient_id': ingredient.id, 'quantity': 50} for ingredient in ingredients]
+                + [{'ingredient_id': 999, 'quantity': 10}]
+            ),
+            instructions_json='[]'
+        )
+        db.session.add(recipe)
+        db.session.commit()
+        recipe_id = recipe.id
+        db.session.expunge_all()
+
+        response, queries = self._count_queries(lambda: client.get(f'/api/recipes/{recipe_id}/cooking-guide'))
+
+        assert response.status_code == 200
+        names = [ingredient['name'] for ingredient in response.get_json()['ingredients']]
+        assert names == [f"Ingrédient {index}" for index in range(1, 6)] + ['Ingrédient inconnu']
+        assert queries == 2
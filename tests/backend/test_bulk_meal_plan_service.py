@@ -0,0 +1,137 @@
+"""
+Tests unitaires pour la génération de plans de repas en lot
+Teste les objectifs par utilisateur, l'insertion groupée et le suivi des échecs
+"""
+
+import pytest
+from datetime import date
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.meal_plan import MealPlan
+from models.recipe import Recipe
+from models.user import User
+from schemas.meal_plan import bulk_meal_plan_generation_schema
+from services.bulk_meal_plan_service import BulkMealPlanJob
+
+
+class TestBulkMealPlanJob:
+    """Tests de la tâche de génération en lot"""
+
+    WEEK_START = date(2024, 3, 4)
+
+    @pytest.fixture
+    def users(self, app):
+        """Recettes de chaque repas et trois utilisateurs aux objectifs différents"""
+        for meal_type, category in (('repas1', 'breakfast'), ('repas2', 'lunch'), ('repas3', 'dinner')):
+            for index in range(5):
+                calories = 300 + index * 150
+                db.session.add(Recipe(
+                    name=f"{meal_type} {index}", category=category, meal_type=meal_type,
+                    ingredients_json='[]', instructions_json='[]',
+                    total_calories=calories, total_protein=calories * 0.075,
+                    total_carbs=calories * 0.1, total_fat=calories * 0.035
+                ))
+
+        users = [
+            User(username=f"client{index}", email=f"client{index}@example.com",
+                 daily_calories_target=calories, daily_protein_target=calories * 0.075,
+                 daily_carbs_target=calories * 0.1, daily_fat_target=calories * 0.035)
+            for index, calories in enumerate((1500, 1800, 2100))
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        return users
+
+    def _options(self, **overrides):
+        options = bulk_meal_plan_generation_schema.load({
+            'user_ids': [1], 'week_start': self.WEEK_START.isoformat(), 'seed': 5, **overrides
+        })
+        options.pop('user_ids')
+        return options
+
+    def test_generates_one_plan_per_user(self, users):
+        """Test la génération selon les objectifs de chaque utilisateur"""
+        progress = []
+        job = BulkMealPlanJob([user.id for user in users], self._options(), workers=1)
+        job.run(on_progress=lambda running_job: progress.append(running_job.progress['processed']))
+
+        assert job.status == 'completed'
+        assert job.progress['succeeded'] == 3
+        assert progress == [1, 2, 3]
+
+        plans = {plan.user_id: plan for plan in MealPlan.query.all()}
+        assert len(plans) == 3
+        for user in users:
+            plan = plans[user.id]
+            assert job.results[user.id]['meal_plan_id'] == plan.id
+            assert plan.week_start == self.WEEK_START
+            assert len(plan.meals) == 7
+            assert abs(plan.daily_calories - user.daily_calories_target) < user.daily_calories_target * 0.1
+
+    def test_nutrition_profiles_computed_in_one_batch(self, users):
+        """Test les objectifs issus des profils nutritionnels calculés en lot (un seul commit)"""
+        from sqlalchemy import event
+        from services.nutrition_calculator_service import nutrition_calculator
+
+        profiled = [
+            User(username=f"profil{index}", email=f"profil{index}@example.com", current_weight=weight,
+                 height=172, age=35, gender='female', activity_level='lightly_active')
+            for index, weight in enumerate((60, 80))
+        ]
+        db.session.add_all(profiled)
+        db.session.commit()
+        expected = {user.id: nutrition_calculator._calculate_profile(user) for user in profiled}
+
+        commits = []
+        listener = lambda *args: commits.append(1)
+        event.listen(db.session, 'after_commit', listener)
+        try:
+            profiles = nutrition_calculator.calculate_nutrition_profiles(profiled + users)
+        finally:
+            event.remove(db.session, 'after_commit', listener)
+
+        assert len(commits) == 1
+        assert set(profiles) == set(expected)   # Utilisateurs sans poids ni taille: pas de profil
+        for user in profiled:
+            assert user.daily_calories_target == expected[user.id].adjusted_calories
+
+        job = BulkMealPlanJob([user.id for user in profiled], self._options(), workers=1)
+        for user in profiled:
+            goals = job._task(user, profiles[user.id])['nutritional_goals']
+            assert goals['target_calories'] == expected[user.id].adjusted_calories
+            assert goals['target_protein'] == expected[user.id].protein_target
+        assert job.run().progress['succeeded'] == 2
+
+    def test_reports_missing_users_and_existing_plans(self, users):
+        """Test le suivi par utilisateur: ignoré si un plan existe, échec si inconnu"""
+        existing = MealPlan(user_id=users[0].id, week_start=self.WEEK_START)
+        existing.meals = {}
+        db.session.add(existing)
+        db.session.commit()
+
+        job = BulkMealPlanJob([users[0].id, users[1].id, 999], self._options(), workers=1).run()
+
+        assert job.results[users[0].id]['status'] == 'skipped'
+        assert job.results[users[1].id]['status'] == 'succeeded'
+        assert job.results[999] == {'status': 'failed', 'error': 'Utilisateur non trouvé'}
+        assert job.to_dict()['progress'] == {
+            'total': 3, 'processed': 3, 'generated': 0, 'succeeded': 1, 'skipped': 1, 'failed': 1
+        }
+
+    def test_process_pool_matches_in_process_results(self, users):
+        """Test l'équivalence du pool de processus et du calcul dans le processus"""
+        user_ids = [user.id for user in users]
+        pooled = BulkMealPlanJob(user_ids, self._options(), workers=2).run()
+        pooled_meals = {plan.user_id: plan.meals for plan in MealPlan.query.all()}
+        MealPlan.query.delete()
+        db.session.commit()
+
+        BulkMealPlanJob(user_ids, self._options(), workers=1).run()
+        in_process_meals = {plan.user_id: plan.meals for plan in MealPlan.query.all()}
+
+        assert pooled.status == 'completed'
+        assert pooled_meals == in_process_meals
@@ -0,0 +1,522 @@
+"""
+Tests unitaires pour le CacheService
+Teste le cache local L1 (LRU + TTL), la sérialisation et le fonctionnement sans Redis
+"""
+
+import pickle
+import pytest
+import threading
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from services.cache_service import (
+    CacheMetrics, CacheService, LocalLRUCache, cached_batch, cached_method
+)
+from services.cache_serializer import (
+    CacheSerializationError, CacheSerializer, JsonCodec, PickleCodec
+)
+
+
+class FakeRedis:
+    """Client Redis minimal en mémoire (sans gestion d'expiration)"""
+
+    def __init__(self):
+        self.store = {}
+        self.sets = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def pttl(self, key):
+        return 60000 if key in self.store else -2
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+        return True
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+        return len(members)
+
+    def expire(self, key, ttl):
+        return True
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def delete(self, *keys):
+        deleted = 0
+        for key in keys:
+            if self.store.pop(key, None) is not None:
+                deleted += 1
+            if self.sets.pop(key, None) is not None:
+                deleted += 1
+        return deleted
+
+
+class FakePipeline:
+    """Pipeline qui exécute les commandes en différé sur FakeRedis"""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((getattr(self.client, name), args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = [command(*args, **kwargs) for command, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+
+class TestLocalLRUCache:
+    """Tests du niveau de cache mémoire L1"""
+
+    def test_get_returns_cached_value(self):
+        """Test la lecture d'une entrée valide"""
+        cache = LocalLRUCache(max_entries=10)
+        cache.set('a', {'value': 1}, ttl=60)
+
+        assert cache.get('a') == {'value': 1}
+        assert cache.hits == 1
+        assert cache.misses == 0
+
+    def test_expired_entry_is_a_miss(self):
+        """Test qu'une entrée expirée n'est plus servie"""
+        cache = LocalLRUCache(max_entries=10)
+
+        with patch('services.cache_service.time.monotonic', return_value=1000.0):
+            cache.set('a', 'valeur', ttl=10)
+
+        with patch('services.cache_service.time.monotonic', return_value=1011.0):
+            assert cache.get('a') is None
+
+        assert cache.expirations == 1
+        assert cache.misses == 1
+        assert len(cache) == 0
+
+    def test_lru_eviction_keeps_recently_used(self):
+        """Test l'éviction de l'entrée la moins récemment utilisée"""
+        cache = LocalLRUCache(max_entries=2)
+        cache.set('a', 1, ttl=60)
+        cache.set('b', 2, ttl=60)
+
+        # 'a' devient la plus récemment utilisée
+        cache.get('a')
+        cache.set('c', 3, ttl=60)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+        assert cache.evictions == 1
+
+    def test_delete_pattern(self):
+        """Test la suppression par pattern glob"""
+        cache = LocalLRUCache(max_entries=10)
+        cache.set('sl:1', 1, ttl=60)
+        cache.set('sl:2', 2, ttl=60)
+        cache.set('agg:1', 3, ttl=60)
+
+        assert cache.delete_pattern('sl:*') == 2
+        assert cache.get('agg:1') == 3
+
+
+class TestCacheSerializer:
+    """Tests des codecs et de la compression des valeurs Redis"""
+
+    @pytest.fixture
+    def serializer(self):
+        """Sérialiseur JSON pour 'agg:', pickle ailleurs"""
+        return CacheSerializer({'agg:': JsonCodec()}, compression_threshold=256)
+
+    def test_codec_chosen_by_prefix(self, serializer):
+        """Test le choix du codec selon le préfixe de la clé"""
+        value = {'items': [{'name': 'Riz', 'quantity': 200}]}
+
+        assert serializer.encode('agg:1', value)[:1] == JsonCodec.marker
+        assert serializer.encode('method:1', value)[:1] == PickleCodec.marker
+        assert serializer.decode('agg:1', serializer.encode('agg:1', value)) == value
+
+    def test_unsupported_value_falls_back_to_pickle(self, serializer):
+        """Test le repli pickle pour une valeur non JSON"""
+        value = {'date': datetime(2024, 1, 15)}
+        data = serializer.encode('agg:1', value)
+
+        assert data[:1] == PickleCodec.marker
+        assert serializer.decode('agg:1', data) == value
+
+    def test_values_not_kept_by_json_fall_back_to_pickle(self, serializer):
+        """Test le repli pickle pour des clés entières ou des tuples (relus autrement en JSON)"""
+        for value in ({1: 'Riz'}, {'items': [('Riz', 200)]}):
+            data = serializer.encode('agg:1', value)
+
+            assert data[:1] == PickleCodec.marker
+            assert serializer.decode('agg:1', data) == value
+
+    def test_large_payload_is_compressed(self, serializer):
+        """Test la compression zlib au-delà du seuil"""
+        value = {'items': [{'name': 'Blanc de poulet', 'unit': 'g'}] * 100}
+        data = serializer.encode('agg:big', value)
+
+        assert data[1:2] == CacheSerializer.FLAG_ZLIB
+        assert serializer.decode('agg:big', data) == value
+
+        stats = serializer.get_statistics()['agg:']
+        assert stats['codec'] == 'json'
+        assert stats['bytes_written'] < stats['raw_bytes_written']
+        assert stats['compression_ratio'] < 1
+
+    def test_legacy_pickle_entries_are_readable(self, serializer):
+        """Test la lecture des entrées écrites avant les en-têtes de codec"""
+        assert serializer.decode('sl:1', pickle.dumps({'a': 1})) == {'a': 1}
+
+    def test_corrupted_data_raises(self, serializer):
+        """Test l'erreur explicite sur des données illisibles"""
+        with pytest.raises(CacheSerializationError):
+            serializer.decode('agg:1', b'j-{pas du json')
+
+    def test_bytes_metrics_per_prefix(self, serializer):
+        """Test les compteurs d'octets par préfixe"""
+        data = serializer.encode('agg:1', [1, 2, 3])
+        serializer.decode('agg:1', data)
+        serializer.encode('mp:1', 'x')
+
+        stats = serializer.get_statistics()
+        assert stats['agg:']['writes'] == 1
+        assert stats['agg:']['reads'] == 1
+        assert stats['agg:']['bytes_read'] == len(data)
+        assert stats['mp:']['codec'] == 'pickle'
+
+
+class TestCacheMetrics:
+    """Tests des compteurs et histogrammes de latence par préfixe"""
+
+    def test_latency_histogram_buckets(self):
+        """Test le classement des durées dans les intervalles"""
+        metrics = CacheMetrics()
+        metrics.observe('agg:1', 'get', 0.00005, 'hits')   # 0.05 ms
+        metrics.observe('agg:2', 'get', 0.003, 'misses')   # 3 ms
+        metrics.observe('agg:3', 'get', 5.0, 'misses')     # au-delà de la dernière borne
+
+        stats = metrics.get_statistics()
+        histogram = stats['prefixes']['agg:']['latency']['get']
+
+        assert histogram['count'] == 3
+        assert histogram['buckets']['le_0.1ms'] == 1
+        assert histogram['buckets']['le_5ms'] == 1
+        assert histogram['buckets']['le_inf'] == 1
+        assert stats['prefixes']['agg:']['hit_rate'] == round(1 / 3, 4)
+
+    def test_service_counts_per_prefix_without_scanning(self):
+        """Test les compteurs du service sans commande KEYS"""
+        cache = CacheService(local_max_entries=2)
+        cache.connected = False
+        cache.redis_client = None
+
+        cache.set('agg:1', 1, ttl=60)
+        cache.get('agg:1')
+        cache.get('agg:absent')
+        cache.set('sl:1', 1, ttl=60)
+        cache.set('sl:2', 2, ttl=60)  # évince agg:1
+        cache.delete('sl:1')
+
+        stats = cache.get_cache_statistics()
+        prefixes = stats['prefixes']
+
+        assert prefixes['agg:']['hits'] == 1
+        assert prefixes['agg:']['misses'] == 1
+        assert prefixes['agg:']['evictions'] == 1
+        assert prefixes['sl:']['sets'] == 2
+        assert prefixes['sl:']['deletes'] == 1
+        assert stats['hit_rate'] == 0.5
+        assert 'keyspace_hit_rate' not in stats
+
+
+class TestCacheServiceWithoutRedis:
+    """Tests du CacheService lorsque Redis est indisponible"""
+
+    @pytest.fixture
+    def cache(self):
+        """Service de cache sans connexion Redis"""
+        service = CacheService(local_max_entries=3)
+        service.connected = False
+        service.redis_client = None
+        return service
+
+    def test_set_and_get_served_from_local_tier(self, cache):
+        """Test que le cache fonctionne sans Redis grâce au niveau L1"""
+        assert cache.set('recipe:1', {'name': 'Omelette'}, ttl=60) is True
+        assert cache.get('recipe:1') == {'name': 'Omelette'}
+
+    def test_delete(self, cache):
+        """Test la suppression d'une entrée"""
+        cache.set('recipe:1', 'x', ttl=60)
+
+        assert cache.delete('recipe:1') is True
+        assert cache.get('recipe:1') is None
+
+    def test_tier_statistics(self, cache):
+        """Test les compteurs par niveau"""
+        for i in range(4):
+            cache.set(f'k{i}', i, ttl=60)
+        cache.get('k3')
+        cache.get('k0')  # évincée
+
+        stats = cache.get_tier_statistics()
+
+        assert stats['local']['hits'] == 1
+        assert stats['local']['misses'] == 1
+        assert stats['local']['evictions'] == 1
+        assert stats['redis']['connected'] is False
+        assert cache.get_cache_statistics()['tiers']['local']['entries'] == 3
+
+    def test_invalidate_tags_removes_only_tagged_entries(self, cache):
+        """Test l'invalidation ciblée par tag"""
+        tag = cache.make_tag(cache.TAG_MEAL_PLAN, 42)
+        cache.set('agg:a', 1, ttl=60, tags=[tag])
+        cache.set('mp:b', 2, ttl=60, tags=[tag])
+        cache.set('agg:c', 3, ttl=60, tags=[cache.make_tag(cache.TAG_MEAL_PLAN, 7)])
+
+        assert cache.invalidate_tags(tag) == 2
+        assert cache.get('agg:a') is None
+        assert cache.get('mp:b') is None
+        assert cache.get('agg:c') == 3
+
+    def test_invalidate_shopping_list_caches_matches_hashed_keys(self, cache):
+        """Test que l'invalidation d'un plan atteint les clés hachées"""
+        cache.cache_shopping_list_aggregation(42, {'items': []})
+        cache.cache_meal_plan_ingredients(42, [])
+
+        assert cache.get_shopping_list_aggregation(42) is not None
+        assert cache.invalidate_shopping_list_caches(42) == 2
+        assert cache.get_shopping_list_aggregation(42) is None
+        assert cache.get_meal_plan_ingredients(42) is None
+
+
+class TestCacheServiceWithRedis:
+    """Tests du CacheService avec un niveau Redis (simulé)"""
+
+    @pytest.fixture
+    def cache(self):
+        """Service de cache connecté à un FakeRedis"""
+        service = CacheService()
+        service.redis_client = FakeRedis()
+        service.connected = True
+        return service
+
+    def test_redis_hit_is_promoted_to_local_tier(self, cache):
+        """Test la promotion L2 -> L1"""
+        cache.set('recipe:1', {'name': 'Omelette'}, ttl=60)
+        cache.local_cache.clear()
+
+        assert cache.get('recipe:1') == {'name': 'Omelette'}
+        assert cache.get('recipe:1') == {'name': 'Omelette'}
+
+        stats = cache.get_tier_statistics()
+        assert stats['redis']['hits'] == 1
+        assert stats['local']['hits'] == 1
+
+    def test_local_tier_ttl_is_capped(self, cache):
+        """Test la durée de vie L1 plafonnée: une invalidation d'un autre worker est vue après LOCAL_MAX_TTL"""
+        with patch('services.cache_service.time.monotonic', return_value=1000.0):
+            cache.set('recipe:1', 'v1', ttl=3600)
+
+        # Un autre worker invalide la clé dans Redis (le niveau L1 de ce worker n'est pas prévenu)
+        cache.redis_client.store['recipe:1'] = cache.serializer.encode('recipe:1', 'v2')
+
+        with patch('services.cache_service.time.monotonic', return_value=1000.0 + cache.LOCAL_MAX_TTL - 1):
+            assert cache.get('recipe:1') == 'v1'
+        with patch('services.cache_service.time.monotonic', return_value=1000.0 + cache.LOCAL_MAX_TTL + 1):
+            assert cache.get('recipe:1') == 'v2'
+
+    def test_invalidate_tags_clears_redis_entries(self, cache):
+        """Test l'invalidation par tag dans Redis sans parcours des clés"""
+        tag = cache.make_tag(cache.TAG_RECIPE, 7)
+        cache.set('recipe:a', 1, ttl=60, tags=[tag])
+        cache.set('recipe:b', 2, ttl=60)
+
+        assert cache.invalidate_tags(tag) == 1
+        assert 'recipe:a' not in cache.redis_client.store
+        assert 'recipe:b' in cache.redis_client.store
+        assert f'{cache.PREFIX_TAG}{tag}' not in cache.redis_client.sets
+
+    def test_invalidate_tags_drops_values_promoted_from_redis(self, cache):
+        """Test qu'une valeur promue depuis Redis dans L1 (sans tags locaux) est invalidée par son tag"""
+        tag = cache.make_tag(cache.TAG_RECIPE, 1)
+        cache.set('recipe:1', 'v1', ttl=3600, tags=[tag])
+        cache.set('recipe:2', 'v1', ttl=3600, tags=[tag])
+        # Valeurs écrites par un autre worker: absentes du niveau L1 de ce worker
+        cache.local_cache.clear()
+
+        assert cache.get('recipe:1') == 'v1'
+        assert cache.get_many(['recipe:2']) == {'recipe:2': 'v1'}
+
+        assert cache.invalidate_tags(tag) == 2
+        assert cache.get('recipe:1') is None
+        assert cache.get_many(['recipe:2']) == {}
+
+    def test_redis_value_has_same_types_as_local_value(self, cache):
+        """Test qu'un dict à clés entières relu depuis Redis est identique à celui du niveau L1"""
+        value = {12: {'quantity': 200, 'sources': [('repas1', 3)]}, 15: {'quantity': 80, 'sources': []}}
+        cache.set('agg:1', value, ttl=60)
+        local = cache.get('agg:1')
+        cache.local_cache.clear()
+
+        remote = cache.get('agg:1')
+
+        assert remote == local == value
+        assert list(remote) == [12, 15]
+        assert remote[12]['sources'][0] == ('repas1', 3)
+
+    def test_compact_prefixes_are_not_pickled(self, cache):
+        """Test que les agrégations sont stockées avec le codec compact"""
+        cache.set('agg:1', {'items': []}, ttl=60)
+        cache.set('method:1', {'items': []}, ttl=60)
+
+        assert cache.redis_client.store['agg:1'][:1] != PickleCodec.marker
+        assert cache.redis_client.store['method:1'][:1] == PickleCodec.marker
+        assert 'agg:' in cache.get_tier_statistics()['payloads']
+
+
+class TestBatchOperations:
+    """Tests des lectures/écritures groupées"""
+
+    @pytest.fixture
+    def cache(self):
+        """Service de cache connecté à un FakeRedis"""
+        service = CacheService()
+        service.redis_client = FakeRedis()
+        service.connected = True
+        return service
+
+    def test_set_many_then_get_many_in_one_pipeline(self, cache):
+        """Test qu'un lot de clés ne coûte qu'un aller-retour Redis"""
+        values = {f'recipe:{i}': {'id': i} for i in range(20)}
+        tag = cache.make_tag(cache.TAG_RECIPE, 3)
+        cache.set_many(values, ttl=60, tags={'recipe:3': [tag]})
+        cache.local_cache.clear()
+
+        with patch.object(cache.redis_client, 'pipeline', wraps=cache.redis_client.pipeline) as pipeline:
+            found = cache.get_many(list(values) + ['recipe:absent'])
+
+        assert pipeline.call_count == 1
+        assert found == values
+        assert cache.redis_client.smembers(f'{cache.PREFIX_TAG}{tag}') == {'recipe:3'}
+
+    def test_get_many_serves_local_tier_first(self, cache):
+        """Test que seules les clés absentes du niveau L1 sont demandées à Redis"""
+        cache.set('recipe:1', 'local', ttl=60)
+
+        with patch.object(cache.redis_client, 'pipeline') as pipeline:
+            assert cache.get_many(['recipe:1']) == {'recipe:1': 'local'}
+
+        pipeline.assert_not_called()
+
+    def test_cached_batch_computes_only_missing_elements(self, cache):
+        """Test la mise en cache élément par élément d'un appel groupé"""
+        calls = []
+
+        @cached_batch(cache, ttl=60, element_id=lambda x: x, prefix="square:")
+        def squares(numbers, offset):
+            calls.append(list(numbers))
+            return {n: n * n + offset for n in numbers}
+
+        assert squares([1, 2], 0) == {1: 1, 2: 4}
+        assert squares([1, 2, 3], 0) == {1: 1, 2: 4, 3: 9}
+        assert squares([1], 10) == {1: 11}
+        assert calls == [[1, 2], [3], [1]]
+
+
+class TestSingleFlight:
+    """Tests de la coalescence des calculs concurrents (single-flight)"""
+
+    @pytest.fixture
+    def cache(self):
+        """Service de cache sans connexion Redis"""
+        service = CacheService()
+        service.connected = False
+        service.redis_client = None
+        return service
+
+    def test_concurrent_misses_compute_once(self, cache):
+        """Test qu'un seul appelant calcule la valeur lors d'un défaut de cache"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'total': 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                cache.get_or_compute('agg:hot', compute, ttl=60)
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [{'total': 42}] * 8
+
+    def test_leader_error_is_shared(self, cache):
+        """Test que l'erreur du calcul est propagée et que rien n'est caché"""
+        def compute():
+            raise ValueError("échec")
+
+        with pytest.raises(ValueError):
+            cache.get_or_compute('agg:err', compute, ttl=60)
+
+        assert cache.get('agg:err') is None
+
+    def test_stale_value_served_while_refreshing(self, cache):
+        """Test la fenêtre stale-while-revalidate"""
+        refreshed = threading.Event()
+
+        def refresh():
+            refreshed.set()
+            return 'nouvelle'
+
+        cache.set_computed('profile:1', 'ancienne', ttl=60, stale_ttl=600)
+
+        # Entrée périmée mais encore dans la fenêtre
+        with patch('services.cache_service.time.time', return_value=time.time() + 120):
+            value = cache.get_or_compute('profile:1', refresh, ttl=60, stale_ttl=600)
+
+        assert value == 'ancienne'
+        assert refreshed.wait(2)
+
+        # Attendre la fin du rafraîchissement
+        for _ in range(100):
+            if not cache._flights:
+                break
+            time.sleep(0.01)
+        assert cache.get_or_compute('profile:1', refresh, ttl=60, stale_ttl=600) == 'nouvelle'
+
+    def test_cached_method_coalesces_and_caches(self, cache):
+        """Test le décorateur cached_method"""
+        calls = []
+
+        @cached_method(cache, ttl=60, prefix="method:")
+        def expensive(x):
+            calls.append(x)
+            return x * 2
+
+        assert expensive(21) == 42
+        assert expensive(21) == 42
+        assert calls == [21]
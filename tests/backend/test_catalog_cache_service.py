@@ -0,0 +1,85 @@
+"""
+Tests unitaires pour le CatalogCacheService
+Teste la lecture des listes du catalogue via le cache et le préchauffage
+"""
+
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.ingredient import Ingredient
+from models.recipe import Recipe
+from services.cache_service import CacheService
+from services.catalog_cache_service import CatalogCacheService
+
+
+class TestCatalogCacheService:
+    """Tests du cache du catalogue et du préchauffage"""
+
+    @pytest.fixture
+    def catalog(self, app):
+        """Service du catalogue avec un cache local isolé"""
+        cache = CacheService()
+        cache.connected = False
+        cache.redis_client = None
+        return CatalogCacheService(cache=cache)
+
+    @pytest.fixture
+    def sample_catalog(self, app):
+        """Quelques ingrédients et recettes"""
+        db.session.add_all([
+            Ingredient(name="Riz", category="grain", unit="g", calories_per_100g=130,
+                       protein_per_100g=2.7, carbs_per_100g=28, fat_per_100g=0.3),
+            Ingredient(name="Oeuf", category="protein", unit="g", calories_per_100g=155,
+                       protein_per_100g=13, carbs_per_100g=1.1, fat_per_100g=11)
+        ])
+        for i in range(3):
+            db.session.add(Recipe(
+                name=f"Recette {i}",
+                category="lunch",
+                meal_type="repas2",
+                ingredients_json=json.dumps([]),
+                instructions_json=json.dumps([])
+            ))
+        db.session.commit()
+
+    def test_ingredient_list_is_served_from_cache(self, catalog, sample_catalog):
+        """Test qu'une seconde lecture ne requête pas la base"""
+        first = catalog.get_ingredient_list()
+
+        db.session.add(Ingredient(name="Avoine", category="grain", unit="g", calories_per_100g=389,
+                                  protein_per_100g=17, carbs_per_100g=66, fat_per_100g=7))
+        db.session.commit()
+
+        assert catalog.get_ingredient_list() == first
+        assert [item['name'] for item in first] == ["Oeuf", "Riz"]
+
+        catalog.invalidate_ingredients()
+        assert len(catalog.get_ingredient_list()) == 3
+
+    def test_warm_up_preloads_recipe_pages_and_ingredients(self, catalog, sample_catalog):
+        """Test le préchauffage du catalogue avec rapport d'avancement"""
+        messages = []
+
+        summary = catalog.warm_up(time_budget=30, progress=messages.append)
+
+        assert summary['recipe_pages'] == 1
+        assert summary['ingredient_lists'] == 1
+        assert summary['errors'] == 0
+        assert summary['budget_exhausted'] is False
+        assert messages[-1].startswith("Préchauffage terminé")
+
+        stats = catalog.cache.local_cache.get_statistics()
+        assert stats['entries'] == 2
+
+    def test_warm_up_respects_time_budget(self, catalog, sample_catalog):
+        """Test l'arrêt immédiat lorsque le budget est épuisé"""
+        summary = catalog.warm_up(time_budget=0, progress=lambda message: None)
+
+        assert summary['budget_exhausted'] is True
+        assert summary['recipe_pages'] == 0
+        assert len(catalog.cache.local_cache) == 0
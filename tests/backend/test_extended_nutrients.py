@@ -0,0 +1,154 @@
+"""
+Tests unitaires pour les nutriments complémentaires (fibres, sodium, sucres)
+Teste le vecteur JSON des ingrédients, les totaux des recettes et le suivi prévu des repas
+"""
+
+import json
+import pytest
+from datetime import date
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.ingredient import Ingredient
+from models.meal_plan import MealPlan
+from models.meal_tracking import MealTracking
+from models.recipe import Recipe
+from models.user import User
+from services.meal_tracking_service import MealTrackingService
+from services.recipe_nutrition_service import recipe_nutrition
+
+
+class TestExtendedNutrients:
+    """Tests des nutriments complémentaires sur base réelle"""
+
+    @pytest.fixture
+    def recipe(self, client):
+        """Recette de flocons d'avoine (80g) et de myrtilles (100g) créés via l'API"""
+        ingredient_ids = []
+        for name, nutrition in (
+            ("Flocons d'avoine", {'calories': 389, 'protein': 13.2, 'carbs': 67.7, 'fat': 6.9,
+                                  'fiber': 10.6, 'sodium': 2, 'sugar': 1}),
+            ('Myrtilles', {'calories': 57, 'protein': 0.7, 'carbs': 14, 'fat': 0.3,
+                           'fiber': 2.4, 'sodium': 1, 'sugar': 10})
+        ):
+            response = client.post('/api/ingredients', json={
+                'name': name, 'category': 'grain', 'nutrition_per_100g': nutrition
+            })
+            assert response.status_code == 201
+            assert response.get_json()['nutrition_per_100g']['fiber'] == nutrition['fiber']
+            ingredient_ids.append(response.get_json()['id'])
+
+        recipe = Recipe(name='Porridge', category='breakfast', meal_type='repas1', instructions_json='[]',
+                        ingredients_json=json.dumps([
+                            {'ingredient_id': ingredient_ids[0], 'quantity': 80, 'unit': 'g'},
+                            {'ingredient_id': ingredient_ids[1], 'quantity': 100, 'unit': 'g'}
+                        ]))
+        db.session.add(recipe)
+        db.session.commit()
+        recipe_nutrition.recompute_totals()
+        db.session.expire_all()
+        return recipe
+
+    def test_recipe_totals_include_extended_nutrients(self, client, recipe):
+        """Test les totaux complémentaires calculés dans la même passe que les macros"""
+        assert recipe.total_calories == pytest.approx(368.2)
+        assert recipe.nutrient_totals == pytest.approx({'fiber': 10.9, 'sodium': 2.6, 'sugar': 10.8})
+
+        dumped = client.get(f'/api/recipes/{recipe.id}').get_json()
+        assert dumped['nutrition_total']['fiber'] == pytest.approx(10.9)
+
+        # Correction d'un ingrédient: seuls ses nutriments complémentaires changent
+        oats_id = recipe.ingredients[0]['ingredient_id']
+        response = client.put(f'/api/ingredients/{oats_id}', json={'nutrition_per_100g': {'fiber': 8}})
+        assert response.status_code == 200
+        assert Ingredient.query.get(oats_id).extra_nutrients == {'fiber': 8, 'sodium': 2, 'sugar': 1}
+
+        db.session.expire_all()
+        assert Recipe.query.get(recipe.id).nutrient_totals['fiber'] == pytest.approx(8.8)
+
+    def test_planned_tracking_uses_extended_totals(self, recipe):
+        """Test le suivi prévu (fibres, sodium, sucres) et le résumé journalier qui en découle"""
+        user = User(username='client', email='client@example.com')
+        db.session.add(user)
+        db.session.commit()
+        meal_date = date(2024, 3, 4)
+        plan = MealPlan(user_id=user.id, week_start=meal_date)
+        plan.meals = {meal_date.isoformat(): {'repas1': {'recipe_id': recipe.id}}}
+        db.session.add(plan)
+        db.session.commit()
+
+        tracking = MealTracking.create_from_meal_plan(user.id, plan.id, meal_date, 'repas1', recipe.id)
+        assert (tracking.planned_fiber, tracking.planned_sodium, tracking.planned_sugar) == pytest.approx(
+            (10.9, 2.6, 10.8)
+        )
+
+        created = MealTrackingService.create_meal_tracking_from_plan(user.id, plan.id, meal_date)
+        assert created[0].planned_fiber == pytest.approx(10.9)
+
+        summary = MealTrackingService.calculate_daily_summary(user.id, meal_date)
+        assert summary.planned_fiber == pytest.approx(10.9)
+        assert summary.planned_sugar == pytest.approx(10.8)
+
+    def test_plan_tracking_loads_day_recipes_in_one_query(self, recipe):
+        """Test la création du suivi d'une journée: une seule requête pour toutes ses recettes"""
+        from sqlalchemy import event
+
+        user = User(username='client', email='client@example.com')
+        snack = Recipe(name='Pomme', category='snack', meal_type='collation', instructions_json='[]',
+                       ingredients_json='[]', total_calories=52)
+        db.session.add_all([user, snack])
+        db.session.commit()
+        meal_date = date(2024, 3, 4)
+        plan = MealPlan(user_id=user.id, week_start=meal_date)
+        plan.meals = {meal_date.isoformat(): {
+            'repas1': {'recipe_id': recipe.id}, 'collation': {'recipe_id': snack.id}, 'repas2': {'recipe_id': 999}
+        }}
+        db.session.add(plan)
+        db.session.commit()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            created = MealTrackingService.create_meal_tracking_from_plan(user.id, plan.id, meal_date)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert len([statement for statement in statements if 'FROM recipes' in statement]) == 1
+        trackings = {tracking.meal_type: tracking for tracking in created}
+        assert (trackings['repas1'].meal_name, trackings['collation'].meal_name) == ('Porridge', 'Pomme')
+        assert trackings['repas1'].planned_fiber == pytest.approx(10.9)
+        assert trackings['repas2'].recipe_id is None
+
+    def test_non_numeric_extended_values_rejected(self, client):
+        """Test le refus d'une valeur non numérique ou négative à la création et à la modification"""
+        response = client.post('/api/ingredients', json={
+            'name': 'Lentilles', 'category': 'grain', 'nutrition_per_100g': {'calories': 116, 'fiber': 'n/a'}
+        })
+        assert response.status_code == 400
+        assert 'fiber' in response.get_json()['details']
+        assert Ingredient.query.count() == 0
+
+        response = client.post('/api/ingredients', json={
+            'name': 'Lentilles', 'category': 'grain', 'nutrition_per_100g': {'calories': 116, 'fiber': 7.9}
+        })
+        ingredient_id = response.get_json()['id']
+        response = client.put(f'/api/ingredients/{ingredient_id}', json={'nutrition_per_100g': {'sodium': -2}})
+        assert response.status_code == 400
+        assert Ingredient.query.get(ingredient_id).extra_nutrients == {'fiber': 7.9}
+
+    def test_snapshot_skips_legacy_non_numeric_values(self, client):
+        """Test l'instantané construit malgré une valeur enregistrée avant la validation"""
+        from services.ingredient_snapshot_service import ingredient_snapshot
+
+        legacy = Ingredient(name='Ancien', category='autres', unit='g', calories_per_100g=100,
+                            protein_per_100g=1, carbs_per_100g=2, fat_per_100g=3,
+                            extra_nutrients_json=json.dumps({'fiber': 'n/a', 'sugar': 4}))
+        db.session.add(legacy)
+        db.session.commit()
+        ingredient_snapshot.invalidate()
+
+        assert list(ingredient_snapshot.snapshot().get(legacy.id)) == [100, 1, 2, 3, 0, 0, 4]
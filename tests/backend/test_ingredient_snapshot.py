@@ -0,0 +1,150 @@
+"""
+Tests unitaires pour l'instantané nutritionnel des ingrédients
+Teste les totaux d'une recette, la projection mmap versionnée et la reconstruction après écriture
+"""
+
+import pytest
+import numpy as np
+from pathlib import Path
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.ingredient import Ingredient
+from routes.recipes import calculate_recipe_nutrition
+from services.ingredient_snapshot_service import ingredient_snapshot
+
+
+class TestIngredientSnapshot:
+    """Tests de l'instantané sur base réelle"""
+
+    @pytest.fixture
+    def ingredients(self, app):
+        """Cinq ingrédients de 100 à 500 kcal pour 100g"""
+        ingredients = [
+            Ingredient(name=f"Ingrédient {index}", category='autres', unit='g',
+                       calories_per_100g=index * 100, protein_per_100g=index * 10,
+                       carbs_per_100g=index * 5, fat_per_100g=index)
+            for index in range(1, 6)
+        ]
+        db.session.add_all(ingredients)
+        db.session.commit()
+        return ingredients
+
+    @pytest.fixture
+    def snapshot_dir(self, app, tmp_path):
+        """Instantané écrit sur disque (comme en production)"""
+        app.config['INGREDIENT_SNAPSHOT_DIR'] = str(tmp_path)
+        app.extensions.pop('ingredient_snapshot', None)
+        return Path(ingredient_snapshot._state()['directory'])
+
+    def _count_queries(self, func):
+        """Exécute func et retourne (résultat, nombre de requêtes SQL)"""
+        from sqlalchemy import event
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return result, len(statements)
+
+    def test_recipe_nutrition_from_snapshot(self, ingredients):
+        """Test les totaux d'une recette: une requête pour l'instantané, aucune ensuite"""
+        ingredients_list = [
+            {'ingredient_id': ingredient.id, 'quantity': 50} for ingredient in ingredients
+        ] + [{'ingredient_id': None, 'quantity': 100}]
+
+        nutrition, queries = self._count_queries(lambda: calculate_recipe_nutrition(ingredients_list))
+        assert nutrition == {'calories': 750.0, 'protein': 75.0, 'carbs': 37.5, 'fat': 7.5,
+                             'fiber': 0.0, 'sodium': 0.0, 'sugar': 0.0}
+        assert queries == 1
+
+        _, queries = self._count_queries(lambda: calculate_recipe_nutrition(ingredients_list))
+        assert queries == 0
+
+    def test_ingredients_missing_from_snapshot_read_from_database(self, ingredients):
+        """Test la lecture en base d'un ingrédient ajouté sans passer par /ingredients"""
+        ingredient_snapshot.snapshot()
+        added = Ingredient(name='Avoine', category='grain', unit='g', calories_per_100g=380,
+                           protein_per_100g=13, carbs_per_100g=60, fat_per_100g=7)
+        db.session.add(added)
+        db.session.commit()
+
+        nutrition = calculate_recipe_nutrition([
+            {'ingredient_id': ingredients[0].id, 'quantity': 100},
+            {'ingredient_id': added.id, 'quantity': 50},
+            {'ingredient_id': 999, 'quantity': 100}
+        ])
+
+        assert nutrition == {'calories': 290.0, 'protein': 16.5, 'carbs': 35.0, 'fat': 4.5,
+                             'fiber': 0.0, 'sodium': 0.0, 'sugar': 0.0}
+
+    def test_partial_recipes_keep_stored_totals(self, ingredients):
+        """Test le mode strict: une entrée non résolue garde les totaux enregistrés de la recette"""
+        import json
+        from models.recipe import Recipe
+        from services.portion_adjustment_service import portion_adjustment
+
+        entries = [{'ingredient_id': ingredients[0].id, 'quantity': 100}, {'name': 'Huile', 'quantity': 10}]
+        assert ingredient_snapshot.recipe_nutrition(entries, strict=True) is None
+        assert ingredient_snapshot.recipe_nutrition(entries[:1], strict=True)['calories'] == 100.0
+        assert ingredient_snapshot.recipe_nutrition([{'ingredient_id': 999, 'quantity': 10}], strict=True) is None
+
+        recipe = Recipe(name='Riz sauté', category='lunch', meal_type='repas2', instructions_json='[]',
+                        ingredients_json=json.dumps(entries), total_calories=190, total_protein=10,
+                        total_carbs=5, total_fat=11)
+        adjusted = portion_adjustment._calculate_adjusted_nutrition(recipe, 2.0)
+        assert (adjusted['calories'], adjusted['fat']) == (380.0, 22.0)
+
+    def test_snapshot_memory_mapped_from_versioned_files(self, ingredients, snapshot_dir):
+        """Test la projection en lecture seule et le partage entre workers"""
+        snapshot = ingredient_snapshot.snapshot()
+
+        assert isinstance(snapshot.nutrients, np.memmap)
+        assert snapshot.nutrients.dtype == np.float32
+        assert not snapshot.nutrients.flags.writeable
+        assert sorted(path.name for path in snapshot_dir.glob('*.npy')) == [
+            'ingredients-v0.index.npy', 'ingredients-v0.nutrients.npy'
+        ]
+        assert list(snapshot.get(ingredients[2].id)) == [300, 30, 15, 3, 0, 0, 0]
+
+        # Un autre worker projette les fichiers existants sans lire la base
+        ingredient_snapshot._state()['snapshot'] = None
+        other, queries = self._count_queries(ingredient_snapshot.snapshot)
+        assert queries == 0
+        assert list(other.get(ingredients[2].id)) == [300, 30, 15, 3, 0, 0, 0]
+
+    def test_snapshot_directory_depends_on_database(self, app, snapshot_dir, tmp_path):
+        """Test qu'une autre base sur le même hôte n'utilise pas les fichiers de celle-ci"""
+        from main import create_app
+
+        other = create_app('testing')
+        other.config['INGREDIENT_SNAPSHOT_DIR'] = str(tmp_path)
+        other.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'autre.db'}"
+        with other.app_context():
+            other_dir = Path(ingredient_snapshot._state()['directory'])
+
+        assert snapshot_dir.parent == other_dir.parent == tmp_path
+        assert snapshot_dir != other_dir
+
+    def test_ingredient_write_bumps_version(self, client, ingredients, snapshot_dir):
+        """Test la reconstruction de l'instantané après une écriture sur /ingredients"""
+        assert ingredient_snapshot.snapshot().version == 0
+
+        response = client.put(f'/api/ingredients/{ingredients[0].id}', json={
+            'nutrition_per_100g': {'calories': 150}
+        })
+        assert response.status_code == 200
+
+        snapshot = ingredient_snapshot.snapshot()
+        assert snapshot.version == 1
+        assert (snapshot_dir / 'ingredients.version').read_text() == '1'
+        assert sorted(path.name for path in snapshot_dir.glob('*.npy')) == [
+            'ingredients-v1.index.npy', 'ingredients-v1.nutrients.npy'
+        ]
+        assert calculate_recipe_nutrition([{'ingredient_id': ingredients[0].id, 'quantity': 100}])['calories'] == 150.0
@@ -0,0 +1,74 @@
+"""
+Tests unitaires pour JSONProperty
+Teste la mémoïsation des colonnes JSON des modèles et son invalidation
+"""
+
+import json
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from models.meal_plan import MealPlan, ShoppingList
+from models.recipe import Recipe
+# Modèles référencés par les relations (configuration des mappers)
+from models.user import User
+from models.meal_tracking import MealTracking
+
+
+class TestJSONProperty:
+    """Tests des propriétés JSON mémoïsées"""
+
+    def test_column_is_parsed_once(self):
+        """Test que les accès répétés ne reparsent pas la colonne"""
+        recipe = Recipe(ingredients_json=json.dumps([{'ingredient_id': 1, 'quantity': 100}]))
+
+        with patch('utils.json_property.json.loads', wraps=json.loads) as loads:
+            for _ in range(5):
+                assert recipe.ingredients[0]['quantity'] == 100
+
+        assert loads.call_count == 1
+
+    def test_direct_column_assignment_invalidates(self):
+        """Test l'invalidation lors d'une affectation de la colonne *_json"""
+        meal_plan = MealPlan(meals_json=json.dumps({'2024-01-15': {'lunch': 1}}))
+        assert meal_plan.meals == {'2024-01-15': {'lunch': 1}}
+
+        meal_plan.meals_json = json.dumps({'2024-01-16': {'dinner': 2}})
+
+        assert meal_plan.meals == {'2024-01-16': {'dinner': 2}}
+
+    def test_setter_does_not_share_caller_value(self):
+        """Test que la valeur affectée reste indépendante de la valeur lue"""
+        shopping_list = ShoppingList()
+        rules = {'version': '1.0'}
+        shopping_list.aggregation_rules = rules
+        rules['timestamp'] = '2024-01-15T10:00:00'
+
+        assert shopping_list.aggregation_rules == {'version': '1.0'}
+        assert json.loads(shopping_list.aggregation_rules_json) == {'version': '1.0'}
+
+    def test_in_place_mutation_requires_reassignment(self):
+        """Test qu'une modification en place n'est enregistrée qu'après réaffectation"""
+        meal_plan = MealPlan(meals_json=json.dumps({'2024-01-15': {'lunch': 1}}))
+
+        meals = meal_plan.meals
+        meals['2024-01-16'] = {'dinner': 2}
+
+        # Valeur partagée, colonne inchangée tant que la valeur n'est pas réaffectée
+        assert meal_plan.meals is meals
+        assert json.loads(meal_plan.meals_json) == {'2024-01-15': {'lunch': 1}}
+
+        meal_plan.meals = meals
+
+        assert json.loads(meal_plan.meals_json) == {'2024-01-15': {'lunch': 1}, '2024-01-16': {'dinner': 2}}
+        assert meal_plan.meals == meals and meal_plan.meals is not meals
+
+    def test_empty_column_returns_default(self):
+        """Test les valeurs par défaut des colonnes vides"""
+        recipe = Recipe()
+
+        assert recipe.tags == []
+        assert recipe.timing_details == {}
+        assert ShoppingList().items == []
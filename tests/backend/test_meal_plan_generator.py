@@ -0,0 +1,125 @@
+"""
+Tests unitaires pour le générateur de plans de repas vectorisé
+Teste la reproductibilité, le respect des répétitions et l'écart aux objectifs
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.recipe import Recipe
+from services.meal_plan_generator import MealPlanGenerator, DAYS
+
+
+class TestMealPlanGenerator:
+    """Tests du générateur sur base réelle"""
+
+    GOALS = {'target_calories': 2000, 'target_protein': 150, 'target_carbs': 200, 'target_fat': 70}
+
+    @pytest.fixture
+    def recipes(self, app):
+        """Cinq recettes par repas, de 400 à 800 kcal"""
+        recipes = []
+        for meal_type, category in (('repas1', 'breakfast'), ('repas2', 'lunch'), ('repas3', 'dinner')):
+            for index in range(5):
+                calories = 400 + index * 100
+                recipes.append(Recipe(
+                    name=f"{meal_type} {index}", category=category, meal_type=meal_type,
+                    ingredients_json='[]', instructions_json='[]',
+                    total_calories=calories, total_protein=calories * 0.075,
+                    total_carbs=calories * 0.1, total_fat=calories * 0.035
+                ))
+        db.session.add_all(recipes)
+        db.session.commit()
+        return recipes
+
+    def _generate(self, seed, **kwargs):
+        return MealPlanGenerator(candidates=256, refinement_rounds=6).generate(
+            nutritional_goals=self.GOALS,
+            meal_types_to_include=['repas1', 'repas2', 'repas3'],
+            seed=seed,
+            **kwargs
+        )
+
+    def test_seed_makes_generation_reproducible(self, recipes):
+        """Test qu'une même graine donne le même plan"""
+        first = self._generate(seed=42)
+        second = self._generate(seed=42)
+
+        assert first['meals'] == second['meals']
+        assert first['seed'] == 42
+        assert list(first['meals']) == DAYS
+
+    def test_plan_fits_goals_and_repeats(self, recipes):
+        """Test l'écart aux objectifs et la limite de répétition"""
+        result = self._generate(seed=7, max_repeats=2)
+
+        usage = {}
+        for day_meals in result['meals'].values():
+            for recipe_id in day_meals.values():
+                usage[recipe_id] = usage.get(recipe_id, 0) + 1
+
+        assert max(usage.values()) <= 2
+        assert abs(result['nutrition']['daily_calories'] - 2000) < 100
+        assert result['score'] < 0.1
+
+    def test_recipes_loaded_in_one_query(self, recipes):
+        """Test qu'une génération ne lance qu'une requête"""
+        from sqlalchemy import event
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            self._generate(seed=1)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert len(statements) == 1
+
+    def test_annealing_respects_constraints_and_budget(self, recipes):
+        """Test le recuit simulé: contraintes dures, budget de temps et convergence"""
+        generator = MealPlanGenerator(candidates=64)
+        result = generator.optimize(
+            nutritional_goals=self.GOALS,
+            meal_types_to_include=['repas1', 'repas2', 'repas3'],
+            max_repeats=2,
+            seed=3,
+            time_budget_ms=50
+        )
+        convergence = result['convergence']
+
+        recipe_types = {recipe.id: recipe.meal_type for recipe in recipes}
+        usage = {}
+        for day_meals in result['meals'].values():
+            for meal_type, recipe_id in day_meals.items():
+                assert recipe_types[recipe_id] == meal_type
+                usage[recipe_id] = usage.get(recipe_id, 0) + 1
+
+        assert max(usage.values()) <= 2
+        assert convergence['best_score'] <= convergence['initial_score']
+        assert convergence['elapsed_ms'] < 1000
+        assert convergence['history'][-1]['best_score'] == result['score']
+
+    def test_annealing_is_reproducible_with_iteration_limit(self, recipes):
+        """Test la reproductibilité du recuit à nombre d'itérations fixé"""
+        runs = [
+            MealPlanGenerator(candidates=64).optimize(
+                nutritional_goals=self.GOALS,
+                meal_types_to_include=['repas1', 'repas2', 'repas3'],
+                seed=11,
+                time_budget_ms=5000,
+                max_iterations=2000
+            )
+            for _ in range(2)
+        ]
+
+        assert runs[0]['meals'] == runs[1]['meals']
+        assert runs[0]['convergence']['iterations'] == 2000
+
+    def test_no_recipes(self, app):
+        """Test l'absence de recettes candidates"""
+        assert self._generate(seed=1) is None
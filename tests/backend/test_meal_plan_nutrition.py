@@ -0,0 +1,73 @@
+"""
+Tests unitaires pour le calcul nutritionnel d'un plan de repas
+Teste les moyennes journalières et le chargement groupé des recettes
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.recipe import Recipe
+from routes.meal_plans import calculate_meal_plan_nutrition
+
+
+class TestMealPlanNutrition:
+    """Tests de calculate_meal_plan_nutrition sur base réelle"""
+
+    @pytest.fixture
+    def recipes(self, app):
+        """Trois recettes aux macros simples"""
+        recipes = [
+            Recipe(name=f"Recette {calories}", category='lunch', meal_type='repas2',
+                   ingredients_json='[]', instructions_json='[]',
+                   total_calories=calories, total_protein=calories / 10,
+                   total_carbs=calories / 5, total_fat=calories / 20)
+            for calories in (400, 600, 800)
+        ]
+        db.session.add_all(recipes)
+        db.session.commit()
+        return recipes
+
+    def _count_queries(self, func):
+        """Exécute func et retourne (résultat, nombre de requêtes SQL)"""
+        from sqlalchemy import event
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return result, len(statements)
+
+    def test_daily_averages_skip_empty_days(self, recipes):
+        """Test les moyennes sur les seuls jours avec repas (recettes inconnues ignorées)"""
+        small, medium, large = recipes
+        meals = {
+            'monday': {'repas1': small.id, 'repas2': large.id},
+            'tuesday': {'repas1': medium.id, 'repas2': str(medium.id), 'repas3': 999},
+            'wednesday': {'repas1': None}
+        }
+
+        assert calculate_meal_plan_nutrition(meals) == {
+            'daily_calories': 1200.0,
+            'daily_protein': 120.0,
+            'daily_carbs': 240.0,
+            'daily_fat': 60.0
+        }
+
+    def test_single_query_whatever_the_plan_size(self, recipes):
+        """Test qu'un plan de 35 repas ne coûte qu'une requête"""
+        meals = {
+            f"day_{day}": {f"meal_{slot}": recipes[(day + slot) % 3].id for slot in range(5)}
+            for day in range(7)
+        }
+
+        nutrition, queries = self._count_queries(lambda: calculate_meal_plan_nutrition(meals))
+
+        assert queries == 1
+        assert nutrition['daily_calories'] > 0
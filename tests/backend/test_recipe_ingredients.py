@@ -0,0 +1,91 @@
+"""
+Tests unitaires pour la table normalisée recipe_ingredients
+Teste la synchronisation avec Recipe.ingredients_json et le remplissage initial
+"""
+
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.ingredient import Ingredient
+from models.recipe import Recipe, RecipeIngredient
+
+
+class TestRecipeIngredients:
+    """Tests de la synchronisation JSON -> recipe_ingredients"""
+
+    @pytest.fixture
+    def ingredients(self, app):
+        """Deux ingrédients de base"""
+        rice = Ingredient(name="Riz", category="grain", unit="g", calories_per_100g=130,
+                          protein_per_100g=2.7, carbs_per_100g=28, fat_per_100g=0.3)
+        egg = Ingredient(name="Oeuf", category="protein", unit="g", calories_per_100g=155,
+                         protein_per_100g=13, carbs_per_100g=1.1, fat_per_100g=11)
+        db.session.add_all([rice, egg])
+        db.session.commit()
+        return rice, egg
+
+    def _create_recipe(self, ingredients):
+        recipe = Recipe.create_from_dict({
+            'name': "Riz aux oeufs",
+            'category': 'lunch',
+            'meal_type': 'repas2',
+            'ingredients': ingredients,
+            'instructions': []
+        })
+        db.session.add(recipe)
+        db.session.commit()
+        return recipe
+
+    def test_rows_created_with_recipe(self, ingredients):
+        """Test la création des lignes à l'insertion d'une recette"""
+        rice, egg = ingredients
+        recipe = self._create_recipe([
+            {'ingredient_id': rice.id, 'quantity': 150, 'unit': 'g'},
+            {'ingredient_id': egg.id, 'quantity': 2, 'unit': 'pièces'},
+            {'ingredient_id': 999, 'quantity': 1, 'unit': 'g'},   # ingrédient inexistant
+            {'name': 'Sel', 'quantity': 1}                        # sans ingredient_id
+        ])
+
+        rows = RecipeIngredient.query.filter_by(recipe_id=recipe.id).order_by(RecipeIngredient.position).all()
+
+        assert [(row.ingredient_id, row.quantity, row.unit) for row in rows] == [
+            (rice.id, 150, 'g'),
+            (egg.id, 2, 'pièces')
+        ]
+
+    def test_rows_follow_json_updates(self, ingredients):
+        """Test la resynchronisation lors d'une modification du JSON"""
+        rice, egg = ingredients
+        recipe = self._create_recipe([{'ingredient_id': rice.id, 'quantity': 150, 'unit': 'g'}])
+
+        recipe.ingredients_json = json.dumps([{'ingredient_id': egg.id, 'quantity': 3, 'unit': 'pièces'}])
+        db.session.commit()
+
+        assert RecipeIngredient.recipe_ids_for_ingredient(rice.id) == []
+        assert RecipeIngredient.recipe_ids_for_ingredient(egg.id) == [recipe.id]
+
+    def test_rows_deleted_with_recipe(self, ingredients):
+        """Test la suppression des lignes avec la recette"""
+        rice, _ = ingredients
+        recipe = self._create_recipe([{'ingredient_id': rice.id, 'quantity': 150, 'unit': 'g'}])
+
+        db.session.delete(recipe)
+        db.session.commit()
+
+        assert RecipeIngredient.query.count() == 0
+
+    def test_backfill_missing(self, ingredients):
+        """Test l'indexation des recettes antérieures à la table"""
+        rice, _ = ingredients
+        recipe = self._create_recipe([{'ingredient_id': rice.id, 'quantity': 150, 'unit': 'g'}])
+        RecipeIngredient.query.delete()
+        db.session.commit()
+
+        assert RecipeIngredient.backfill_missing() == 1
+        assert RecipeIngredient.recipe_ids_for_ingredient(rice.id) == [recipe.id]
+        assert RecipeIngredient.backfill_missing() == 0
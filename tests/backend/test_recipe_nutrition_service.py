@@ -0,0 +1,183 @@
+"""
+Tests unitaires pour le recalcul vectorisé des totaux nutritionnels des recettes
+Teste le produit matrice creuse x nutriments et la réécriture groupée des totaux
+"""
+
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.ingredient import Ingredient
+from models.meal_plan import MealPlan
+from models.recipe import Recipe
+from routes.recipes import calculate_recipe_nutrition
+from services.cache_service import cache_service
+from services.recipe_nutrition_service import recipe_nutrition
+
+
+class TestRecipeNutritionService:
+    """Tests du calcul vectorisé sur base réelle"""
+
+    @pytest.fixture
+    def catalog(self, app):
+        """Quatre ingrédients et vingt recettes de deux à quatre ingrédients, plus une sans ingrédient référencé"""
+        ingredients = [
+            Ingredient(name=f"Ingrédient {index}", category='autres', unit='g',
+                       calories_per_100g=index * 90 + 15, protein_per_100g=index * 7.5,
+                       carbs_per_100g=index * 4.2, fat_per_100g=index * 1.3)
+            for index in range(1, 5)
+        ]
+        db.session.add_all(ingredients)
+        db.session.flush()
+
+        recipes = []
+        for index in range(20):
+            entries = [
+                {'ingredient_id': ingredient.id, 'quantity': 25 + (index * 7 + position * 13) % 90, 'unit': 'g'}
+                for position, ingredient in enumerate(ingredients[:2 + index % 3])
+            ]
+            recipes.append(Recipe(name=f"Recette {index}", category='lunch', meal_type='repas2',
+                                  ingredients_json=json.dumps(entries), instructions_json='[]'))
+        recipes.append(Recipe(name='Eau citronnée', category='snack', meal_type='collation',
+                              ingredients_json=json.dumps([{'name': 'Citron', 'quantity': 10}]),
+                              instructions_json='[]', total_calories=3))
+        db.session.add_all(recipes)
+        db.session.commit()
+        return ingredients, recipes
+
+    def _count_queries(self, func):
+        """Exécute func et retourne (résultat, nombre de requêtes SQL)"""
+        from sqlalchemy import event
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return result, len(statements)
+
+    def test_totals_match_per_recipe_calculation(self, catalog):
+        """Test l'égalité avec le calcul recette par recette"""
+        _, recipes = catalog
+
+        ids, totals = recipe_nutrition.compute_totals()
+
+        assert ids.tolist() == [recipe.id for recipe in recipes[:20]]
+        for recipe, recipe_totals in zip(recipes, totals.tolist()):
+            expected = calculate_recipe_nutrition(recipe.ingredients)
+            assert recipe_totals == pytest.approx(list(expected.values()), abs=0.11)
+
+    def test_recompute_writes_changed_totals_in_constant_queries(self, catalog):
+        """Test la réécriture groupée: requêtes indépendantes du nombre de recettes"""
+        _, recipes = catalog
+
+        dry_run = recipe_nutrition.recompute_totals(dry_run=True)
+        assert dry_run['updated'] == 20
+        db.session.expire_all()
+        assert Recipe.query.get(recipes[0].id).total_calories == 0
+
+        result, queries = self._count_queries(recipe_nutrition.recompute_totals)
+        assert (result['computed'], result['updated'], result['dry_run']) == (20, 20, False)
+        assert queries <= 5
+
+        db.session.expire_all()
+        ids, totals = recipe_nutrition.compute_totals()
+        stored = {recipe.id: recipe for recipe in Recipe.query.all()}
+        for recipe_id, recipe_totals in zip(ids.tolist(), totals.tolist()):
+            recipe = stored[recipe_id]
+            assert [recipe.total_calories, recipe.total_protein,
+                    recipe.total_carbs, recipe.total_fat] == recipe_totals[:4]
+            assert recipe.nutrient_totals == {'fiber': 0, 'sodium': 0, 'sugar': 0}
+        assert stored[recipes[20].id].total_calories == 3
+
+        assert recipe_nutrition.recompute_totals()['updated'] == 0
+
+    def test_ingredient_update_recomputes_only_dependents(self, client, catalog):
+        """Test la propagation d'une modification d'ingrédient aux recettes et plans qui l'utilisent"""
+        from datetime import date
+
+        ingredients, recipes = catalog
+        recipe_nutrition.recompute_totals()
+        # L'ingrédient 4 n'est utilisé que par les recettes d'indice 2, 5, 8, ...
+        dependents = [recipe.id for index, recipe in enumerate(recipes[:20]) if index % 3 == 2]
+        other = recipes[0]
+
+        using, unrelated = MealPlan(week_start=date(2024, 3, 4)), MealPlan(week_start=date(2024, 3, 11))
+        using.meals = {'monday': {'repas1': dependents[0], 'repas2': other.id}}
+        unrelated.meals = {'monday': {'repas1': other.id}}
+        db.session.add_all([using, unrelated])
+        db.session.commit()
+        for meal_plan_id in (using.id, unrelated.id):
+            cache_service.set(f"test:plan:{meal_plan_id}", 'cache', 60,
+                              tags=[cache_service.make_tag(cache_service.TAG_MEAL_PLAN, meal_plan_id)])
+        calories_before = Recipe.query.get(dependents[0]).total_calories
+        other_before = other.total_calories
+
+        response = client.put(f'/api/ingredients/{ingredients[3].id}', json={
+            'nutrition_per_100g': {'calories': 1000}
+        })
+        assert response.status_code == 200
+
+        db.session.expire_all()
+        assert Recipe.query.get(dependents[0]).total_calories > calories_before
+        assert Recipe.query.get(other.id).total_calories == other_before
+
+        using, unrelated = MealPlan.query.get(using.id), MealPlan.query.get(unrelated.id)
+        assert using.daily_calories == round(Recipe.query.get(dependents[0]).total_calories + other_before, 1)
+        assert unrelated.daily_calories == 0
+        assert cache_service.get(f"test:plan:{using.id}") is None
+        assert cache_service.get(f"test:plan:{unrelated.id}") == 'cache'
+
+    def test_dependency_index_limits_recompute(self, catalog):
+        """Test le recalcul limité aux recettes dépendantes"""
+        ingredients, recipes = catalog
+
+        result = recipe_nutrition.propagate_ingredient_change(ingredients[3].id)
+
+        assert result['dependent_recipe_ids'] == [recipe.id for index, recipe in enumerate(recipes[:20]) if index % 3 == 2]
+        assert result['computed'] == len(result['dependent_recipe_ids'])
+        assert result['meal_plan_ids'] == []
+
+    def test_ingredient_saved_when_propagation_fails(self, client, catalog, monkeypatch):
+        """Test la réponse 200 et l'ingrédient enregistré malgré un échec du recalcul des recettes"""
+        ingredients, _ = catalog
+
+        def failing(*args, **kwargs):
+            raise RuntimeError('recalcul indisponible')
+        monkeypatch.setattr(recipe_nutrition, 'propagate_ingredient_change', failing)
+
+        response = client.put(f'/api/ingredients/{ingredients[3].id}', json={
+            'nutrition_per_100g': {'calories': 1000}
+        })
+
+        assert response.status_code == 200
+        db.session.expire_all()
+        assert Ingredient.query.get(ingredients[3].id).calories_per_100g == 1000
+
+    def test_ingredient_delete_recomputes_dependents(self, client, catalog):
+        """Test le recalcul des recettes après suppression d'un ingrédient (remise à zéro si c'était le seul)"""
+        ingredients, recipes = catalog
+        only = Recipe(name='Ingrédient seul', category='snack', meal_type='collation', instructions_json='[]',
+                      ingredients_json=json.dumps([{'ingredient_id': ingredients[3].id, 'quantity': 50, 'unit': 'g'}]))
+        db.session.add(only)
+        db.session.commit()
+        recipe_nutrition.recompute_totals()
+        dependent, other = recipes[2], recipes[0]
+        dependent_before, other_before = dependent.total_calories, other.total_calories
+        assert only.total_calories > 0
+
+        response = client.delete(f'/api/ingredients/{ingredients[3].id}')
+        assert response.status_code == 200
+
+        db.session.expire_all()
+        expected = calculate_recipe_nutrition(Recipe.query.get(dependent.id).ingredients)
+        assert Recipe.query.get(dependent.id).total_calories == pytest.approx(expected['calories'], abs=0.11)
+        assert Recipe.query.get(dependent.id).total_calories < dependent_before
+        assert Recipe.query.get(other.id).total_calories == other_before
+        assert Recipe.query.get(only.id).total_calories == 0
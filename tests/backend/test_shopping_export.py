@@ -0,0 +1,151 @@
+"""
+Tests unitaires pour l'export en streaming des listes de courses
+Teste les formats texte, CSV et JSON lines et la fusion de plusieurs listes
+"""
+
+import csv
+import io
+import json
+import pytest
+from datetime import date
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.meal_plan import MealPlan, ShoppingList
+from models.user import User
+from services.shopping_service import ShoppingService
+
+
+class TestShoppingExport:
+    """Tests de l'export des listes morceau par morceau"""
+
+    @pytest.fixture
+    def shopping_lists(self, app):
+        """Deux semaines consécutives partageant un ingrédient"""
+        user = User(username='client', email='client@example.com')
+        db.session.add(user)
+        db.session.flush()
+        meal_plan = MealPlan(user_id=user.id, week_start=date(2024, 1, 15))
+        meal_plan.meals = {}
+        db.session.add(meal_plan)
+        db.session.flush()
+
+        weeks = [
+            (date(2024, 1, 15), [
+                {'id': 'ing_1_g', 'ingredient_id': 1, 'name': 'Riz', 'quantity': 500, 'unit': 'g', 'category': 'grain'},
+                {'id': 'ing_2_g', 'ingredient_id': 2, 'name': 'Poulet', 'quantity': 300, 'unit': 'g', 'category': 'protein'}
+            ]),
+            (date(2024, 1, 22), [
+                {'id': 'ing_1_g', 'ingredient_id': 1, 'name': 'Riz', 'quantity': 250, 'unit': 'g', 'category': 'grain'}
+            ])
+        ]
+        lists = []
+        for week_start, items in weeks:
+            shopping_list = ShoppingList.create_from_dict({
+                'meal_plan_id': meal_plan.id,
+                'week_start': week_start,
+                'items': items
+            })
+            db.session.add(shopping_list)
+            lists.append(shopping_list)
+        db.session.flush()
+
+        lists[0].checked_items = {'ing_1_g': True}
+        db.session.commit()
+        return lists
+
+    def test_text_export_matches_formatted_text(self, shopping_lists):
+        """Test l'équivalence entre l'export texte en streaming et _format_list_as_text"""
+        streamed = ''.join(ShoppingService.stream_export([shopping_lists[0]], 'txt'))
+
+        assert streamed.rstrip('\n') == ShoppingService._format_list_as_text(shopping_lists[0])
+        assert '✓ Riz - 500 g' in streamed
+        assert '☐ Poulet - 300 g' in streamed
+
+    def test_csv_export_one_row_per_item(self, shopping_lists):
+        """Test l'export CSV de plusieurs listes"""
+        chunks = list(ShoppingService.stream_export(ShoppingService.iter_shopping_lists(), 'csv'))
+        rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+
+        assert len(chunks) == 4  # En-tête + un morceau par article
+        assert [(row['week_start'], row['item_id'], row['checked']) for row in rows] == [
+            ('2024-01-15', 'ing_1_g', '1'),
+            ('2024-01-15', 'ing_2_g', '0'),
+            ('2024-01-22', 'ing_1_g', '0')
+        ]
+
+    def test_merged_jsonl_export(self, shopping_lists):
+        """Test la fusion de plusieurs semaines en une liste"""
+        shopping_lists = ShoppingService.iter_shopping_lists(start_date=date(2024, 1, 1), batch_size=1)
+        records = [json.loads(line) for line in ShoppingService.stream_export(shopping_lists, 'jsonl', merge=True)]
+
+        assert records[0]['type'] == 'shopping_list'
+        assert len(records[0]['shopping_list_ids']) == 2
+
+        items = {record['id']: record for record in records[1:]}
+        assert items['ing_1_g']['quantity'] == 750
+        assert items['ing_1_g']['checked'] is False   # Coché dans une seule des deux listes
+        assert items['ing_2_g']['quantity'] == 300
+
+    def test_merge_uses_base_units(self, app):
+        """Test la fusion de quantités affichées dans des unités différentes (1.2 kg + 800 g)"""
+        meal_plan = MealPlan(week_start=date(2024, 2, 5))
+        meal_plan.meals = {}
+        db.session.add(meal_plan)
+        db.session.flush()
+        lists = [
+            ShoppingList.create_from_dict({'meal_plan_id': meal_plan.id, 'week_start': week_start, 'items': [item]})
+            for week_start, item in (
+                (date(2024, 2, 5), {'id': 'ing_1_g', 'ingredient_id': 1, 'name': 'Riz', 'quantity': 1.2, 'unit': 'kg',
+                                    'original_quantity': 1200, 'original_unit': 'g', 'category': 'grain'}),
+                (date(2024, 2, 12), {'id': 'ing_1_g', 'ingredient_id': 1, 'name': 'Riz', 'quantity': 800, 'unit': 'g',
+                                     'original_quantity': 800, 'original_unit': 'g', 'category': 'grain'})
+            )
+        ]
+        db.session.add_all(lists)
+        db.session.commit()
+
+        records = [json.loads(line) for line in ShoppingService.stream_export(lists, 'jsonl', merge=True)]
+
+        assert [(record['quantity'], record['unit']) for record in records[1:]] == [(2.0, 'kg')]
+
+    def test_stream_export_route(self, app, shopping_lists):
+        """Test la réponse HTTP en streaming"""
+        client = app.test_client()
+
+        # Liste d'un autre utilisateur sur la même période: exclue de l'export
+        other = User(username='autre', email='autre@example.com')
+        db.session.add(other)
+        db.session.flush()
+        other_plan = MealPlan(user_id=other.id, week_start=date(2024, 1, 15))
+        other_plan.meals = {}
+        db.session.add(other_plan)
+        db.session.flush()
+        db.session.add(ShoppingList.create_from_dict({
+            'meal_plan_id': other_plan.id, 'week_start': date(2024, 1, 15),
+            'items': [{'id': 'ing_3_g', 'ingredient_id': 3, 'name': 'Pâtes', 'quantity': 100, 'unit': 'g'}]
+        }))
+        db.session.commit()
+
+        response = client.post('/api/shopping-lists/export/stream', json={
+            'start_date': '2024-01-01', 'format': 'csv', 'merge': True
+        })
+        assert response.status_code == 400
+
+        response = client.post('/api/shopping-lists/export/stream', json={
+            'user_id': shopping_lists[0].meal_plan.user_id,
+            'start_date': '2024-01-01', 'format': 'csv', 'merge': True
+        })
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert 'attachment' in response.headers['Content-Disposition']
+        assert len(response.get_data(as_text=True).strip().splitlines()) == 3
+
+        assert 'Pâtes' not in response.get_data(as_text=True)
+
+        response = client.post('/api/shopping-lists/export/stream', json={'user_id': 1, 'format': 'csv'})
+        assert response.status_code == 400
@@ -0,0 +1,117 @@
+"""
+Tests unitaires pour l'écriture différée de l'historique des listes de courses
+Teste la mise en file, l'écriture par lots, la vidange à l'arrêt et la file bornée
+"""
+
+import threading
+import time
+import pytest
+from datetime import date
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.meal_plan import MealPlan, ShoppingList
+from models.shopping_history import ShoppingListHistory
+from services.shopping_history_writer import ShoppingHistoryWriter
+from services.shopping_service import ShoppingService
+
+
+class TestShoppingHistoryWriter:
+    """Tests du tampon d'écriture de l'historique"""
+
+    @pytest.fixture
+    def shopping_list(self, app):
+        """Liste de courses d'un article"""
+        meal_plan = MealPlan(week_start=date(2024, 1, 15))
+        meal_plan.meals = {}
+        db.session.add(meal_plan)
+        db.session.flush()
+
+        shopping_list = ShoppingList.create_from_dict({
+            'meal_plan_id': meal_plan.id,
+            'week_start': date(2024, 1, 15),
+            'items': [{'id': 'ing_1_g', 'name': 'Riz', 'quantity': 500, 'unit': 'g', 'category': 'grain'}]
+        })
+        db.session.add(shopping_list)
+        db.session.commit()
+        return shopping_list
+
+    def _wait_for(self, condition, timeout=3.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.02)
+        return False
+
+    def test_record_without_thread_writes_immediately(self, shopping_list):
+        """Test l'écriture directe lorsque le thread n'est pas démarré"""
+        writer = ShoppingHistoryWriter()
+
+        writer.record(shopping_list.id, 'item_checked', 'ing_1_g', new_value={'checked': True})
+
+        entry = ShoppingListHistory.query.one()
+        assert entry.new_value_dict == {'checked': True}
+        assert writer.get_statistics()['written'] == 1
+
+    def test_background_thread_writes_full_batches(self, app, shopping_list):
+        """Test l'écriture d'un lot complet dès qu'il atteint sa taille"""
+        writer = ShoppingHistoryWriter(flush_interval=30, batch_size=3)
+        writer.start(app)
+        try:
+            for _ in range(3):
+                writer.record(shopping_list.id, 'item_checked', 'ing_1_g')
+
+            assert self._wait_for(lambda: writer.get_statistics()['written'] == 3)
+            assert writer.get_statistics()['batches'] == 1
+        finally:
+            writer.stop()
+
+        assert ShoppingListHistory.query.count() == 3
+
+    def test_stop_flushes_pending_actions(self, app, shopping_list):
+        """Test la vidange de la file à l'arrêt"""
+        writer = ShoppingHistoryWriter(flush_interval=0.2, batch_size=100)
+        writer.start(app)
+
+        writer.record(shopping_list.id, 'item_checked', 'ing_1_g')
+        writer.record(shopping_list.id, 'item_unchecked', 'ing_1_g')
+        writer.stop()
+
+        assert writer.running is False
+        actions = [entry.action for entry in ShoppingListHistory.query.order_by(ShoppingListHistory.id)]
+        assert actions == ['item_checked', 'item_unchecked']
+
+    def test_full_queue_drops_actions(self, app, shopping_list):
+        """Test la file bornée: les actions en excès sont ignorées et comptées"""
+        writer = ShoppingHistoryWriter(max_queue=1)
+        release = threading.Event()
+        # Thread factice qui ne vide pas la file
+        writer._thread = threading.Thread(target=release.wait, daemon=True)
+        writer._thread.start()
+        writer._app = app
+
+        assert writer.record(shopping_list.id, 'item_checked', 'ing_1_g') is True
+        assert writer.record(shopping_list.id, 'item_unchecked', 'ing_1_g') is False
+
+        release.set()
+        writer.stop()
+
+        stats = writer.get_statistics()
+        assert stats['dropped'] == 1
+        assert stats['written'] == 1
+
+    def test_toggle_history_is_visible_through_route(self, app, shopping_list):
+        """Test qu'une bascule apparaît dans l'historique de la liste"""
+        ShoppingService.toggle_item(shopping_list, 'ing_1_g', True, user_id='marie')
+
+        response = app.test_client().get(f"/api/shopping-lists/{shopping_list.id}/history")
+
+        assert response.status_code == 200
+        history = response.get_json()['history']
+        assert len(history) == 1
+        assert history[0]['action'] == 'item_checked'
+        assert history[0]['new_value'] == {'checked': True, 'version': 1}
@@ -0,0 +1,178 @@
+"""
+Tests unitaires pour l'état coché par article (shopping_list_items)
+Teste les bascules atomiques avec version et la reprise du JSON historique
+"""
+
+import json
+import pytest
+from datetime import date
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
+
+from database import db
+from models.meal_plan import MealPlan, ShoppingList, ShoppingListItem
+from services.shopping_service import ShoppingService
+
+
+class TestShoppingListItems:
+    """Tests des bascules d'articles ligne par ligne"""
+
+    @pytest.fixture
+    def shopping_list(self, app):
+        """Liste de deux articles"""
+        meal_plan = MealPlan(week_start=date(2024, 1, 15))
+        meal_plan.meals = {}
+        db.session.add(meal_plan)
+        db.session.flush()
+
+        shopping_list = ShoppingList.create_from_dict({
+            'meal_plan_id': meal_plan.id,
+            'week_start': date(2024, 1, 15),
+            'items': [
+                {'id': 'ing_1_g', 'name': 'Riz', 'quantity': 500, 'unit': 'g', 'category': 'grain'},
+                {'id': 'ing_2_g', 'name': 'Poulet', 'quantity': 300, 'unit': 'g', 'category': 'protein'}
+            ]
+        })
+        db.session.add(shopping_list)
+        db.session.commit()
+        return shopping_list
+
+    def test_checked_items_are_stored_as_rows(self, shopping_list):
+        """Test la lecture/écriture de checked_items via shopping_list_items"""
+        shopping_list.checked_items = {'ing_1_g': True, 'ing_2_g': False}
+        db.session.commit()
+
+        assert ShoppingListItem.query.filter_by(shopping_list_id=shopping_list.id).count() == 2
+
+        shopping_list.checked_items = {'ing_1_g': False}
+        db.session.commit()
+
+        assert shopping_list.checked_items == {'ing_1_g': False}
+        assert shopping_list.item_versions == {'ing_1_g': 2}
+
+    def test_toggle_updates_single_row_and_completion(self, shopping_list):
+        """Test la bascule atomique, la version de la liste et la complétion"""
+        first = ShoppingService.toggle_item(shopping_list, 'ing_1_g', True)
+        assert first == {'success': True, 'conflict': False, 'item': first['item']}
+        assert first['item']['version'] == 1
+        assert shopping_list.is_completed is False
+
+        second = ShoppingService.toggle_item(shopping_list, 'ing_2_g', True, expected_version=0)
+        assert second['success'] is True
+
+        assert shopping_list.checked_items == {'ing_1_g': True, 'ing_2_g': True}
+        assert shopping_list.version == 3
+        assert shopping_list.is_completed is True
+
+    def test_stale_version_is_rejected(self, shopping_list):
+        """Test le conflit lorsque l'article a été modifié entre-temps"""
+        ShoppingService.toggle_item(shopping_list, 'ing_1_g', True)
+        ShoppingService.toggle_item(shopping_list, 'ing_1_g', False, expected_version=1)
+
+        result = ShoppingService.toggle_item(shopping_list, 'ing_1_g', True, expected_version=1)
+
+        assert result['success'] is False
+        assert result['conflict'] is True
+        assert result['item']['version'] == 2
+        assert shopping_list.checked_items == {'ing_1_g': False}
+
+    def test_toggle_route_returns_conflict(self, app, shopping_list):
+        """Test la réponse 409 de l'endpoint de bascule"""
+        client = app.test_client()
+        url = f"/api/shopping-lists/{shopping_list.id}/items/ing_1_g/toggle"
+
+        response = client.patch(url, json={'checked': True, 'version': 0})
+        assert response.status_code == 200
+        assert response.get_json()['item']['version'] == 1
+
+        response = client.patch(url, json={'checked': False, 'version': 0})
+        assert response.status_code == 409
+        assert response.get_json()['item']['checked'] is True
+
+    def test_unknown_item_is_rejected(self, app, shopping_list):
+        """Test le refus d'un article absent de la liste (aucune ligne créée)"""
+        result = ShoppingService.toggle_item(shopping_list, 'ing_99_g', True)
+
+        assert result['success'] is False
+        assert result['not_found'] is True
+        assert ShoppingListItem.query.filter_by(shopping_list_id=shopping_list.id).count() == 0
+
+        response = app.test_client().patch(
+            f"/api/shopping-lists/{shopping_list.id}/items/ing_99_g/toggle", json={'checked': True}
+        )
+        assert response.status_code == 404
+
+    def test_list_without_counters_not_completed_by_first_toggle(self, shopping_list):
+        """Test la complétion d'une liste sans compteurs: seulement quand tous les articles sont cochés"""
+        for row in list(shopping_list.category_stats):
+            shopping_list.category_stats.remove(row)
+        db.session.commit()
+
+        ShoppingService.toggle_item(shopping_list, 'ing_1_g', True)
+        assert shopping_list.is_completed is False
+
+        ShoppingService.toggle_item(shopping_list, 'ing_2_g', True)
+        assert shopping_list.is_completed is True
+
+    def test_backfill_from_json(self, shopping_list):
+        """Test la reprise des cases cochées encore stockées en JSON"""
+        shopping_list.checked_items_json = json.dumps({'ing_2_g': True})
+        db.session.commit()
+
+        assert ShoppingListItem.backfill_from_json() == 1
+        assert shopping_list.checked_items == {'ing_2_g': True}
+        assert shopping_list.checked_items_json == '{}'
+        assert ShoppingListItem.backfill_from_json() == 0
+
+    def test_statistics_counters_follow_toggles(self, app, shopping_list):
+        """Test la mise à jour des compteurs par catégorie à chaque bascule"""
+        ShoppingService.toggle_item(shopping_list, 'ing_1_g', True)
+        ShoppingService.toggle_item(shopping_list, 'ing_1_g', True)  # Sans effet: déjà coché
+
+        statistics = ShoppingService.get_shopping_list_statistics(shopping_list)
+
+        assert statistics['overview']['total_items'] == 2
+        assert statistics['overview']['completed_items'] == 1
+        assert statistics['by_category']['grain'] == {
+            'total': 1, 'completed': 1, 'estimated_cost': 0, 'completion_percentage': 100.0
+        }
+        assert statistics['by_category']['protein']['completed'] == 0
+
+        ShoppingService.toggle_item(shopping_list, 'ing_2_g', True)
+        ShoppingService.toggle_item(shopping_list, 'ing_1_g', False)
+
+        statistics = ShoppingService.get_shopping_list_statistics(shopping_list)
+        assert statistics['overview']['completed_items'] == 1
+        assert statistics['by_category']['grain']['completed'] == 0
+        assert statistics['by_category']['protein']['completed'] == 1
+
+    def test_category_stored_on_item_rows(self, shopping_list):
+        """Test la catégorie gardée sur la ligne de l'article (compteur ajusté sans relire les articles)"""
+        ShoppingService.toggle_item(shopping_list, 'ing_1_g', True)
+        shopping_list.checked_items = {'ing_1_g': True, 'ing_2_g': False}
+        db.session.commit()
+
+        rows = {row.item_id: row for row in ShoppingListItem.query.filter_by(shopping_list_id=shopping_list.id)}
+        assert {item_id: row.category for item_id, row in rows.items()} == {'ing_1_g': 'grain', 'ing_2_g': 'protein'}
+
+        # Ligne antérieure à la colonne: catégorie renseignée à la bascule suivante
+        rows['ing_2_g'].category = None
+        db.session.commit()
+        ShoppingService.toggle_item(shopping_list, 'ing_2_g', True)
+
+        assert rows['ing_2_g'].category == 'protein'
+        assert ShoppingService.get_shopping_list_statistics(shopping_list)['by_category']['protein']['completed'] == 1
+
+    def test_statistics_initialized_for_legacy_lists(self, shopping_list):
+        """Test le calcul unique des compteurs d'une liste qui n'en a pas"""
+        shopping_list.checked_items = {'ing_2_g': True}
+        for row in list(shopping_list.category_stats):
+            shopping_list.category_stats.remove(row)
+        db.session.commit()
+
+        statistics = ShoppingService.get_shopping_list_statistics(shopping_list)
+
+        assert statistics['overview']['completed_items'] == 1
+        assert len(shopping_list.category_stats) == 2
@@ -13,7 +13,7 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'backend'))
 
 from services.shopping_service import ShoppingService
-from models.meal_plan import MealPlan, ShoppingList
+from models.meal_plan import MealPlan, ShoppingList, ShoppingListCategoryStats
 from models.recipe import Recipe
 from models.ingredient import Ingredient
 
@@ -102,17 +102,30 @@ class TestShoppingServiceUS15:
         
         return ingredients
     
-    def test_collect_ingredients_from_meal_plan(self, sample_meal_plan, sample_recipes):
+    @pytest.fixture
+    def sample_entries(self, sample_recipes, sample_ingredients):
+        """Résultat du chargement groupé des ingrédients des recettes"""
+        return {
+            recipe_id: (recipe.name, [
+                (data, ShoppingService._ingredient_info(sample_ingredients[data['ingredient_id']]))
+                for data in recipe.ingredients
+            ])
+            for recipe_id, recipe in sample_recipes.items()
+        }
+    
+    def test_collect_ingredients_from_meal_plan(self, sample_meal_plan, sample_entries):
         """Test la collecte d'ingrédients depuis un plan de repas"""
-        with patch.object(Recipe, 'query') as mock_recipe_query:
-            # Mock des requêtes Recipe
-            mock_recipe_query.get.side_effect = lambda recipe_id: sample_recipes.get(recipe_id)
+        with patch.object(ShoppingService, '_load_recipe_ingredient_entries') as mock_load:
+            # Un seul chargement groupé pour toutes les recettes du plan
+            mock_load.return_value = sample_entries
             
             # Test
             ingredients_list = ShoppingService._collect_ingredients_from_meal_plan(sample_meal_plan)
             
+            mock_load.assert_called_once_with({1, 2, 3})
+            
             # Vérifications
-            assert len(ingredients_list) == 5  # Total des ingrédients dans toutes les recettes
+            assert len(ingredients_list) == 7  # Total des ingrédients sur tous les créneaux
             
             # Vérifier qu'on a les bons ingrédients
             ingredient_ids = [item['ingredient_id'] for item in ingredients_list]
@@ -145,11 +158,14 @@ class TestShoppingServiceUS15:
         ]
         
         with patch.object(Ingredient, 'query') as mock_ingredient_query:
-            mock_ingredient_query.get.side_effect = lambda ingredient_id: sample_ingredients.get(ingredient_id)
+            mock_ingredient_query.filter.return_value.all.return_value = [sample_ingredients[1]]
             
             # Test
             aggregated_list = ShoppingService._aggregate_ingredient_quantities(raw_ingredients)
             
+            # Une seule requête pour les informations des ingrédients
+            mock_ingredient_query.filter.assert_called_once()
+            
             # Vérifications
             assert len(aggregated_list) == 1  # Un seul ingrédient agrégé
             
@@ -236,14 +252,12 @@ class TestShoppingServiceUS15:
         expected_time = 10 + 10 + 5  # = 25 minutes
         assert time_minutes == expected_time
     
-    def test_generate_optimized_shopping_list_complete(self, sample_meal_plan, sample_recipes, sample_ingredients):
+    def test_generate_optimized_shopping_list_complete(self, sample_meal_plan, sample_entries):
         """Test complet de génération d'une liste de courses optimisée"""
-        with patch.object(Recipe, 'query') as mock_recipe_query, \
-             patch.object(Ingredient, 'query') as mock_ingredient_query:
+        with patch.object(ShoppingService, '_load_recipe_ingredient_entries') as mock_load:
             
             # Configuration des mocks
-            mock_recipe_query.get.side_effect = lambda recipe_id: sample_recipes.get(recipe_id)
-            mock_ingredient_query.get.side_effect = lambda ingredient_id: sample_ingredients.get(ingredient_id)
+            mock_load.return_value = sample_entries
             
             # Test
             result = ShoppingService.generate_optimized_shopping_list(sample_meal_plan)
@@ -314,6 +328,11 @@ class TestShoppingListStatistics:
             {'id': '3', 'name': 'Laitue', 'category': 'vegetable', 'quantity': 1, 'unit_price': 3.0}
         ]
         shopping_list.checked_items = {'1': True, '2': False, '3': False}
+        shopping_list.category_stats = [
+            ShoppingListCategoryStats(category='protein', total_items=1, completed_items=1, estimated_cost=15.0),
+            ShoppingListCategoryStats(category='nuts', total_items=1, completed_items=0, estimated_cost=4.0),
+            ShoppingListCategoryStats(category='vegetable', total_items=1, completed_items=0, estimated_cost=3.0)
+        ]
         shopping_list.estimated_budget = 26.0
         shopping_list.is_completed = False
         shopping_list.last_updated = datetime.utcnow()
@@ -406,6 +425,258 @@ class TestShoppingListStatistics:
         assert '☐ Amandes' in text_output  # Amandes pas cochées
         assert 'DietTracker' in text_output
 
+class TestShoppingServiceDatabase:
+    """Tests sur base réelle: agrégation groupée et régénération incrémentale"""
+    
+    def _create_plan(self, days):
+        """Crée deux recettes partageant un ingrédient et un plan de N jours"""
+        from database import db
+        
+        chicken = Ingredient(name="Blanc de poulet", category="protein", unit="g", calories_per_100g=165,
+                             protein_per_100g=31, carbs_per_100g=0, fat_per_100g=3.6)
+        rice = Ingredient(name="Riz", category="grain", unit="g", calories_per_100g=130,
+                          protein_per_100g=2.7, carbs_per_100g=28, fat_per_100g=0.3)
+        db.session.add_all([chicken, rice])
+        db.session.flush()
+        
+        lunch = Recipe.create_from_dict({
+            'name': "Poulet riz", 'category': 'lunch', 'meal_type': 'repas2',
+            'ingredients': [{'ingredient_id': chicken.id, 'quantity': 150, 'unit': 'g'},
+                            {'ingredient_id': rice.id, 'quantity': 100, 'unit': 'g'}]
+        })
+        dinner = Recipe.create_from_dict({
+            'name': "Poulet grillé", 'category': 'dinner', 'meal_type': 'repas3',
+            'ingredients': [{'ingredient_id': chicken.id, 'quantity': 200, 'unit': 'g'}]
+        })
+        db.session.add_all([lunch, dinner])
+        db.session.commit()
+        
+        meal_plan = MealPlan(week_start=date(2024, 1, 15))
+        meal_plan.meals = {f"day_{i}": {'repas2': lunch.id, 'repas3': dinner.id} for i in range(days)}
+        return meal_plan
+    
+    def _count_queries(self, func):
+        """Exécute func et retourne (résultat, nombre de requêtes SQL)"""
+        from sqlalchemy import event
+        from database import db
+        
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return result, len(statements)
+    
+    def test_aggregation_preserves_sources_and_units(self, app):
+        """Test les totaux, sources et conversions d'unités sur une semaine"""
+        meal_plan = self._create_plan(days=7)
+        
+        result = ShoppingService.generate_optimized_shopping_list(meal_plan)
+        items = {item['name']: item for item in result['items']}
+        
+        # 7 * (150 + 200) g = 2450 g -> 2.45 kg
+        assert items["Blanc de poulet"]['quantity'] == 2.45
+        assert items["Blanc de poulet"]['unit'] == 'kg'
+        assert len(items["Blanc de poulet"]['sources']) == 14
+        assert items["Riz"]['quantity'] == 700
+        assert items["Riz"]['sources'][0] == {
+            'meal_plan_id': None, 'recipe_name': "Poulet riz", 'day': 'day_0', 'meal_type': 'repas2', 'quantity': 100
+        }
+    
+    def test_query_count_does_not_grow_with_plan_size(self, app):
+        """Test que le nombre de requêtes ne dépend pas du nombre de créneaux"""
+        short_plan = self._create_plan(days=1)
+        long_plan = self._create_plan(days=7)
+        
+        _, short_plan_queries = self._count_queries(
+            lambda: ShoppingService.generate_optimized_shopping_list(short_plan)
+        )
+        _, long_plan_queries = self._count_queries(
+            lambda: ShoppingService.generate_optimized_shopping_list(long_plan)
+        )
+        
+        assert long_plan_queries == short_plan_queries
+        assert short_plan_queries <= 2
+    
+    def test_consolidated_list_for_several_plans(self, app):
+        """Test la liste consolidée de deux plans en une passe, sources par plan"""
+        from database import db
+        
+        first_plan = self._create_plan(days=2)
+        second_plan = MealPlan(week_start=date(2024, 1, 22))
+        second_plan.meals = first_plan.meals
+        db.session.add_all([first_plan, second_plan])
+        db.session.commit()
+        MealPlan.query.all()  # Plans chargés hors mesure
+        
+        result, queries = self._count_queries(
+            lambda: ShoppingService.generate_consolidated_shopping_list([first_plan, second_plan])
+        )
+        _, single_plan_queries = self._count_queries(
+            lambda: ShoppingService.generate_optimized_shopping_list(first_plan)
+        )
+        items = {item['name']: item for item in result['items']}
+        
+        assert queries == single_plan_queries
+        # 2 plans * 2 jours * (150 + 200) g = 1400 g -> 1.4 kg
+        assert items["Blanc de poulet"]['quantity'] == 1.4
+        assert {source['meal_plan_id'] for source in items["Blanc de poulet"]['sources']} == \
+            {first_plan.id, second_plan.id}
+        assert result['aggregation_rules']['meal_plan_ids'] == [first_plan.id, second_plan.id]
+        assert 'source_meals' not in result['aggregation_rules']
+        assert result['aggregation_rules']['meal_plan_info']['total_recipes'] == 8
+        
+        # Endpoint: une seule liste rattachée au premier plan
+        client = app.test_client()
+        response = client.post('/api/shopping-lists/consolidated', json={
+            'meal_plan_ids': [first_plan.id, second_plan.id]
+        })
+        assert response.status_code == 201
+        assert response.get_json()['shopping_list']['meal_plan_id'] == first_plan.id
+        
+        response = client.post('/api/shopping-lists/consolidated', json={'meal_plan_ids': [first_plan.id, 999]})
+        assert response.status_code == 404
+        assert response.get_json()['missing_ids'] == [999]
+    
+    def _create_shopping_list(self, meal_plan):
+        """Enregistre le plan et sa liste de courses générée"""
+        from database import db
+        
+        db.session.add(meal_plan)
+        db.session.flush()
+        data = ShoppingService.generate_optimized_shopping_list(meal_plan)
+        shopping_list = ShoppingList.create_from_dict({
+            'meal_plan_id': meal_plan.id,
+            'week_start': meal_plan.week_start,
+            'items': data['items'],
+            'category_grouping': data['category_grouping'],
+            'estimated_budget': data['estimated_budget'],
+            'aggregation_rules': data['aggregation_rules']
+        })
+        db.session.add(shopping_list)
+        db.session.commit()
+        return shopping_list
+    
+    def test_incremental_regeneration_after_swapping_a_dinner(self, app):
+        """Test que seul le créneau modifié est appliqué, cases cochées conservées"""
+        from database import db
+        
+        meal_plan = self._create_plan(days=2)
+        shopping_list = self._create_shopping_list(meal_plan)
+        rice_id = next(item['id'] for item in shopping_list.items if item['name'] == "Riz")
+        shopping_list.checked_items = {rice_id: True}
+        db.session.commit()
+        
+        salmon = Ingredient(name="Saumon", category="protein", unit="g", calories_per_100g=208,
+                            protein_per_100g=20, carbs_per_100g=0, fat_per_100g=13)
+        db.session.add(salmon)
+        db.session.flush()
+        fish = Recipe.create_from_dict({
+            'name': "Saumon vapeur", 'category': 'dinner', 'meal_type': 'repas3',
+            'ingredients': [{'ingredient_id': salmon.id, 'quantity': 180, 'unit': 'g'}]
+        })
+        db.session.add(fish)
+        db.session.flush()
+        
+        meals = {day: dict(day_meals) for day, day_meals in meal_plan.meals.items()}
+        meals['day_1']['repas3'] = fish.id
+        meal_plan.meals = meals
+        db.session.commit()
+        
+        result = ShoppingService.regenerate_shopping_list(shopping_list)
+        
+        assert result['success'] is True
+        assert result['statistics']['incremental'] is True
+        assert result['statistics']['changed_slots'] == 1
+        
+        items = {item['name']: item for item in shopping_list.items}
+        assert items["Blanc de poulet"]['quantity'] == 500  # 2 * 150 + 200
+        assert len(items["Blanc de poulet"]['sources']) == 3
+        assert items["Saumon"]['quantity'] == 180
+        assert items["Riz"]['id'] == rice_id
+        assert shopping_list.checked_items == {rice_id: True}
+        
+        # Résultat identique à une reconstruction complète
+        rebuilt = ShoppingService.generate_optimized_shopping_list(meal_plan)['items']
+        assert {item['id']: item['quantity'] for item in rebuilt} == \
+            {item['id']: item['quantity'] for item in shopping_list.items}
+    
+    def test_removed_slot_subtracts_quantities_stored_at_generation(self, app):
+        """Test le retrait d'une recette modifiée depuis la génération de la liste"""
+        from database import db
+        
+        meal_plan = self._create_plan(days=2)
+        shopping_list = self._create_shopping_list(meal_plan)
+        lunch_id, dinner_id = meal_plan.meals['day_0']['repas2'], meal_plan.meals['day_0']['repas3']
+        
+        # Le déjeuner perd le riz et passe à 120 g de poulet après la génération
+        lunch = Recipe.query.get(lunch_id)
+        lunch.ingredients = [{'ingredient_id': lunch.ingredients[0]['ingredient_id'], 'quantity': 120, 'unit': 'g'}]
+        meals = {day: dict(day_meals) for day, day_meals in meal_plan.meals.items()}
+        meals['day_0']['repas2'] = dinner_id
+        meal_plan.meals = meals
+        db.session.commit()
+        
+        result = ShoppingService.regenerate_shopping_list(shopping_list)
+        
+        assert result['statistics']['incremental'] is True
+        items = {item['name']: item for item in shopping_list.items}
+        assert items["Blanc de poulet"]['quantity'] == 750  # 700 - 150 (génération) + 200
+        assert items["Riz"]['quantity'] == 100  # Seul le déjeuner du jour 1 reste
+        assert [source['day'] for source in items["Riz"]['sources']] == ['day_1']
+    
+    def test_removed_slot_drops_items_without_sources(self, app):
+        """Test le retrait d'un article qui n'a plus aucune source"""
+        from database import db
+        
+        meal_plan = self._create_plan(days=1)
+        shopping_list = self._create_shopping_list(meal_plan)
+        
+        meal_plan.meals = {'day_0': {'repas3': meal_plan.meals['day_0']['repas3']}}
+        db.session.commit()
+        
+        result = ShoppingService.regenerate_shopping_list(shopping_list)
+        
+        assert result['statistics']['removed_items'] == 1
+        assert [item['name'] for item in shopping_list.items] == ["Blanc de poulet"]
+    
+    def test_emptied_list_is_not_completed(self, app):
+        """Test qu'une liste vidée par la suppression de tous les créneaux n'est pas complétée"""
+        from database import db
+        
+        meal_plan = self._create_plan(days=1)
+        shopping_list = self._create_shopping_list(meal_plan)
+        
+        meal_plan.meals = {}
+        db.session.commit()
+        
+        result = ShoppingService.regenerate_shopping_list(shopping_list)
+        
+        assert result['statistics']['removed_items'] == 2
+        assert shopping_list.items == []
+        assert shopping_list.is_completed is False
+        assert shopping_list.completion_date is None
+    
+    def test_full_regeneration_maps_legacy_item_ids(self, app):
+        """Test la conservation des cases cochées des anciens IDs agg_N"""
+        from database import db
+        
+        meal_plan = self._create_plan(days=1)
+        shopping_list = self._create_shopping_list(meal_plan)
+        legacy_items = [dict(item, id=f"agg_{idx + 1}") for idx, item in enumerate(shopping_list.items)]
+        shopping_list.items = legacy_items
+        shopping_list.checked_items = {'agg_1': True}
+        shopping_list.aggregation_rules = {}
+        db.session.commit()
+        
+        result = ShoppingService.regenerate_shopping_list(shopping_list)
+        
+        assert 'incremental' not in result['statistics']
+        stable_id = ShoppingService._item_id(legacy_items[0]['ingredient_id'], 'g')
+        assert shopping_list.checked_items[stable_id] is True
+
 
 if __name__ == '__main__':
     # Lancer les tests
@@ -11,6 +11,8 @@ from main import create_app
 from models.recipe import Recipe
 from models.ingredient import Ingredient
 from database import db
+from services.ingredient_snapshot_service import ingredient_snapshot
+from services.recipe_nutrition_service import recipe_nutrition
 
 def create_or_get_ingredient(name, category, calories, protein, carbs, fat, unit='g'):
     """Créer ou récupérer un ingrédient"""
@@ -315,5 +317,10 @@ with app.app_context():
     
     db.session.commit()
     
+    # Totaux nutritionnels recalculés en une passe depuis les nouveaux ingrédients
+    ingredient_snapshot.invalidate()
+    result = recipe_nutrition.recompute_totals()
+    print(f"📊 Totaux recalculés: {result['updated']}/{result['computed']} recette(s) modifiée(s)")
+    
     print("\n✅ Correction terminée!")
     print("   Toutes les recettes ont maintenant des ingrédients cohérents.")
\ No newline at end of file